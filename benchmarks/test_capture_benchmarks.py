@@ -0,0 +1,148 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from io import StringIO
+from random import Random
+
+import pytest
+
+from helpers import window
+from helpers.rectangle import rectangle_from_positions, rectangle_intersection
+from helpers.report import print_report
+from helpers.spatial import SpatialIndex
+from helpers.window import WindowCapture, WindowState, update_capture_state, finalize_capture_state
+from tests.desktop import random_desktop
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.mark.parametrize("window_count", [10, 100, 1000])
+def test_visible_window_captures(benchmark, monkeypatch, window_count):
+    desktop = random_desktop(window_count)
+    desktop.install(monkeypatch)
+    captures = benchmark(window.visible_window_captures)
+    assert captures
+
+
+def test_rectangle_intersection(benchmark):
+    random = Random(0)
+    pairs = []
+    for _ in range(1000):
+        left, top = random.randint(0, 2000), random.randint(0, 1000)
+        other_left, other_top = random.randint(0, 2000), random.randint(0, 1000)
+        pairs.append((
+            rectangle_from_positions(left, top, left + 500, top + 400),
+            rectangle_from_positions(other_left, other_top, other_left + 500, other_top + 400),
+        ))
+
+    def intersect_all():
+        for first, second in pairs:
+            rectangle_intersection(first, second)
+
+    benchmark(intersect_all)
+
+
+def indexed_desktop(window_count: int) -> SpatialIndex:
+    index = SpatialIndex()
+    windows = random_desktop(window_count).windows
+    for fake_window in windows:
+        index.insert(fake_window.handle, fake_window.rectangle)
+    index.restack(fake_window.handle for fake_window in windows)
+    return index
+
+
+@pytest.mark.parametrize("window_count", [100, 1000])
+def test_occlusion(benchmark, window_count):
+    # Every round computes every visible area afresh, as the first scan does.
+    def visible_areas(index: SpatialIndex) -> list[int]:
+        return [index.visible_area(handle) for handle in range(4, window_count * 4 + 1, 4)]
+
+    areas = benchmark.pedantic(visible_areas, setup=lambda: ((indexed_desktop(window_count),), {}), rounds=5)
+    assert any(areas)
+
+
+@pytest.mark.parametrize("window_count", [100, 1000])
+def test_occlusion_after_move(benchmark, window_count):
+    # Every round moves one window and brings it to the front, as a scan after a drag does, then asks for every
+    # visible area. Only the windows the moved one overlaps are recomputed.
+    index = indexed_desktop(window_count)
+    handles = list(range(4, window_count * 4 + 1, 4))
+    for handle in handles:
+        index.visible_area(handle)
+    random = Random(0)
+
+    def move_window() -> list[int]:
+        handle = random.choice(handles)
+        left, top = random.randint(0, 2000), random.randint(0, 1000)
+        index.insert(handle, rectangle_from_positions(left, top, left + 400, top + 300))
+        handles.remove(handle)
+        handles.insert(0, handle)
+        index.restack(handles)
+        return [index.visible_area(handle) for handle in handles]
+
+    assert any(benchmark(move_window))
+
+
+def test_update_capture_state_churn(benchmark, monkeypatch):
+    desktop = random_desktop(200)
+    desktop.install(monkeypatch)
+    captures, states = {}, {}
+    update_capture_state(captures, states)
+    random = Random(0)
+    rounds = iter(range(1, 1 << 30))
+
+    def churn():
+        # Every scan a tenth of the windows change title and one is brought to the front.
+        number = next(rounds)
+        for fake_window in random.sample(desktop.windows, len(desktop.windows) // 10):
+            fake_window.title = "Document %d, revision %d" % (fake_window.handle, number)
+        desktop.windows.insert(0, desktop.windows.pop(random.randrange(len(desktop.windows))))
+        update_capture_state(captures, states)
+
+    benchmark(churn)
+    assert states
+
+
+def large_state_sets(window_count: int, states_per_window: int) -> tuple[dict, dict]:
+    random = Random(0)
+    captures, states = {}, {}
+    for handle in range(window_count):
+        process = "C:\\Programs\\program%d.exe" % (handle % 50)
+        rectangle = rectangle_from_positions(0, 0, 800, 600)
+        captures[(handle, process)] = WindowCapture(handle, process, "Open", rectangle, 0)
+        states[(handle, process)] = {
+            WindowState("Title %d" % random.randrange(500), rectangle, random.randint(1, 60000) + state)
+            for state in range(states_per_window)
+        }
+    return captures, states
+
+
+def test_finalize_capture_state(benchmark):
+    captures, states = large_state_sets(1000, 100)
+
+    def setup():
+        return (dict(captures), {key: set(value) for key, value in states.items()}), {}
+
+    results = benchmark.pedantic(finalize_capture_state, setup=setup, rounds=5)
+    assert len(results) == 1000
+
+
+def test_print_report(benchmark):
+    captures, states = large_state_sets(1000, 200)
+    results = finalize_capture_state(captures, states)
+    benchmark(print_report, results, output=StringIO())
@@ -0,0 +1,38 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+REPOSITORY = Path(__file__).resolve().parent.parent
+
+# The stand-ins of conftest are installed first so the tracker can be imported outside of Windows.
+IMPORT_MAIN = "import conftest; import main"
+
+
+def test_import_main(benchmark):
+    # Every round starts a fresh interpreter, so nothing is already imported. Python's own start up is included.
+    def import_main():
+        subprocess.run([sys.executable, "-c", IMPORT_MAIN], cwd=REPOSITORY, check=True)
+
+    benchmark.pedantic(import_main, rounds=20, warmup_rounds=1)
@@ -0,0 +1,63 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from time import sleep
+
+import pytest
+
+from helpers.journal import CaptureJournal
+from helpers.rectangle import rectangle_from_positions
+from helpers.window import WindowCapture, WindowState
+
+pytest.importorskip("pytest_benchmark")
+
+RECORD_COUNT = 2_000
+RECTANGLE = rectangle_from_positions(0, 0, 800, 600)
+CAPTURE = WindowCapture(1, "\\Device\\HarddiskVolume3\\Programs\\program.exe", "Document", RECTANGLE, 0)
+STATE = WindowState("Document", RECTANGLE, 1000)
+
+
+@pytest.mark.parametrize("burst_size", [1, 100, RECORD_COUNT])
+def test_journal_throughput(benchmark, tmp_path, burst_size):
+    # Records that queue up together share one write and fsync, so bigger bursts commit more records per second.
+    def setup():
+        return (CaptureJournal(str(tmp_path / "screentime-journal.jsonl"), commit_interval=0),), {}
+
+    def journal_records(journal: CaptureJournal):
+        for burst in range(0, RECORD_COUNT, burst_size):
+            for _ in range(burst_size):
+                journal.capture_closed(CAPTURE, STATE)
+            # Wait for the burst to be committed, as if the next one came later.
+            while journal.records < burst + burst_size:
+                sleep(0)
+        journal.close()
+        return journal
+
+    journal = benchmark.pedantic(journal_records, setup=setup, rounds=3)
+    assert journal.records == RECORD_COUNT
+    benchmark.extra_info["records_per_commit"] = journal.records / journal.commits
+
+
+def test_queue_record(benchmark, tmp_path):
+    # The part of journaling that runs on the event loop.
+    journal = CaptureJournal(str(tmp_path / "screentime-journal.jsonl"))
+    try:
+        # A fixed number of rounds, since every record queued is also written.
+        benchmark.pedantic(journal.capture_closed, args=(CAPTURE, STATE), rounds=RECORD_COUNT)
+    finally:
+        journal.close()
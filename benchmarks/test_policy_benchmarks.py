@@ -0,0 +1,55 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from itertools import count
+from random import Random
+from string import ascii_lowercase
+
+import pytest
+
+from helpers.policy import CapturePolicy
+
+pytest.importorskip("pytest_benchmark")
+
+# The titles a desktop shows over and over, none of which any rule matches.
+TITLES = ["Document %d - Editor" % number for number in range(200)]
+
+
+def title_policy(rule_count: int) -> CapturePolicy:
+    # Distinct literal words, which the regular expression engine can't merge into a common prefix.
+    random = Random(0)
+    words = ["".join(random.choices(ascii_lowercase, k=8)) for _ in range(rule_count)]
+    return CapturePolicy(exclude_titles=words)
+
+
+@pytest.mark.parametrize("rule_count", [1, 100, 1000])
+def test_allows_seen_titles(benchmark, rule_count):
+    policy = title_policy(rule_count)
+
+    def check():
+        return all(policy.allows_title(title) for title in TITLES)
+
+    assert benchmark(check)
+
+
+@pytest.mark.parametrize("rule_count", [1, 100, 1000])
+def test_allows_new_title(benchmark, rule_count):
+    # Every check meets a title for the first time, so it is decided by the rules rather than remembered.
+    policy = title_policy(rule_count)
+    numbers = count()
+    assert benchmark(lambda: policy.allows_title("Document %d - Editor" % next(numbers)))
@@ -0,0 +1,70 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from threading import Event
+from time import sleep
+
+import pytest
+
+from helpers.process import ProcessNameResolver
+
+pytest.importorskip("pytest_benchmark")
+
+PROCESS_IDS = range(1, 33)
+
+
+def slow_lookup(latency: float, released: Event = None):
+    # Stands in for OpenProcess and GetProcessImageFileNameW on a loaded machine.
+    def lookup(process_id: int) -> str:
+        if released is not None and process_id == 1:
+            released.wait()
+        sleep(latency)
+        return "\\Device\\HarddiskVolume3\\Programs\\program%d.exe" % process_id
+
+    return lookup
+
+
+@pytest.mark.parametrize("latency", [0.001, 0.005, 0.02])
+def test_resolve_new_processes(benchmark, latency):
+    # Every round meets all of its processes for the first time.
+    def setup():
+        return (ProcessNameResolver(lookup=slow_lookup(latency)),), {}
+
+    names = benchmark.pedantic(lambda resolver: resolver.resolve(PROCESS_IDS), setup=setup, rounds=10)
+    assert len(names) == len(PROCESS_IDS)
+
+
+def test_resolve_with_a_hung_lookup(benchmark):
+    # One process never answers within the timeout, which bounds how long the scan waits for it.
+    released = Event()
+
+    def setup():
+        return (ProcessNameResolver(lookup=slow_lookup(0.001, released), timeout=0.1),), {}
+
+    try:
+        names = benchmark.pedantic(lambda resolver: resolver.resolve(PROCESS_IDS), setup=setup, rounds=5)
+    finally:
+        released.set()
+    assert 1 not in names and len(names) == len(PROCESS_IDS) - 1
+
+
+def test_resolve_known_processes(benchmark):
+    resolver = ProcessNameResolver(lookup=slow_lookup(0.01))
+    resolver.resolve(PROCESS_IDS)
+    names = benchmark(resolver.resolve, PROCESS_IDS)
+    assert len(names) == len(PROCESS_IDS)
@@ -0,0 +1,86 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+from io import StringIO
+from itertools import product
+from tracemalloc import start, stop, get_traced_memory
+
+import pytest
+
+from helpers.rectangle import rectangle_from_positions
+from helpers.render import render_html, render_json
+from helpers.report import summarize_session
+from helpers.rollup import RollupRing
+
+pytest.importorskip("pytest_benchmark")
+
+# Ten million states by default, which takes a while. Set SCREENTIME_REPORT_STATES to a smaller number for a quick run.
+REPORT_STATES = int(os.environ.get("SCREENTIME_REPORT_STATES", 10_000_000))
+REPORT_PROCESSES = 200
+REPORT_TITLES = 5_000
+RECTANGLES = [rectangle_from_positions(x, y, x + 800, y + 600) for x, y in product(range(0, 1000, 100), repeat=2)]
+
+
+def synthetic_session(state_count: int, process_count: int = REPORT_PROCESSES, title_count: int = REPORT_TITLES):
+    # Sorted the way session files are: by process, then title, then rectangle. The rows are generated as they are
+    # read, so the dataset itself never has to fit in memory.
+    rows_per_process = -(-state_count // process_count)
+    for index in range(state_count):
+        process, row = divmod(index, rows_per_process)
+        yield (
+            "\\Device\\HarddiskVolume3\\Programs\\program%d.exe" % process,
+            "Document %d" % (row * title_count // rows_per_process),
+            RECTANGLES[row % len(RECTANGLES)],
+        ), 1000 + index % 997 * 37
+
+
+def synthetic_timeline(process_count: int = REPORT_PROCESSES) -> RollupRing:
+    timeline = RollupRing(3600000, 24)
+    for process in range(process_count):
+        timeline.add("\\Device\\HarddiskVolume3\\Programs\\program%d.exe" % process, 0, 24 * 3600000)
+    return timeline
+
+
+def test_generate_reports(benchmark):
+    # Both reports, from streaming the session rows into the aggregates to writing the documents.
+    timeline = synthetic_timeline()
+
+    def generate():
+        summaries = summarize_session(synthetic_session(REPORT_STATES))
+        outputs = StringIO(), StringIO()
+        render_json(summaries, outputs[0], timeline=timeline, time_end=24 * 3600000)
+        render_html(summaries, outputs[1], timeline=timeline, time_end=24 * 3600000)
+        return outputs
+
+    json_output, html_output = benchmark.pedantic(generate, rounds=1, iterations=1)
+    assert json_output.getvalue().count("program") == REPORT_PROCESSES
+    assert "Last 24 hours" in html_output.getvalue()
+
+
+def test_report_memory_is_bounded():
+    # Ten times the states must not need noticeably more memory, since only the per process aggregates are kept.
+    def peak_memory(state_count: int) -> int:
+        start()
+        try:
+            render_html(summarize_session(synthetic_session(state_count, 10)), StringIO(), time_end=0)
+            return get_traced_memory()[1]
+        finally:
+            stop()
+
+    assert peak_memory(100_000) < peak_memory(10_000) * 1.5
@@ -0,0 +1,71 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from secrets import token_hex
+
+import pytest
+
+from helpers.rectangle import rectangle_from_positions
+from helpers.snapshot import SnapshotPublisher, SnapshotReader
+from helpers.window import WindowCapture, WindowState
+
+pytest.importorskip("pytest_benchmark")
+
+RECTANGLE = rectangle_from_positions(0, 0, 800, 600)
+
+
+@pytest.fixture
+def snapshot_name():
+    return "screentime-benchmark-%s" % token_hex(4)
+
+
+def publish(publisher: SnapshotPublisher, process_count: int):
+    for process in range(process_count):
+        capture = WindowCapture(1, "\\Device\\HarddiskVolume3\\Programs\\program%d.exe" % process, "Open", RECTANGLE, 0)
+        publisher.capture_opened(capture)
+        publisher.capture_closed(capture, WindowState("Open", RECTANGLE, 1000))
+
+
+@pytest.mark.parametrize("process_count", [10, 100, 1024])
+def test_read_snapshot(benchmark, snapshot_name, process_count):
+    publisher = SnapshotPublisher(snapshot_name, capacity=1024)
+    reader = SnapshotReader(snapshot_name)
+    try:
+        publish(publisher, process_count)
+        _, records = benchmark(reader.read)
+        assert len(records) == process_count
+    finally:
+        reader.close()
+        publisher.close()
+
+
+def test_publish_state(benchmark, snapshot_name):
+    # The cost a capture that opens and closes adds to the tracker once its process has a record.
+    publisher = SnapshotPublisher(snapshot_name, capacity=1024)
+    try:
+        publish(publisher, 100)
+        capture = WindowCapture(1, "\\Device\\HarddiskVolume3\\Programs\\program0.exe", "Open", RECTANGLE, 0)
+        state = WindowState("Open", RECTANGLE, 1000)
+
+        def publish_state():
+            publisher.capture_opened(capture)
+            publisher.capture_closed(capture, state)
+
+        benchmark(publish_state)
+    finally:
+        publisher.close()
@@ -0,0 +1,43 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import ctypes
+
+if not hasattr(ctypes, "windll"):
+    # Function bindings are only resolved on first use, so stand-ins for the Windows only parts of ctypes are enough
+    # for every module to import elsewhere. Tests replace the functions they need with fakes.
+    class _UnavailableFunction:
+        def __init__(self, name: str):
+            self.name = name
+            self.restype = None
+            self.argtypes = None
+
+        def __call__(self, *arguments):
+            raise OSError("%s is not available outside of Windows" % self.name)
+
+    class _UnavailableLibrary:
+        def __getattr__(self, name: str) -> _UnavailableFunction:
+            return _UnavailableFunction(name)
+
+    class _UnavailableLibraries:
+        def __getattr__(self, name: str) -> _UnavailableLibrary:
+            return _UnavailableLibrary()
+
+    ctypes.windll = _UnavailableLibraries()
+    ctypes.HRESULT = ctypes.c_long
+    ctypes.WINFUNCTYPE = ctypes.CFUNCTYPE
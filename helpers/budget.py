@@ -0,0 +1,203 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from argparse import ArgumentTypeError
+from asyncio import TimerHandle
+from datetime import datetime, time as day_time
+from heapq import heappush, heappop
+from time import time
+from typing import Callable, Optional
+
+from helpers.window import CaptureListener, WindowCapture, WindowState
+
+
+def now_milliseconds() -> int:
+    return round(time() * 1000)
+
+
+def day_start_milliseconds(milliseconds: int) -> int:
+    local_day = datetime.fromtimestamp(milliseconds / 1000).date()
+    return round(datetime.combine(local_day, day_time()).timestamp() * 1000)
+
+
+def process_file_name(process: str) -> str:
+    return process.split("\\")[-1].lower()
+
+
+class _ProcessBudget:
+    __slots__ = ("thresholds", "next_threshold", "used", "open_handles", "active_since", "version")
+
+    def __init__(self, thresholds: tuple[int, ...]):
+        self.thresholds = thresholds
+        self.next_threshold = 0
+        # Time used today while the process had a window open, up until its last window closed.
+        self.used = 0
+        # The windows of the process that are open now, and when the first of them started counting.
+        self.open_handles: set[int] = set()
+        self.active_since = 0
+        # Bumped whenever the deadline is recomputed, so stale entries in the deadline heap can be recognised.
+        self.version = 0
+
+    def used_at(self, now: int) -> int:
+        return self.used + (max(0, now - self.active_since) if self.open_handles else 0)
+
+    def deadline(self, now: int) -> Optional[int]:
+        """
+        The exact time the next threshold is crossed if nothing changes, or None when it can't be crossed.
+        """
+        if self.next_threshold >= len(self.thresholds) or not self.open_handles:
+            return None
+        # Time is counted once however many windows of the process are open, like a clock on the wall.
+        return now + max(0, self.thresholds[self.next_threshold] - self.used_at(now))
+
+
+class BudgetEngine(CaptureListener):
+    """
+    Raises an alert when a process crosses one of its daily time budgets. Instead of re-evaluating every rule on every
+    event, each event only updates the process it belongs to and recomputes that process's next deadline. A heap keeps
+    the deadlines, and a single timer is armed for the earliest one.
+
+    The rules map executable file names (case insensitive) to their thresholds in milliseconds. A process uses its
+    budget while any of its windows is open, so two windows open side by side for an hour use one hour of it.
+    """
+
+    def __init__(
+            self,
+            rules: dict[str, tuple[int, ...]],
+            schedule: Callable[[float, Callable[[], None]], TimerHandle],
+            on_exceeded: Callable[[str, int], None],
+            clock: Callable[[], int] = now_milliseconds
+    ):
+        self.rules = {name.lower(): tuple(sorted(thresholds)) for name, thresholds in rules.items()}
+        self.schedule = schedule
+        self.on_exceeded = on_exceeded
+        self.clock = clock
+        self._budgets: dict[str, Optional[_ProcessBudget]] = {}
+        self._deadlines: list[tuple[int, int, str]] = []
+        self._timer: Optional[TimerHandle] = None
+        self._timer_deadline: Optional[int] = None
+        self._day_start = day_start_milliseconds(clock())
+
+    def _budget(self, process: str) -> Optional[_ProcessBudget]:
+        # Which rule applies to a process is only worked out the first time it is seen.
+        if process not in self._budgets:
+            thresholds = self.rules.get(process_file_name(process))
+            self._budgets[process] = _ProcessBudget(thresholds) if thresholds else None
+        return self._budgets[process]
+
+    def capture_opened(self, capture: WindowCapture):
+        budget = self._budget(capture.process)
+        if budget is None:
+            return
+        now = self._roll_day()
+        if not budget.open_handles:
+            budget.active_since = max(capture.time_start, self._day_start)
+        budget.open_handles.add(capture.handle)
+        self._reschedule(capture.process, budget, now)
+
+    def capture_closed(self, capture: WindowCapture, state: WindowState):
+        budget = self._budget(capture.process)
+        if budget is None or capture.handle not in budget.open_handles:
+            return
+        now = self._roll_day()
+        budget.open_handles.remove(capture.handle)
+        if not budget.open_handles:
+            budget.used += max(0, capture.time_start + state.duration - budget.active_since)
+        self._reschedule(capture.process, budget, now)
+
+    def captures_finalized(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _roll_day(self) -> int:
+        now = self.clock()
+        day_start = day_start_milliseconds(now)
+        if day_start != self._day_start:
+            # A new day starts every budget over. Open captures count from midnight onwards.
+            self._day_start = day_start
+            self._deadlines.clear()
+            for process, budget in self._budgets.items():
+                if budget is None:
+                    continue
+                budget.used = 0
+                budget.next_threshold = 0
+                budget.active_since = day_start
+                self._reschedule(process, budget, now, arm=False)
+            self._arm_timer(now)
+        return now
+
+    def _reschedule(self, process: str, budget: _ProcessBudget, now: int, arm: bool = True):
+        budget.version += 1
+        deadline = budget.deadline(now)
+        if deadline is not None:
+            heappush(self._deadlines, (deadline, budget.version, process))
+        if arm:
+            self._arm_timer(now)
+
+    def _arm_timer(self, now: int):
+        # Drop deadlines that were superseded since they were pushed.
+        while self._deadlines:
+            deadline, version, process = self._deadlines[0]
+            if self._budgets[process].version == version:
+                break
+            heappop(self._deadlines)
+
+        next_deadline = self._deadlines[0][0] if self._deadlines else None
+        if next_deadline == self._timer_deadline:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._timer_deadline = next_deadline
+        if next_deadline is not None:
+            self._timer = self.schedule(max(0, next_deadline - now) / 1000, self._expire)
+
+    def _expire(self):
+        self._timer = None
+        self._timer_deadline = None
+        now = self._roll_day()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, version, process = heappop(self._deadlines)
+            budget = self._budgets[process]
+            if budget.version != version:
+                continue
+
+            used = budget.used_at(now)
+            while budget.next_threshold < len(budget.thresholds) and used >= budget.thresholds[budget.next_threshold]:
+                self.on_exceeded(process, budget.thresholds[budget.next_threshold])
+                budget.next_threshold += 1
+            self._reschedule(process, budget, now, arm=False)
+        self._arm_timer(now)
+
+
+def parse_budget(text: str) -> tuple[str, tuple[int, ...]]:
+    """
+    Parses a budget such as "chrome.exe=1,2.5" into the file name and its thresholds in milliseconds. Used as the type
+    of the --budget argument, so a malformed budget is reported as a usage error.
+    """
+    name, separator, hours = text.partition("=")
+    if not separator or not name.strip():
+        raise ArgumentTypeError("expected NAME=HOURS, such as chrome.exe=2, got %r" % text)
+    try:
+        thresholds = tuple(float(value) for value in hours.split(","))
+    except ValueError:
+        raise ArgumentTypeError("expected hours such as 2 or 1,2.5 after %s=, got %r" % (name.strip(), hours))
+    if not all(0 < threshold <= 24 for threshold in thresholds):
+        raise ArgumentTypeError("the hours of %s must be more than 0 and at most 24, got %r" % (name.strip(), hours))
+    return name.strip(), tuple(round(threshold * 3600000) for threshold in thresholds)
@@ -0,0 +1,136 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from time import time
+
+from helpers.window import CaptureListener, WindowCapture, WindowState
+
+# pyarrow is only needed when exporting, so the tracker keeps working without it.
+try:
+    import pyarrow
+    from pyarrow import ipc, parquet
+except ImportError:
+    pyarrow = None
+
+# Number of states buffered before they are written out as one row group (or record batch).
+DEFAULT_ROW_GROUP_SIZE = 64 * 1024
+
+
+def _schema():
+    dictionary_string = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    return pyarrow.schema([
+        ("handle", pyarrow.uint64()),
+        ("process", dictionary_string),
+        ("title", dictionary_string),
+        ("left", pyarrow.int32()),
+        ("top", pyarrow.int32()),
+        ("right", pyarrow.int32()),
+        ("bottom", pyarrow.int32()),
+        ("time_start", pyarrow.timestamp("ms", tz="UTC")),
+        ("duration", pyarrow.int64()),
+    ])
+
+
+class ColumnarExporter(CaptureListener):
+    """
+    Streams closed states to a Parquet file (when the path ends with .parquet) or an Arrow IPC stream otherwise.
+    States are buffered column by column and written every row_group_size rows, so memory use is bounded by the row
+    group size rather than by the length of the session.
+
+    A Parquet file can only be read once its footer is written when it is closed. With rollover, every call to
+    rollover closes the current file and the next states go to a new one named after the time it was started, so a
+    tracker that runs for weeks and then dies only loses the file it was writing. An Arrow IPC stream can be read up to
+    its last complete batch, so rollover only flushes it.
+    """
+
+    def __init__(self, path: str, row_group_size: int = DEFAULT_ROW_GROUP_SIZE, rollover: bool = False):
+        if pyarrow is None:
+            raise ImportError("pyarrow is required to export columnar session data")
+
+        self.path = path
+        self.row_group_size = row_group_size
+        self.parts: list[str] = []
+        self._parquet = path.endswith(".parquet")
+        self._rollover = rollover and self._parquet
+        self._schema = _schema()
+        self._columns: dict[str, list] = {name: [] for name in self._schema.names}
+        self._writer = None
+        if not self._rollover:
+            self._writer = self._open(path)
+
+    def _open(self, path: str):
+        if self._parquet:
+            return parquet.ParquetWriter(path, self._schema, use_dictionary=["process", "title"])
+        return ipc.new_stream(path, self._schema)
+
+    def _open_part(self):
+        # Parts are only started once they have something to hold, so a quiet day doesn't leave empty files behind.
+        part_path = "%s-%d.parquet" % (self.path[:-len(".parquet")], round(time() * 1000))
+        self.parts.append(part_path)
+        return self._open(part_path)
+
+    def capture_closed(self, capture: WindowCapture, state: WindowState):
+        columns = self._columns
+        columns["handle"].append(capture.handle)
+        columns["process"].append(capture.process)
+        columns["title"].append(state.title)
+        columns["left"].append(state.rectangle.left)
+        columns["top"].append(state.rectangle.top)
+        columns["right"].append(state.rectangle.right)
+        columns["bottom"].append(state.rectangle.bottom)
+        columns["time_start"].append(capture.time_start)
+        columns["duration"].append(state.duration)
+        if len(columns["handle"]) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self._columns["handle"]:
+            return
+
+        arrays = []
+        for schema_field in self._schema:
+            values = self._columns[schema_field.name]
+            if pyarrow.types.is_dictionary(schema_field.type):
+                # Each batch carries its own dictionary, so repeated processes and titles are stored once per batch.
+                arrays.append(pyarrow.array(values, pyarrow.string()).dictionary_encode())
+            else:
+                arrays.append(pyarrow.array(values, schema_field.type))
+        if self._writer is None:
+            self._writer = self._open_part()
+        self._writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=self._schema))
+
+        for values in self._columns.values():
+            values.clear()
+
+    def rollover(self):
+        """
+        Writes out the buffered states and, with rollover, finishes the current file.
+        """
+        self.flush()
+        if self._rollover and self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def captures_finalized(self):
+        self.close()
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -0,0 +1,201 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+from dataclasses import dataclass, field
+from heapq import merge
+from json import dumps, loads
+from time import perf_counter
+from typing import Iterable, Iterator, Optional
+
+from helpers.rectangle import Rectangle, rectangle_from_positions
+from helpers.session import SessionKey, session_rows, session_sort_key, read_session, write_session_rows
+from helpers.window import WindowResult
+
+
+@dataclass(frozen=True)
+class CompactionStatistics:
+    """
+    Counts of the rows and bytes read and written by a single run of compact_sessions.
+    """
+    input_files: int = field(hash=True)
+    input_rows: int = field(hash=True)
+    input_bytes: int = field(hash=True)
+    output_rows: int = field(hash=True)
+    output_bytes: int = field(hash=True)
+    seconds: float = field(hash=True)
+
+    @property
+    def ratio(self) -> float:
+        return self.input_bytes / self.output_bytes if self.output_bytes else 0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.input_rows / self.seconds if self.seconds else 0
+
+
+def coarse_rectangle(duration: int, width_duration: int, area_duration: int) -> Rectangle:
+    """
+    Stands in for every rectangle a title was shown in. It has their time weighted average width, and a height that
+    keeps their time weighted average area, so reports on coarse sessions still have the right screen area.
+    """
+    if not duration:
+        return Rectangle()
+    width = round(width_duration / duration)
+    height = round(area_duration / duration / width) if width else 0
+    return rectangle_from_positions(0, 0, width, height)
+
+
+def merge_session_rows(
+        sources: Iterable[Iterable[tuple[SessionKey, int]]],
+        coarse: bool = False
+) -> Iterator[tuple[SessionKey, int]]:
+    """
+    Merges sorted session rows into one sorted stream, summing the durations of rows with the same key. Only one row
+    per source is held at a time. When coarse, each title of a process becomes one row, whose rectangle is made by
+    coarse_rectangle from the rectangles it was shown in.
+    """
+    merged = merge(*sources, key=lambda row: session_sort_key(row[0]))
+    previous_key = None
+    previous_sort_key = None
+    total = width_duration = area_duration = 0
+
+    def merged_row() -> tuple[SessionKey, int]:
+        if not coarse:
+            return previous_key, total
+        process, title, _ = previous_key
+        return (process, title, coarse_rectangle(total, width_duration, area_duration)), total
+
+    for (process, title, rectangle), duration in merged:
+        key = (process, title, Rectangle() if coarse else rectangle)
+        if key != previous_key:
+            sort_key = session_sort_key(key)
+            if previous_sort_key is not None and sort_key < previous_sort_key:
+                raise ValueError("session rows are not sorted, %r comes after %r" % (key, previous_key))
+            if previous_key is not None:
+                yield merged_row()
+            previous_key, previous_sort_key = key, sort_key
+            total = width_duration = area_duration = 0
+
+        total += duration
+        if coarse:
+            width_duration += rectangle.width * duration
+            area_duration += rectangle.area * duration
+
+    if previous_key is not None:
+        yield merged_row()
+
+
+def merge_session(path: str, results: Iterable[WindowResult], generation: Optional[int] = None):
+    """
+    Adds the results to the session file, summing the durations of rows it already has, and records the generation
+    of the checkpoint when there is one. The file is streamed, so only the new rows are held in memory. A file that
+    doesn't exist yet is created.
+    """
+    sources = [session_rows(results)]
+    if os.path.exists(path):
+        sources.append(read_session(path))
+    write_session_rows(path, merge_session_rows(sources), generation)
+
+
+class _RowCounter:
+    def __init__(self):
+        self.rows = 0
+
+    def count(self, rows: Iterable[tuple[SessionKey, int]]) -> Iterator[tuple[SessionKey, int]]:
+        for row in rows:
+            self.rows += 1
+            yield row
+
+
+def _write_manifest(path: str, manifest: dict):
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        file.write(dumps(manifest))
+    os.replace(temporary_path, path)
+
+
+def compact_sessions(
+        inputs: list[str],
+        output: str,
+        batch_size: int = 16,
+        coarse: bool = False
+) -> CompactionStatistics:
+    """
+    Merges the session files into a single session file, a batch of files at a time.
+
+    Progress is kept in a manifest beside the output. Each batch is merged with the previous partial result into a
+    new generation, which only becomes current once the manifest points at it. When a run is interrupted, running it
+    again with the same output skips the files that were already merged, and none are ever counted twice.
+    """
+    manifest_path = output + ".manifest"
+    manifest = {"generation": 0, "merged": []}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as file:
+            manifest = loads(file.read())
+
+    def generation_path(generation: int) -> str:
+        return "%s.partial-%d" % (output, generation)
+
+    # A run that stopped between writing the manifest and removing the generation before it leaves that one behind.
+    if manifest["generation"] > 1 and os.path.exists(generation_path(manifest["generation"] - 1)):
+        os.remove(generation_path(manifest["generation"] - 1))
+    # A run that stopped between moving the final generation into place and removing the manifest left it as the
+    # output, so it is moved back to be merged with the rest.
+    if manifest["generation"] and not os.path.exists(generation_path(manifest["generation"])):
+        os.replace(output, generation_path(manifest["generation"]))
+
+    merged = set(manifest["merged"])
+    pending = [path for path in dict.fromkeys(inputs) if path not in merged]
+
+    counter = _RowCounter()
+    input_bytes = 0
+    output_rows = 0
+    time_start = perf_counter()
+    for batch_start in range(0, len(pending), batch_size):
+        batch = pending[batch_start:batch_start + batch_size]
+        generation = manifest["generation"]
+        previous_path = generation_path(generation) if generation else None
+
+        # The previous generation is already merged, so its rows aren't counted as input again.
+        sources = [counter.count(read_session(path)) for path in batch]
+        if previous_path is not None:
+            sources.append(read_session(previous_path))
+        input_bytes += sum(os.path.getsize(path) for path in batch)
+
+        rows = _RowCounter()
+        write_session_rows(generation_path(generation + 1), rows.count(merge_session_rows(sources, coarse)))
+        output_rows = rows.rows
+
+        manifest = {"generation": generation + 1, "merged": manifest["merged"] + batch}
+        _write_manifest(manifest_path, manifest)
+        if previous_path is not None:
+            os.remove(previous_path)
+
+    if manifest["generation"]:
+        os.replace(generation_path(manifest["generation"]), output)
+        os.remove(manifest_path)
+
+    return CompactionStatistics(
+        input_files=len(pending),
+        input_rows=counter.rows,
+        input_bytes=input_bytes,
+        output_rows=output_rows,
+        output_bytes=os.path.getsize(output) if os.path.exists(output) else 0,
+        seconds=perf_counter() - time_start,
+    )
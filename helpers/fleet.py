@@ -0,0 +1,246 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from asyncio import StreamReader, StreamWriter, CancelledError, open_connection, start_server, sleep, wait_for, \
+    IncompleteReadError
+from asyncio.base_events import Server
+from asyncio.exceptions import TimeoutError as WaitTimeoutError
+from base64 import b64encode, b64decode
+from dataclasses import dataclass, field
+from json import dumps, loads
+from secrets import token_hex
+from socket import gethostname
+from struct import Struct
+from typing import Optional
+from zlib import compress, decompress
+
+from helpers.sketch import HyperLogLog
+from helpers.window import CaptureListener, WindowCapture, WindowState
+
+# Every batch is sent as a 4 byte big endian length followed by the zlib compressed JSON payload.
+FRAME_HEADER = Struct(">I")
+MAX_FRAME_LENGTH = 64 * 1024 * 1024
+
+# Sent back by the collector once a batch has been merged.
+ACKNOWLEDGEMENT = b"\x06"
+
+
+@dataclass
+class ProcessAggregate:
+    """
+    Mergeable summary of a process: how many states were recorded, their total duration, the sum of area multiplied
+    by duration, and a sketch of the distinct titles.
+    """
+    visits: int = 0
+    duration: int = 0
+    area_duration: int = 0
+    titles: HyperLogLog = field(default_factory=HyperLogLog)
+
+    def add(self, title: str, area: int, duration: int):
+        self.visits += 1
+        self.duration += duration
+        self.area_duration += area * duration
+        self.titles.add(title)
+
+    def merge(self, other: "ProcessAggregate"):
+        self.visits += other.visits
+        self.duration += other.duration
+        self.area_duration += other.area_duration
+        self.titles.merge(other.titles)
+
+
+@dataclass(frozen=True)
+class FleetBatch:
+    """
+    The aggregates a sink sends at once. Batches are numbered per run of a sink, so the collector can tell a batch that
+    is sent again, because its acknowledgement was lost, from a new one.
+    """
+    machine: str = field(hash=True)
+    session: str = field(hash=True)
+    sequence: int = field(hash=True)
+    processes: dict[str, ProcessAggregate] = field(hash=False, compare=False)
+
+
+def encode_batch(batch: FleetBatch) -> bytes:
+    payload = {
+        "machine": batch.machine,
+        "session": batch.session,
+        "sequence": batch.sequence,
+        "processes": {
+            process: [
+                aggregate.visits,
+                aggregate.duration,
+                aggregate.area_duration,
+                aggregate.titles.precision,
+                b64encode(aggregate.titles.registers).decode("ascii"),
+            ]
+            for process, aggregate in batch.processes.items()
+        },
+    }
+    data = compress(dumps(payload, separators=(",", ":")).encode("utf-8"))
+    return FRAME_HEADER.pack(len(data)) + data
+
+
+def decode_batch(data: bytes) -> FleetBatch:
+    payload = loads(decompress(data).decode("utf-8"))
+    aggregates = {}
+    for process, (visits, duration, area_duration, precision, registers) in payload["processes"].items():
+        aggregates[process] = ProcessAggregate(
+            visits=visits,
+            duration=duration,
+            area_duration=area_duration,
+            titles=HyperLogLog(precision, b64decode(registers))
+        )
+    return FleetBatch(
+        machine=payload["machine"],
+        session=payload["session"],
+        sequence=payload["sequence"],
+        processes=aggregates
+    )
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "localhost", int(port)
+
+
+class FleetSink(CaptureListener):
+    """
+    Aggregates closed states per process and ships them to a collector in batches every interval seconds, from a task
+    on the capture loop started with run. A single connection is kept open and reused between batches. A batch that
+    isn't acknowledged within the timeout is sent again as it is, before any newer aggregates, until it is. The
+    collector may have merged it already, so it uses the batch's sequence number to merge it only once.
+    """
+
+    def __init__(self, address: tuple[str, int], machine: Optional[str] = None, interval: float = 60, timeout=10):
+        self.address = address
+        self.machine = machine or gethostname()
+        self.interval = interval
+        self.timeout = timeout
+        self._pending: dict[str, ProcessAggregate] = {}
+        # Identifies this run of the sink, since sequence numbers start over with every run.
+        self._session = token_hex(8)
+        self._sequence = 0
+        self._unacknowledged: Optional[bytes] = None
+        self._reader: Optional[StreamReader] = None
+        self._writer: Optional[StreamWriter] = None
+
+    def capture_closed(self, capture: WindowCapture, state: WindowState):
+        aggregate = self._pending.get(capture.process)
+        if aggregate is None:
+            aggregate = self._pending[capture.process] = ProcessAggregate()
+        aggregate.add(state.title, state.rectangle.area, state.duration)
+
+    async def run(self):
+        # Sending only awaits the network, so captures keep being handled on the loop while a batch is in flight.
+        while True:
+            await sleep(self.interval)
+            await self.flush()
+
+    async def close(self):
+        # Send what was captured since the last batch, including the captures closed when finalizing.
+        await self.flush()
+        self._disconnect()
+
+    async def flush(self) -> bool:
+        if self._unacknowledged is None:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return True
+            self._sequence += 1
+            self._unacknowledged = encode_batch(FleetBatch(
+                machine=self.machine,
+                session=self._session,
+                sequence=self._sequence,
+                processes=pending
+            ))
+
+        try:
+            await wait_for(self._send(self._unacknowledged), self.timeout)
+        except (OSError, WaitTimeoutError):
+            self._disconnect()
+            return False
+        except CancelledError:
+            # The batch may have been sent in part, so the connection can't carry the next one.
+            self._disconnect()
+            raise
+        self._unacknowledged = None
+        return True
+
+    async def _send(self, frame: bytes):
+        if self._writer is None:
+            self._reader, self._writer = await open_connection(*self.address)
+        self._writer.write(frame)
+        await self._writer.drain()
+        if await self._reader.read(1) != ACKNOWLEDGEMENT:
+            raise ConnectionError("the collector did not acknowledge the batch")
+
+    def _disconnect(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+
+class FleetCollector:
+    """
+    Receives batches from any number of FleetSink instances and merges them into one aggregate per process. A batch
+    that was merged already is acknowledged again but not merged twice.
+    """
+
+    def __init__(self):
+        self.processes: dict[str, ProcessAggregate] = {}
+        self.machines: set[str] = set()
+        self.batches = 0
+        self.duplicates = 0
+        # The sequence number of the last batch merged from every run of every sink.
+        self._sequences: dict[tuple[str, str], int] = {}
+
+    def merge(self, batch: FleetBatch) -> bool:
+        # A sink only sends a batch once the one before it was acknowledged, so its batches arrive in order.
+        sink = (batch.machine, batch.session)
+        if batch.sequence <= self._sequences.get(sink, 0):
+            self.duplicates += 1
+            return False
+        self._sequences[sink] = batch.sequence
+
+        self.machines.add(batch.machine)
+        self.batches += 1
+        for process, aggregate in batch.processes.items():
+            if process in self.processes:
+                self.processes[process].merge(aggregate)
+            else:
+                self.processes[process] = aggregate
+        return True
+
+    async def handle_connection(self, reader: StreamReader, writer: StreamWriter):
+        try:
+            while True:
+                (length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+                if length > MAX_FRAME_LENGTH:
+                    break
+                self.merge(decode_batch(await reader.readexactly(length)))
+                writer.write(ACKNOWLEDGEMENT)
+                await writer.drain()
+        except (IncompleteReadError, ConnectionError):
+            # The sink disconnected, which it does whenever it stops or a send fails.
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address: tuple[str, int]) -> Server:
+        return await start_server(self.handle_connection, *address)
@@ -0,0 +1,81 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from asyncio import sleep
+from time import time
+from typing import Optional
+
+from helpers.journal import CaptureJournal
+from helpers.pipeline import CapturePipeline
+from helpers.window import evict_capture
+from winapi.user import IsWindowVisible, IsIconic
+
+
+class CaptureHeartbeat:
+    """
+    Confirms every so often that the open captures are still on screen, without enumerating windows. Each beat only
+    asks whether each captured window is still visible and not minimized, closes the captures whose hide or minimize
+    event was missed, and records the time every other capture was last seen, in the journal when there is one.
+
+    The interval adapts to activity: it drops to min_interval whenever events arrived or a capture was closed since
+    the previous beat, and doubles up to max_interval while nothing happens. When nothing is captured there is
+    nothing to bound, so the heartbeat rests at max_interval.
+    """
+
+    def __init__(
+            self,
+            pipeline: CapturePipeline,
+            journal: Optional[CaptureJournal] = None,
+            min_interval: float = 5,
+            max_interval: float = 60
+    ):
+        self.pipeline = pipeline
+        self.journal = journal
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.time_seen = round(time() * 1000)
+        self.evictions = 0
+        self._event_count = 0
+
+    async def run(self):
+        while True:
+            await sleep(self.interval)
+            self.beat()
+
+    def beat(self):
+        evictions = 0
+        for key, capture in list(self.pipeline.captures.items()):
+            if not IsWindowVisible(capture.handle) or IsIconic(capture.handle):
+                evict_capture(self.pipeline.captures, self.pipeline.states, key, self.pipeline.listeners)
+                evictions += 1
+        self.evictions += evictions
+
+        self.time_seen = round(time() * 1000)
+        if self.journal is not None:
+            self.journal.heartbeat(self.time_seen)
+
+        event_count = sum(self.pipeline.dispatcher.counts.values())
+        active = evictions or event_count != self._event_count
+        self._event_count = event_count
+        if not self.pipeline.captures:
+            self.interval = self.max_interval
+        elif active:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * 2, self.max_interval)
@@ -0,0 +1,251 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+from collections import OrderedDict
+from ctypes import create_unicode_buffer, create_string_buffer, sizeof, byref
+from ctypes.wintypes import MAX_PATH, WORD
+from hashlib import sha256
+from json import dumps, loads
+from struct import pack
+from typing import Callable, Optional
+from zlib import compress, crc32
+
+from winapi import NULL
+from winapi.gdi import GetObjectW, GetDIBits, DeleteObject, BITMAP, BITMAPINFO, BI_RGB, DIB_RGB_COLORS
+from winapi.shell import ExtractAssociatedIconW
+from winapi.user import GetIconInfoExW, ICONINFOEXW, DestroyIcon, GetDC, ReleaseDC
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+ICON_SUFFIX = ".png"
+# Remembers the icon of every image path across runs, with the time the image was last modified.
+ICON_INDEX = "index.json"
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return pack(">I", len(data)) + chunk_type + data + pack(">I", crc32(chunk_type + data))
+
+
+def encode_png(width: int, height: int, rgba: bytes) -> bytes:
+    """
+    Encodes 8 bit RGBA pixels, top row first, as a PNG image.
+    """
+    stride = width * 4
+    # Every row starts with its filter type, and no filter is used.
+    rows = b"".join(b"\x00" + rgba[row * stride:(row + 1) * stride] for row in range(height))
+    return b"".join((
+        PNG_SIGNATURE,
+        _png_chunk(b"IHDR", pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)),
+        _png_chunk(b"IDAT", compress(rows, 9)),
+        _png_chunk(b"IEND", b""),
+    ))
+
+
+def bgra_to_rgba(bgra: bytes) -> bytes:
+    rgba = bytearray(bgra)
+    rgba[0::4] = bgra[2::4]
+    rgba[2::4] = bgra[0::4]
+    # Icons from before alpha channels leave it empty, which would make them fully transparent.
+    if not any(rgba[3::4]):
+        rgba[3::4] = b"\xff" * (len(rgba) // 4)
+    return bytes(rgba)
+
+
+def extract_process_icon(path: str) -> Optional[bytes]:
+    """
+    Extracts the icon associated with an executable as PNG bytes, or None when it has no colour icon.
+    """
+    # The path buffer may be written to, so it is given the full length the function expects.
+    buffer_path = create_unicode_buffer(path, MAX_PATH)
+    icon_index = WORD(0)
+    icon = ExtractAssociatedIconW(NULL, buffer_path, byref(icon_index))
+    if not icon:
+        return None
+
+    try:
+        icon_info = ICONINFOEXW()
+        icon_info.cbSize = sizeof(ICONINFOEXW)
+        if not GetIconInfoExW(icon, byref(icon_info)):
+            return None
+
+        try:
+            # Monochrome icons only have a mask.
+            if not icon_info.hbmColor:
+                return None
+            bitmap = BITMAP()
+            if not GetObjectW(icon_info.hbmColor, sizeof(BITMAP), byref(bitmap)):
+                return None
+            width, height = bitmap.bmWidth, bitmap.bmHeight
+
+            # Ask for 32 bit pixels, with a negative height so the rows come top row first.
+            bitmap_info = BITMAPINFO()
+            bitmap_info.bmiHeader.biSize = sizeof(bitmap_info.bmiHeader)
+            bitmap_info.bmiHeader.biWidth = width
+            bitmap_info.bmiHeader.biHeight = -height
+            bitmap_info.bmiHeader.biPlanes = 1
+            bitmap_info.bmiHeader.biBitCount = 32
+            bitmap_info.bmiHeader.biCompression = BI_RGB
+            pixels = create_string_buffer(width * height * 4)
+
+            device_context = GetDC(NULL)
+            try:
+                lines = GetDIBits(
+                    device_context, icon_info.hbmColor, 0, height, pixels, byref(bitmap_info), DIB_RGB_COLORS
+                )
+            finally:
+                ReleaseDC(NULL, device_context)
+            if lines != height:
+                return None
+            return encode_png(width, height, bgra_to_rgba(pixels.raw))
+        finally:
+            if icon_info.hbmColor:
+                DeleteObject(icon_info.hbmColor)
+            if icon_info.hbmMask:
+                DeleteObject(icon_info.hbmMask)
+    finally:
+        DestroyIcon(icon)
+
+
+def image_time_modified(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class IconCache:
+    """
+    Caches process icons as PNG files named after the SHA-256 of their contents, so processes sharing an icon share
+    a file. Each image path is handed to the extractor at most once while its icon is cached, including paths that
+    have no icon. Files are evicted least recently used first once the cache holds more than max_bytes.
+
+    The digest of every image path is kept in an index beside the icons, written by save, so later runs only extract
+    the icons of images they haven't seen or that were modified since.
+    """
+
+    def __init__(
+            self,
+            directory: str,
+            max_bytes: int = 8 * 1024 * 1024,
+            extractor: Callable[[str], Optional[bytes]] = extract_process_icon
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.extractor = extractor
+        # Maps each image path to when the image was last modified and the digest of its icon.
+        self._paths: dict[str, tuple[Optional[int], Optional[str]]] = {}
+        self._paths_changed = False
+        self._sizes: OrderedDict[str, int] = OrderedDict()
+        self._size_total = 0
+
+        # Icons left by earlier runs are kept, oldest first so they are the first to go.
+        os.makedirs(directory, exist_ok=True)
+        entries = [entry for entry in os.scandir(directory) if entry.name.endswith(ICON_SUFFIX) and entry.is_file()]
+        for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+            size = entry.stat().st_size
+            self._sizes[entry.name[:-len(ICON_SUFFIX)]] = size
+            self._size_total += size
+
+        try:
+            with open(self.index_path(), "r", encoding="utf-8") as file:
+                paths = loads(file.read())
+        except (OSError, ValueError):
+            paths = {}
+        # Icons that were evicted, or removed by hand, are extracted again.
+        for path, (time_modified, digest) in paths.items():
+            if digest is None or digest in self._sizes:
+                self._paths[path] = (time_modified, digest)
+
+    def file_path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest + ICON_SUFFIX)
+
+    def index_path(self) -> str:
+        return os.path.join(self.directory, ICON_INDEX)
+
+    def digest(self, path: str) -> Optional[str]:
+        """
+        Returns the digest of the icon of the image path, extracting and storing it the first time, or None when the
+        path has no icon.
+        """
+        time_modified = image_time_modified(path)
+        entry = self._paths.get(path)
+        if entry is not None and entry[0] == time_modified:
+            digest = entry[1]
+            if digest is not None:
+                self._sizes.move_to_end(digest)
+            return digest
+
+        icon = self.extractor(path)
+        digest = sha256(icon).hexdigest() if icon is not None else None
+        self._paths[path] = (time_modified, digest)
+        self._paths_changed = True
+        if digest is not None:
+            self._store(digest, icon)
+        return digest
+
+    def read(self, path: str) -> Optional[bytes]:
+        """
+        Returns the PNG bytes of the icon of the image path, or None when the path has no icon.
+        """
+        digest = self.digest(path)
+        if digest is None:
+            return None
+        with open(self.file_path(digest), "rb") as file:
+            return file.read()
+
+    def save(self):
+        """
+        Writes the index of image paths, if it changed since it was read.
+        """
+        if not self._paths_changed:
+            return
+        temporary_path = self.index_path() + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(dumps(self._paths))
+        os.replace(temporary_path, self.index_path())
+        self._paths_changed = False
+
+    def _store(self, digest: str, icon: bytes):
+        if digest in self._sizes:
+            self._sizes.move_to_end(digest)
+            return
+
+        file_path = self.file_path(digest)
+        temporary_path = file_path + ".tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(icon)
+        os.replace(temporary_path, file_path)
+        self._sizes[digest] = len(icon)
+        self._size_total += len(icon)
+        self._evict(keep=digest)
+
+    def _evict(self, keep: str):
+        while self._size_total > self.max_bytes and len(self._sizes) > 1:
+            digest, size = next(iter(self._sizes.items()))
+            if digest == keep:
+                break
+            del self._sizes[digest]
+            self._size_total -= size
+            try:
+                os.remove(self.file_path(digest))
+            except FileNotFoundError:
+                pass
+            # Paths that shared the evicted icon are extracted again if they are asked for.
+            for path in [path for path, (_, path_digest) in self._paths.items() if path_digest == digest]:
+                del self._paths[path]
+                self._paths_changed = True
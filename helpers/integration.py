@@ -0,0 +1,77 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from typing import Optional
+
+from helpers.window import CaptureListener, WindowCapture, WindowState
+
+
+class AreaIntegral:
+    """
+    The integral of screen area over time for a set of states: the total duration, the rectangle area multiplied by
+    duration, and the visible area multiplied by duration.
+    """
+    __slots__ = ("duration", "area_duration", "visible_area_duration")
+
+    def __init__(self):
+        self.duration = 0
+        self.area_duration = 0
+        self.visible_area_duration = 0
+
+    def add(self, area: int, visible_area_duration: int, duration: int):
+        self.duration += duration
+        self.area_duration += area * duration
+        self.visible_area_duration += visible_area_duration
+
+    @property
+    def average_area(self) -> int:
+        return self.area_duration // self.duration if self.duration else 0
+
+    @property
+    def average_visible_area(self) -> int:
+        return self.visible_area_duration // self.duration if self.duration else 0
+
+
+class ScreenAreaIntegrator(CaptureListener):
+    """
+    Integrates the screen area of every process over time as captures close. Each closed state adds its area multiplied
+    by its duration, and its visible area integrated over the changes seen while it was open, so time weighted averages
+    and shares are exact and can be read at any time without going back over the states.
+    """
+
+    def __init__(self):
+        self.processes: dict[str, AreaIntegral] = {}
+        self.total = AreaIntegral()
+
+    def capture_closed(self, capture: WindowCapture, state: WindowState):
+        integral = self.processes.get(capture.process)
+        if integral is None:
+            integral = self.processes[capture.process] = AreaIntegral()
+        area = state.rectangle.area
+        visible_area_duration = capture.integrate_visible_area(capture.time_start + state.duration)
+        integral.add(area, visible_area_duration, state.duration)
+        self.total.add(area, visible_area_duration, state.duration)
+
+    def integral(self, process: str) -> Optional[AreaIntegral]:
+        return self.processes.get(process)
+
+    def share_visible_area(self, process: str) -> float:
+        integral = self.processes.get(process)
+        if integral is None or not self.total.visible_area_duration:
+            return 0
+        return integral.visible_area_duration / self.total.visible_area_duration
@@ -0,0 +1,277 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+from json import dumps, loads
+from queue import SimpleQueue, Empty
+from threading import Thread
+from time import time, sleep
+from typing import Iterable, Optional
+
+from helpers.rectangle import rectangle_from_positions
+from helpers.window import CaptureListener, WindowCapture, WindowState, WindowResult
+
+# Tells the writer thread to commit what it has and stop.
+_STOP = None
+
+
+def format_journal_record(record: tuple) -> str:
+    operation = record[0]
+    if operation == "open":
+        _, capture = record
+        rectangle = capture.rectangle
+        return dumps({
+            "op": "open",
+            "handle": capture.handle,
+            "process": capture.process,
+            "title": capture.title,
+            "rectangle": [rectangle.left, rectangle.top, rectangle.right, rectangle.bottom],
+            "time_start": capture.time_start,
+        }) + "\n"
+    if operation == "state":
+        # A state that closed before the journal was rotated and was not saved yet.
+        _, (handle, process), state = record
+        rectangle = state.rectangle
+        return dumps({
+            "op": "state",
+            "handle": handle,
+            "process": process,
+            "title": state.title,
+            "rectangle": [rectangle.left, rectangle.top, rectangle.right, rectangle.bottom],
+            "duration": state.duration,
+        }) + "\n"
+    if operation == "close":
+        _, capture, duration = record
+        return dumps({
+            "op": "close",
+            "handle": capture.handle,
+            "process": capture.process,
+            "time_start": capture.time_start,
+            "duration": duration,
+        }) + "\n"
+    if operation == "checkpoint":
+        _, generation = record
+        return dumps({"op": "checkpoint", "generation": generation}) + "\n"
+    _, time_seen = record
+    return dumps({"op": operation, "time": time_seen}) + "\n"
+
+
+class CaptureJournal(CaptureListener):
+    """
+    A write-ahead journal of every capture that is opened and closed, so the captures that were open when the tracker
+    died can be recovered with recover_journal.
+
+    Listeners are called on the event loop, so they only queue records. A writer thread takes everything that queued
+    up within commit_interval seconds and commits it with a single write and fsync, and adds a heartbeat when nothing
+    was committed for heartbeat_interval seconds. Recovery closes open captures at the last committed time, so at most
+    that long is lost when the tracker dies.
+
+    A checkpoint marks its generation in the journal when it takes the capture state, and the session file it saves
+    records the same generation, so recovery knows which part of the journal was saved even when the tracker died
+    right after saving. Once the checkpoint is saved, rotate starts a fresh journal that only holds what is not saved
+    yet, so the journal doesn't grow for as long as the tracker runs.
+    """
+
+    def __init__(self, path: str, commit_interval: float = 0.5, heartbeat_interval: float = 30):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.commits = 0
+        self.records = 0
+        self.rotations = 0
+        self._queue: SimpleQueue[Optional[tuple]] = SimpleQueue()
+        self._file = open(path, "w", encoding="utf-8")
+        self._thread = Thread(target=self._run, name="CaptureJournal", daemon=True)
+        self._thread.start()
+
+    def capture_opened(self, capture: WindowCapture):
+        self._queue.put(("open", capture))
+
+    def capture_closed(self, capture: WindowCapture, state: WindowState):
+        self._queue.put(("close", capture, state.duration))
+
+    def heartbeat(self, time_seen: int):
+        self._queue.put(("heartbeat", time_seen))
+
+    def checkpoint(self, generation: int):
+        """
+        Marks that everything recorded so far goes into the checkpoint of this generation.
+        """
+        self._queue.put(("checkpoint", generation))
+
+    def rotate(
+            self,
+            generation: int,
+            captures: Iterable[WindowCapture],
+            states: dict[tuple[int, str], set[WindowState]]
+    ):
+        """
+        Replaces the journal, once the checkpoint of this generation is saved, with one that starts from the open
+        captures and the states that closed since. Everything queued before the rotation is committed to the old
+        journal first.
+        """
+        # The capture state keeps changing on the event loop, so the writer gets a copy of it.
+        self._queue.put((
+            "rotate", generation, tuple(captures), [(key, tuple(value)) for key, value in states.items()]
+        ))
+
+    def captures_finalized(self):
+        self.close()
+
+    def close(self):
+        """
+        Commits the queued records and stops the writer. The journal is kept until the results it covers are saved.
+        """
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._file.close()
+
+    def discard(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                first_record = self._queue.get(timeout=self.heartbeat_interval)
+            except Empty:
+                # Nothing happened for a while, which is only known for sure if it is written down.
+                first_record = ("heartbeat", round(time() * 1000))
+
+            records = []
+            if first_record is _STOP:
+                stopping = True
+            else:
+                records.append(first_record)
+                # Give the rest of a burst time to arrive so it shares the commit.
+                sleep(self.commit_interval)
+
+            while not stopping:
+                try:
+                    record = self._queue.get_nowait()
+                except Empty:
+                    break
+                if record is _STOP:
+                    stopping = True
+                else:
+                    records.append(record)
+
+            if records:
+                self._commit(records)
+
+    def _commit(self, records: list[tuple]):
+        batch = []
+        for record in records:
+            if record[0] == "rotate":
+                self._write(batch)
+                batch = []
+                self._rotate(record)
+            else:
+                batch.append(record)
+        self._write(batch)
+
+    def _write(self, records: list[tuple]):
+        if not records:
+            return
+        self._file.write("".join(map(format_journal_record, records)))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.commits += 1
+        self.records += len(records)
+
+    def _rotate(self, record: tuple):
+        _, generation, captures, states = record
+        # The fresh journal is complete before it replaces the old one, so a crash leaves one or the other.
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(format_journal_record(("checkpoint", generation)))
+            file.write("".join(
+                format_journal_record(("state", key, state)) for key, key_states in states for state in key_states
+            ))
+            file.write("".join(format_journal_record(("open", capture)) for capture in captures))
+            file.flush()
+            os.fsync(file.fileno())
+        # Windows can't replace a file that is still open.
+        self._file.close()
+        os.replace(temporary_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self.rotations += 1
+
+
+def recover_journal(path: str, saved_generation: Optional[int] = None) -> frozenset[WindowResult]:
+    """
+    Rebuilds the results of the run that wrote the journal. Captures that were never closed are closed at the last
+    time the journal is known to have been alive: its last heartbeat, or the last capture it recorded. A record torn
+    by the crash ends the journal.
+
+    With the generation of the last checkpoint that was saved, only what that checkpoint is missing is recovered:
+    everything before its mark in the journal is left out, and a checkpoint newer than every mark in the journal
+    already has all of it.
+    """
+    open_captures: dict[tuple[int, str, int], dict] = {}
+    states: dict[tuple[int, str], set[WindowState]] = {}
+    time_alive = 0
+    generation = None
+
+    def add_state(record: dict, duration: int):
+        states.setdefault((record["handle"], record["process"]), set()).add(WindowState(
+            title=record["title"],
+            rectangle=rectangle_from_positions(*record["rectangle"]),
+            duration=duration
+        ))
+
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = loads(line)
+            except ValueError:
+                break
+
+            operation = record["op"]
+            if operation == "open":
+                open_captures[(record["handle"], record["process"], record["time_start"])] = record
+                time_alive = max(time_alive, record["time_start"])
+            elif operation == "close":
+                opened = open_captures.pop((record["handle"], record["process"], record["time_start"]), None)
+                if opened is not None:
+                    add_state(opened, record["duration"])
+                time_alive = max(time_alive, record["time_start"] + record["duration"])
+            elif operation == "state":
+                add_state(record, record["duration"])
+            elif operation == "checkpoint":
+                generation = record["generation"]
+                if saved_generation is not None and generation <= saved_generation:
+                    # Every state closed so far was saved with that checkpoint, which reopened the open captures.
+                    states.clear()
+            else:
+                time_alive = max(time_alive, record["time"])
+
+    if saved_generation is not None and generation is not None and saved_generation > generation:
+        # The checkpoint was taken after the last record that made it into the journal.
+        return frozenset()
+
+    for record in open_captures.values():
+        add_state(record, max(0, time_alive - record["time_start"]))
+
+    return frozenset(
+        WindowResult(handle=handle, process=process, states=frozenset(value))
+        for (handle, process), value in states.items()
+    )
@@ -0,0 +1,45 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from helpers.window import CaptureListener, WindowCapture, WindowState
+from winapi.user import GetAncestor, GA_ROOT
+
+
+class WindowLifecycleIndex(CaptureListener):
+    """
+    Indexes the open captures by window handle, so events about a single window (destroyed, hidden, shown) can be
+    answered in constant time instead of with a scan.
+    """
+
+    def __init__(self):
+        self.open_windows: dict[int, tuple[int, str]] = {}
+
+    def capture_opened(self, capture: WindowCapture):
+        self.open_windows[capture.handle] = (capture.handle, capture.process)
+
+    def capture_closed(self, capture: WindowCapture, state: WindowState):
+        # A window that changed is closed and then reopened, so only forget it if nothing replaced it yet.
+        if self.open_windows.get(capture.handle) == (capture.handle, capture.process):
+            del self.open_windows[capture.handle]
+
+    def __contains__(self, handle: int) -> bool:
+        return handle in self.open_windows
+
+
+def is_top_level_window(handle: int) -> bool:
+    return GetAncestor(handle, GA_ROOT) == handle
@@ -0,0 +1,100 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from ctypes import create_unicode_buffer
+from ctypes.wintypes import MAX_PATH
+from math import inf
+from time import monotonic
+from typing import Callable, Optional
+
+from winapi.kernel import GetLogicalDriveStringsW, QueryDosDeviceW
+
+DEVICE_PREFIX = "\\Device\\"
+
+
+def query_volume_devices() -> dict[str, str]:
+    """
+    Maps the NT device of every mounted drive letter to that drive, e.g. \\Device\\HarddiskVolume3 to C:.
+    """
+    # Each drive takes 4 characters ("C:\" and a null), so this fits every letter of the alphabet.
+    buffer_drives_length = 26 * 4 + 1
+    buffer_drives = create_unicode_buffer(buffer_drives_length)
+    drives_length = GetLogicalDriveStringsW(buffer_drives_length, buffer_drives)
+
+    devices = {}
+    buffer_device = create_unicode_buffer(MAX_PATH + 1)
+    for drive in buffer_drives[:drives_length].split("\0"):
+        if not drive:
+            continue
+        drive = drive.rstrip("\\")
+        if QueryDosDeviceW(drive, buffer_device, MAX_PATH + 1):
+            devices[buffer_device.value] = drive
+    return devices
+
+
+class DevicePathMap:
+    """
+    Translates NT device paths (as returned by GetProcessImageFileNameW) into DOS paths. The volume table is queried
+    once and refreshed when a path names a device that is not in it, at most once every refresh_interval seconds.
+    Every translated path is cached, so normalizing a path that was seen before is a single dictionary lookup. Paths
+    that could not be translated are not, so they are translated once their volume is mounted.
+    """
+
+    def __init__(
+            self,
+            query_volumes: Callable[[], dict[str, str]] = query_volume_devices,
+            refresh_interval: float = 30.0
+    ):
+        self.query_volumes = query_volumes
+        self.refresh_interval = refresh_interval
+        self._devices: dict[str, str] = {}
+        self._paths: dict[str, str] = {}
+        self._refreshed_at = -inf
+
+    def refresh(self):
+        self._devices = self.query_volumes()
+        self._paths.clear()
+        self._refreshed_at = monotonic()
+
+    def normalize(self, path: str) -> str:
+        normalized_path = self._paths.get(path)
+        if normalized_path is not None:
+            return normalized_path
+
+        normalized_path = self._translate(path)
+        if normalized_path is None and monotonic() - self._refreshed_at >= self.refresh_interval:
+            # The device is unknown, so a volume was most likely mounted since the table was built.
+            self.refresh()
+            normalized_path = self._translate(path)
+
+        # Paths on devices without a drive letter (network shares, unmounted volumes) are kept as they are for now.
+        if normalized_path is None:
+            return path
+        self._paths[path] = normalized_path
+        return normalized_path
+
+    def _translate(self, path: str) -> Optional[str]:
+        if not path.startswith(DEVICE_PREFIX):
+            return path
+
+        device_end = path.find("\\", len(DEVICE_PREFIX))
+        device = path if device_end == -1 else path[:device_end]
+        drive = self._devices.get(device)
+        if drive is None:
+            return None
+        return drive + path[len(device):]
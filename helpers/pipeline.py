@@ -0,0 +1,301 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from asyncio import AbstractEventLoop, Queue, Future, Task, FIRST_COMPLETED, create_task, wait, wrap_future
+from collections import Counter
+from concurrent import futures
+from ctypes import pointer
+from ctypes.wintypes import MSG
+from dataclasses import dataclass
+from threading import Thread
+from typing import Callable, Iterable, Optional
+
+from helpers.lifecycle import WindowLifecycleIndex, is_top_level_window
+from helpers.policy import CapturePolicy, DEFAULT_POLICY
+from helpers.process import ProcessNameResolver
+from helpers.spatial import SpatialIndex
+from helpers.window import CaptureListener, WindowCapture, WindowState, WindowResult, update_capture_state, \
+    finalize_capture_state, evict_capture, retitle_capture, window_title, PROCESS_NAMES, SCREEN_INDEX
+from winapi import NULL
+from winapi.kernel import GetCurrentThreadId
+from winapi.user import SetWinEventHook, EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_MINIMIZEEND, WINEVENT_OUTOFCONTEXT, \
+    WINEVENT_SKIPOWNPROCESS, GetMessageW, TranslateMessage, DispatchMessageW, UnhookWinEvent, WINEVENTPROC, \
+    PostThreadMessageW, WM_QUIT, EVENT_OBJECT_CREATE, EVENT_OBJECT_DESTROY, EVENT_OBJECT_SHOW, EVENT_OBJECT_HIDE, \
+    OBJID_WINDOW, CHILDID_SELF, EVENT_SYSTEM_MINIMIZESTART, EVENT_SYSTEM_MOVESIZEEND, EVENT_OBJECT_NAMECHANGE
+
+EVENT_NAMES = {
+    EVENT_SYSTEM_FOREGROUND: "EVENT_SYSTEM_FOREGROUND",
+    EVENT_SYSTEM_MOVESIZEEND: "EVENT_SYSTEM_MOVESIZEEND",
+    EVENT_SYSTEM_MINIMIZESTART: "EVENT_SYSTEM_MINIMIZESTART",
+    EVENT_SYSTEM_MINIMIZEEND: "EVENT_SYSTEM_MINIMIZEEND",
+    EVENT_OBJECT_CREATE: "EVENT_OBJECT_CREATE",
+    EVENT_OBJECT_DESTROY: "EVENT_OBJECT_DESTROY",
+    EVENT_OBJECT_SHOW: "EVENT_OBJECT_SHOW",
+    EVENT_OBJECT_HIDE: "EVENT_OBJECT_HIDE",
+    EVENT_OBJECT_NAMECHANGE: "EVENT_OBJECT_NAMECHANGE",
+}
+
+
+@dataclass(frozen=True)
+class WinEvent:
+    """
+    A single event received by a WinEvent hook.
+    """
+    event: int
+    handle: int
+    id_object: int
+    id_child: int
+    time: int
+
+
+# A handler applies an event and returns whether the windows need to be scanned again.
+WinEventHandler = Callable[[WinEvent], bool]
+
+
+class WinEventDispatcher:
+    """
+    Routes every event to the handler registered for its type and counts the events received per type. The hooks
+    only cover the registered types, so nothing else is ever delivered.
+    """
+
+    def __init__(self):
+        self.handlers: dict[int, WinEventHandler] = {}
+        self.counts: Counter[int] = Counter()
+
+    def register(self, handler: WinEventHandler, *events: int):
+        for event in events:
+            self.handlers[event] = handler
+
+    def event_ranges(self) -> list[tuple[int, int]]:
+        """
+        Returns the smallest set of event ranges that covers exactly the registered events, one hook per range.
+        """
+        event_ranges = []
+        for event in sorted(self.handlers):
+            if event_ranges and event_ranges[-1][1] == event - 1:
+                event_ranges[-1] = (event_ranges[-1][0], event)
+            else:
+                event_ranges.append((event, event))
+        return event_ranges
+
+    def dispatch(self, event: WinEvent) -> bool:
+        self.counts[event.event] += 1
+        handler = self.handlers.get(event.event)
+        return handler(event) if handler is not None else False
+
+    def named_counts(self) -> dict[str, int]:
+        return {EVENT_NAMES.get(event, "0x%04X" % event): count for event, count in self.counts.most_common()}
+
+
+class WinEventPump:
+    """
+    Runs the Windows message loop on a dedicated thread and forwards every hooked event into an asyncio queue.
+    The hook only fires on the thread that created it, and that thread has to keep pumping messages, so this is the one
+    thread the tracker keeps blocked no matter how many stages consume the events.
+    """
+
+    def __init__(
+            self,
+            event_loop: AbstractEventLoop,
+            queue: Queue,
+            event_ranges: Iterable[tuple[int, int]]
+    ):
+        self._event_loop = event_loop
+        self._queue = queue
+        self._event_ranges = tuple(event_ranges)
+        self._thread = Thread(target=self._run, name="WinEventPump", daemon=True)
+        self._thread_id: Optional[int] = None
+        self._started: Optional[Future] = None
+
+    async def start(self) -> bool:
+        """
+        Starts the pump thread and returns whether the event hook could be created.
+        """
+        self._started = self._event_loop.create_future()
+        self._thread.start()
+        return await self._started
+
+    def stop(self):
+        # Tell the message queue in the other thread that it can stop now, then wait for it to unhook.
+        if self._thread_id is not None:
+            PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+            self._thread.join()
+
+    def _run(self):
+        # The annotation is important so Python knows its a callback function using Windows calling procedures.
+        @WINEVENTPROC
+        def win_event_hook_callback(hook, event, hwnd, id_object, id_child, dw_event_thread, dw_event_time):
+            # Object events fire for every caret, cursor and control. Only the windows themselves are interesting,
+            # and dropping the rest here keeps them from ever waking up the event loop.
+            if event >= EVENT_OBJECT_CREATE and (id_object != OBJID_WINDOW or id_child != CHILDID_SELF):
+                return
+            self._event_loop.call_soon_threadsafe(
+                self._queue.put_nowait,
+                WinEvent(event, hwnd or NULL, id_object, id_child, dw_event_time)
+            )
+
+        # Attempt to create the event hooks.
+        # They must be created within the same thread as the message queue receiver for the callback to be fired.
+        event_hook_handles = []
+        for event_min, event_max in self._event_ranges:
+            event_hook_handle = SetWinEventHook(
+                event_min,
+                event_max,
+                NULL,
+                win_event_hook_callback,
+                0,
+                0,
+                WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+            )
+
+            # Determine if the hook was created successfully.
+            if event_hook_handle == 0:
+                for created_handle in event_hook_handles:
+                    UnhookWinEvent(created_handle)
+                self._event_loop.call_soon_threadsafe(self._started.set_result, False)
+                return
+            event_hook_handles.append(event_hook_handle)
+
+        self._thread_id = GetCurrentThreadId()
+        self._event_loop.call_soon_threadsafe(self._started.set_result, True)
+
+        # Read all readily available messages from the queue.
+        # Loops forever until it receives a WM_QUIT message.
+        message_pointer = pointer(MSG())
+        while GetMessageW(message_pointer, NULL, 0, 0):
+            TranslateMessage(message_pointer)
+            DispatchMessageW(message_pointer)
+
+        # Unhook the event handlers.
+        for event_hook_handle in event_hook_handles:
+            UnhookWinEvent(event_hook_handle)
+
+
+class CapturePipeline:
+    """
+    Owns the capture state and turns queued events into capture updates on the event loop. Every other stage
+    (aggregation, persistence, serving) either listens to the captures or runs as its own task on the same loop, so
+    none of them needs a thread or a lock of its own.
+    """
+
+    def __init__(
+            self,
+            listeners: Iterable[CaptureListener] = (),
+            policy: CapturePolicy = DEFAULT_POLICY,
+            title_transform: Optional[Callable[[str], str]] = None,
+            process_names: ProcessNameResolver = PROCESS_NAMES,
+            screen_index: SpatialIndex = SCREEN_INDEX
+    ):
+        self.policy = policy
+        self.title_transform = title_transform
+        self.process_names = process_names
+        self.screen_index = screen_index
+        self._rescan: Optional[Task] = None
+        self.captures: dict[tuple[int, str], WindowCapture] = {}
+        self.states: dict[tuple[int, str], set[WindowState]] = {}
+        self.windows = WindowLifecycleIndex()
+        self.listeners = [self.windows, *listeners]
+        self.events: Queue[WinEvent] = Queue()
+
+        # Each event type gets its own narrow hook and its own handler.
+        self.dispatcher = WinEventDispatcher()
+        self.dispatcher.register(
+            self.handle_visibility_changed,
+            EVENT_SYSTEM_FOREGROUND,
+            EVENT_SYSTEM_MOVESIZEEND,
+            EVENT_SYSTEM_MINIMIZESTART,
+            EVENT_SYSTEM_MINIMIZEEND
+        )
+        self.dispatcher.register(self.handle_window_gone, EVENT_OBJECT_DESTROY, EVENT_OBJECT_HIDE)
+        self.dispatcher.register(self.handle_window_shown, EVENT_OBJECT_SHOW)
+        self.dispatcher.register(self.handle_name_changed, EVENT_OBJECT_NAMECHANGE)
+
+    async def run(self):
+        self.scan()
+        while True:
+            scan_required = self.dispatcher.dispatch(await self.events.get())
+
+            # Events tend to arrive in bursts (minimize, then foreground), and one scan covers all of them.
+            while not self.events.empty():
+                scan_required |= self.dispatcher.dispatch(self.events.get_nowait())
+
+            if scan_required:
+                self.scan()
+
+    def scan(self):
+        update_capture_state(
+            self.captures,
+            self.states,
+            self.listeners,
+            self.policy,
+            self.title_transform,
+            self.process_names,
+            self.screen_index
+        )
+
+        # Windows whose process lookup timed out were left out. Rather than waiting for an unrelated event to bring them
+        # in, scan again as soon as their lookups finish.
+        pending = self.process_names.pending
+        if pending and self._rescan is None:
+            self._rescan = create_task(self._scan_when_resolved(pending))
+
+    async def _scan_when_resolved(self, lookups: list[futures.Future]):
+        await wait([wrap_future(lookup) for lookup in lookups], return_when=FIRST_COMPLETED)
+        self._rescan = None
+        self.scan()
+
+    def handle_visibility_changed(self, _event: WinEvent) -> bool:
+        # Foreground changes, moves and minimizes can change any window's visible area.
+        return True
+
+    def handle_window_gone(self, event: WinEvent) -> bool:
+        # The window is gone, so its capture can be closed without looking at any other window. It no longer covers the
+        # windows below it either, even if it was never captured.
+        self.screen_index.remove(event.handle)
+        key = self.windows.open_windows.get(event.handle)
+        if key is not None:
+            evict_capture(self.captures, self.states, key, self.listeners)
+        return False
+
+    def handle_window_shown(self, event: WinEvent) -> bool:
+        # Showing a window that is already captured changes nothing, and neither does showing a child window.
+        return event.handle not in self.windows and is_top_level_window(event.handle)
+
+    def handle_name_changed(self, event: WinEvent) -> bool:
+        # Only the titles of captured windows are recorded, and updating one doesn't affect any other window.
+        key = self.windows.open_windows.get(event.handle)
+        if key is None:
+            # A window left out for its title may have been given one that is allowed.
+            return self.policy.filters_titles and is_top_level_window(event.handle)
+        title = window_title(event.handle)
+        if title is None:
+            return False
+        if self.policy.allows_title(title):
+            if self.title_transform is not None:
+                title = self.title_transform(title)
+            retitle_capture(self.captures, self.states, key, title, self.listeners)
+        else:
+            evict_capture(self.captures, self.states, key, self.listeners)
+        return False
+
+    def finalize(self) -> frozenset[WindowResult]:
+        if self._rescan is not None:
+            self._rescan.cancel()
+            self._rescan = None
+        self.process_names.close()
+        return finalize_capture_state(self.captures, self.states, self.listeners)
@@ -0,0 +1,143 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import re
+from fnmatch import translate
+from json import loads
+from typing import Iterable, Optional, Pattern
+
+IGNORED_CLASS_NAMES = frozenset(
+    {
+        "Shell_TrayWnd",
+        "Internet Explorer_Hidden",
+        "Progman",
+        "WorkerW",
+    }
+)
+
+GLOBAL_FLAGS = re.compile(r"^\(\?([aiLmsux]+)\)")
+
+
+def combined_pattern(patterns: Iterable[str], flags: int = 0) -> Optional[Pattern]:
+    """
+    Compiles the patterns into a single regular expression that matches when any of them does, or None when there are
+    no patterns. Each pattern is grouped on its own, so one pattern's alternatives can't swallow the next.
+    """
+    groups = []
+    for pattern in patterns:
+        # Flags such as (?i) apply to a whole expression and must lead it, so they are scoped to their own pattern.
+        global_flags = GLOBAL_FLAGS.match(pattern)
+        if global_flags is not None:
+            groups.append("(?%s:%s)" % (global_flags.group(1), pattern[global_flags.end():]))
+        else:
+            groups.append("(?:%s)" % pattern)
+    if not groups:
+        return None
+    return re.compile("|".join(groups), flags)
+
+
+class CapturePolicy:
+    """
+    Decides which windows are captured, by class name, title and process image path. Windows are excluded when any
+    exclude rule matches, and when there are include rules of a kind, a window must match one of them too.
+
+    Every kind of rule is compiled into a single matcher: class names into a set, titles into one regular expression,
+    and path globs into one case insensitive regular expression. A regular expression still tries its rules one after
+    another, so the title and path decisions are remembered: per path, since the same few processes own nearly every
+    window, and per title for up to title_cache_size titles, since every scan sees mostly the same titles again. Only
+    a title or path met for the first time costs more with more rules.
+    """
+
+    def __init__(
+            self,
+            exclude_class_names: Iterable[str] = (),
+            include_class_names: Iterable[str] = (),
+            exclude_titles: Iterable[str] = (),
+            include_titles: Iterable[str] = (),
+            exclude_paths: Iterable[str] = (),
+            include_paths: Iterable[str] = (),
+            title_cache_size: int = 4096
+    ):
+        self.exclude_class_names = frozenset(exclude_class_names)
+        self.include_class_names = frozenset(include_class_names)
+        self.exclude_titles = combined_pattern(exclude_titles)
+        self.include_titles = combined_pattern(include_titles)
+        self.exclude_paths = combined_pattern(map(translate, exclude_paths), re.IGNORECASE)
+        self.include_paths = combined_pattern(map(translate, include_paths), re.IGNORECASE)
+        self._path_decisions: dict[str, bool] = {}
+        self._title_decisions: dict[str, bool] = {}
+        self.title_cache_size = title_cache_size
+
+    @property
+    def filters_titles(self) -> bool:
+        return self.exclude_titles is not None or self.include_titles is not None
+
+    def allows_class_name(self, class_name: str) -> bool:
+        if class_name in self.exclude_class_names:
+            return False
+        return not self.include_class_names or class_name in self.include_class_names
+
+    def allows_title(self, title: str) -> bool:
+        decision = self._title_decisions.get(title)
+        if decision is None:
+            # Unlike paths, titles keep changing, so the decisions are forgotten now and then to bound their memory.
+            if len(self._title_decisions) >= self.title_cache_size:
+                self._title_decisions.clear()
+            decision = self._title_decisions[title] = (
+                (self.exclude_titles is None or not self.exclude_titles.search(title))
+                and (self.include_titles is None or self.include_titles.search(title) is not None)
+            )
+        return decision
+
+    def allows_path(self, path: str) -> bool:
+        decision = self._path_decisions.get(path)
+        if decision is None:
+            decision = self._path_decisions[path] = (
+                (self.exclude_paths is None or not self.exclude_paths.match(path))
+                and (self.include_paths is None or self.include_paths.match(path) is not None)
+            )
+        return decision
+
+
+DEFAULT_POLICY = CapturePolicy(exclude_class_names=IGNORED_CLASS_NAMES)
+
+
+def load_policy(path: str) -> CapturePolicy:
+    """
+    Loads a policy from a JSON file such as:
+
+        {
+            "exclude": {"class_names": ["ConsoleWindowClass"], "titles": ["(?i)private"]},
+            "include": {"paths": ["C:\\\\Program Files\\\\*"]}
+        }
+
+    The default ignored class names are always excluded. Titles are regular expressions searched anywhere in the
+    title, and paths are globs matched against the whole image path.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        config = loads(file.read())
+    exclude = config.get("exclude", {})
+    include = config.get("include", {})
+    return CapturePolicy(
+        exclude_class_names=IGNORED_CLASS_NAMES | frozenset(exclude.get("class_names", ())),
+        include_class_names=include.get("class_names", ()),
+        exclude_titles=exclude.get("titles", ()),
+        include_titles=include.get("titles", ()),
+        exclude_paths=exclude.get("paths", ()),
+        include_paths=include.get("paths", ()),
+    )
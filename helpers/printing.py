@@ -1,39 +1,85 @@
-def pretty_print_result(
+from typing import Optional
+
+
+def pretty_duration(duration: int) -> str:
+    seconds = (duration / 1000) % 60
+    minutes = int((duration / 60000) % 60)
+    minutes_string = ("%d minutes " % minutes if minutes != 0 else "")
+    hours = int((duration / 3600000) % 24)
+    hours_string = ("%d hours " % hours if hours != 0 else "")
+    days = int(duration / 86400000)
+    days_string = ("%d days " % days if days != 0 else "")
+    return "%s%s%s%.1f seconds" % (days_string, hours_string, minutes_string, seconds)
+
+
+def format_labeled_values(labeled_values: dict[str, str]) -> str:
+    # Get the largest label
+    spacing_count = 2
+    max_length_label = 0
+    for key in labeled_values.keys():
+        if len(key) > max_length_label:
+            max_length_label = len(key)
+    max_length_label += spacing_count
+
+    # Format the results
+    lines = []
+    for key, value in labeled_values.items():
+        required_length_gain = max_length_label - len(key)
+        spacer_string = " " * required_length_gain
+        lines.append(f"{key}:{spacer_string}{value}\n")
+    lines.append("\n")
+    return "".join(lines)
+
+
+def pretty_print_labeled_values(labeled_values: dict[str, str]):
+    print(format_labeled_values(labeled_values), end="")
+
+
+def format_result(
         process: str,
-        titles: set[str],
+        top_titles: list[str],
+        distinct_titles: int,
         gross_active_time: int,
         share_active_time: float,
         average_screen_area: int,
-        share_screen_area: float
-):
-    def pretty_duration(duration: int) -> str:
-        seconds = (duration / 1000) % 60
-        minutes = int((duration / 60000) % 60)
-        minutes_string = ("%d minutes " % minutes if minutes != 0 else "")
-        hours = int((duration / 3600000) % 24)
-        hours_string = ("%d hours " % hours if hours != 0 else "")
-        return "%s%s%.1f seconds" % (hours_string, minutes_string, seconds)
+        share_screen_area: float,
+        median_state_time: int,
+        high_state_time: int,
+        average_visible_area: Optional[int] = None,
+        share_visible_area: Optional[float] = None
+) -> str:
+    titles_string = ", ".join(map(lambda s: "\"%s\"" % s, top_titles))
+    if distinct_titles > len(top_titles):
+        titles_string += " and about {:,} more".format(distinct_titles - len(top_titles))
 
     labeled_values = {
         "Program": "%s" % process.split("\\")[-1],
-        ("Titles" if len(titles) > 1 else "Title"): ", ".join(map(lambda s: "\"%s\"" % s, titles)),
+        ("Titles" if distinct_titles > 1 else "Title"): titles_string,
         "Gross Active Time": pretty_duration(gross_active_time),
         "Share Active Time": "%.2f percent" % (share_active_time * 100),
+        "Median State Time": pretty_duration(median_state_time),
+        "95th Percentile State Time": pretty_duration(high_state_time),
         "Average Screen Area": "{:,} pixels squared".format(average_screen_area),
         "Share Screen Area": "%.2f percent" % (share_screen_area * 100),
     }
+    if average_visible_area is not None:
+        labeled_values["Average Visible Area"] = "{:,} pixels squared".format(average_visible_area)
+    if share_visible_area is not None:
+        labeled_values["Share Visible Area"] = "%.2f percent" % (share_visible_area * 100)
+    return format_labeled_values(labeled_values)
 
-    # Get the largest label
-    spacing_count = 2
-    max_length_label = 0
-    for key in labeled_values.keys():
-        if len(key) > max_length_label:
-            max_length_label = len(key)
-    max_length_label += spacing_count
 
-    # Print the results
-    for key, value in labeled_values.items():
-        required_length_gain = max_length_label - len(key)
-        spacer_string = " " * required_length_gain
-        print(f"{key}:{spacer_string}{value}")
-    print("")
\ No newline at end of file
+def pretty_print_aggregate(
+        process: str,
+        distinct_titles: int,
+        gross_active_time: int,
+        share_active_time: float,
+        average_screen_area: int
+):
+    pretty_print_labeled_values({
+        "Program": "%s" % process.split("\\")[-1],
+        "Distinct Titles": "about {:,}".format(distinct_titles),
+        "Gross Active Time": pretty_duration(gross_active_time),
+        "Share Active Time": "%.2f percent" % (share_active_time * 100),
+        "Average Screen Area": "{:,} pixels squared".format(average_screen_area),
+    })
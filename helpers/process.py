@@ -0,0 +1,170 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from concurrent.futures import Future, TimeoutError as LookupTimeoutError
+from ctypes import create_unicode_buffer
+from ctypes.wintypes import MAX_PATH
+from queue import SimpleQueue, Empty
+from threading import Thread
+from time import monotonic
+from typing import Callable, Iterable, Optional
+
+from winapi.kernel import OpenProcess, PROCESS_QUERY_LIMITED_INFORMATION, GetProcessImageFileNameW, CloseHandle
+
+
+def query_process_image_name(process_id: int) -> Optional[str]:
+    # Retrieve the process handle
+    process_handle = OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, process_id)
+    if not process_handle:
+        # TODO: debug for when this fails?
+        return None
+
+    # Read the process's file name
+    try:
+        process_file_name_buffer_length = MAX_PATH + 1
+        process_file_name_buffer = create_unicode_buffer(process_file_name_buffer_length)
+        GetProcessImageFileNameW(process_handle, process_file_name_buffer, process_file_name_buffer_length)
+        return process_file_name_buffer.value
+    finally:
+        CloseHandle(process_handle)
+
+
+class _DaemonExecutor:
+    """
+    Runs calls on a fixed number of daemon threads. ThreadPoolExecutor joins its threads when the interpreter exits,
+    even after shutdown, so a lookup stuck in a system call would keep the tracker from ever exiting.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        self._queue: SimpleQueue[Optional[tuple]] = SimpleQueue()
+        self._threads = [
+            Thread(target=self._run, name="%s_%d" % (thread_name_prefix, number), daemon=True)
+            for number in range(max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, function: Callable, *arguments) -> Future:
+        future = Future()
+        self._queue.put((future, function, arguments))
+        return future
+
+    def shutdown(self):
+        """
+        Cancels the calls that have not started and lets the threads stop once they are done with the rest, without
+        waiting for them.
+        """
+        while True:
+            try:
+                work = self._queue.get_nowait()
+            except Empty:
+                break
+            if work is not None:
+                work[0].cancel()
+        for _ in self._threads:
+            self._queue.put(None)
+
+    def _run(self):
+        while True:
+            work = self._queue.get()
+            if work is None:
+                return
+            future, function, arguments = work
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = function(*arguments)
+            except BaseException as error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+class ProcessNameResolver:
+    """
+    Resolves process ids to image file names. Names are remembered for as long as their process id keeps being seen,
+    so a scan only looks up (and normalizes) processes it has not met before. Those are looked up concurrently on a
+    small pool, and a lookup that does not finish within the timeout is skipped until the next scan. Such lookups keep
+    running and are listed by pending, so the caller can scan again as soon as they finish. Lookups that raise leave
+    their process unresolved.
+    """
+
+    def __init__(
+            self,
+            lookup: Callable[[int], Optional[str]] = query_process_image_name,
+            normalize: Callable[[str], str] = None,
+            max_workers: int = 4,
+            timeout: float = 0.25
+    ):
+        self.lookup = lookup
+        self.normalize = normalize
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._names: dict[int, Optional[str]] = {}
+        self._executor: Optional[_DaemonExecutor] = None
+        self._lookups: dict[int, Future] = {}
+
+    @property
+    def pending(self) -> list[Future]:
+        return list(self._lookups.values())
+
+    def resolve(self, process_ids: Iterable[int]) -> dict[int, Optional[str]]:
+        process_ids = set(process_ids)
+
+        # Forget processes that are no longer seen, since their ids can be reused by new processes.
+        self._names = {process_id: self._names[process_id] for process_id in process_ids if process_id in self._names}
+
+        unknown_process_ids = [process_id for process_id in process_ids if process_id not in self._names]
+        if not unknown_process_ids:
+            return self._names
+
+        if self._executor is None:
+            self._executor = _DaemonExecutor(self.max_workers, "ProcessName")
+
+        # A lookup that timed out during an earlier scan is still running, so wait on it rather than starting another.
+        self._lookups = {
+            process_id: self._lookups.get(process_id) or self._executor.submit(self.lookup, process_id)
+            for process_id in unknown_process_ids
+        }
+
+        # The lookups run side by side, so they share one deadline instead of adding their timeouts up.
+        deadline = monotonic() + self.timeout
+        for process_id, lookup in list(self._lookups.items()):
+            try:
+                error = lookup.exception(max(0.0, deadline - monotonic()))
+            except LookupTimeoutError:
+                continue
+            del self._lookups[process_id]
+
+            # A lookup that failed is treated like a process that could not be opened, rather than failing the scan.
+            name = lookup.result() if error is None else None
+
+            if name and self.normalize is not None:
+                name = self.normalize(name)
+            self._names[process_id] = name
+
+        return self._names
+
+    def close(self):
+        """
+        Stops the lookup threads. Lookups that are still running are abandoned, and a later resolve starts new threads.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._lookups = {}
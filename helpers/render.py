@@ -0,0 +1,183 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from base64 import b64encode
+from datetime import datetime
+from html import escape
+from json import dumps
+from os import replace
+from time import time
+from typing import Callable, Iterable, Optional, TextIO
+
+from helpers.icons import IconCache
+from helpers.printing import pretty_duration
+from helpers.report import ProcessSummary
+from helpers.rollup import RollupRing
+
+TIMELINE_WIDTH = 240
+TIMELINE_HEIGHT = 32
+
+HTML_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Screen time</title>
+<style>
+body { font-family: "Segoe UI", sans-serif; margin: 2em; color: #222; }
+table { border-collapse: collapse; }
+th, td { padding: 0.4em 0.8em; text-align: left; vertical-align: middle; border-bottom: 1px solid #ddd; }
+td.number { text-align: right; }
+img { width: 24px; height: 24px; }
+svg rect { fill: #3b7dd8; }
+</style>
+</head>
+<body>
+<h1>Screen time</h1>
+<p>Generated %s.</p>
+<table>
+<tr><th></th><th>Program</th><th>Active time</th><th>Share</th><th>Average area</th><th>Titles</th><th>%s</th></tr>
+"""
+
+HTML_TAIL = """</table>
+</body>
+</html>
+"""
+
+
+def summary_timeline(
+        summary: ProcessSummary,
+        timeline: Optional[RollupRing],
+        time_end: int,
+        bucket_count: int
+) -> Optional[list[int]]:
+    if timeline is None:
+        return None
+    return timeline.series(summary.process, time_end, bucket_count)
+
+
+def render_json(
+        summaries: Iterable[ProcessSummary],
+        output: TextIO,
+        timeline: Optional[RollupRing] = None,
+        bucket_count: int = 24,
+        time_end: Optional[int] = None
+):
+    """
+    Writes the summaries as a JSON document, one process at a time. With a timeline, every process also gets its
+    usage in the last bucket_count buckets of that ring, oldest first.
+    """
+    time_end = time_end if time_end is not None else round(time() * 1000)
+    output.write('{"generated": %d, "bucket_length": %s, "processes": [' % (
+        time_end, timeline.bucket_length if timeline is not None else "null"
+    ))
+    for index, summary in enumerate(summaries):
+        output.write(",\n" if index else "\n")
+        output.write(dumps({
+            "process": summary.process,
+            "top_titles": list(summary.top_titles),
+            "distinct_titles": summary.distinct_titles,
+            "gross_active_time": summary.gross_active_time,
+            "share_active_time": summary.share_active_time,
+            "average_screen_area": summary.average_screen_area,
+            "share_screen_area": summary.share_screen_area,
+            "median_state_time": summary.median_state_time,
+            "high_state_time": summary.high_state_time,
+            "average_visible_area": summary.average_visible_area,
+            "share_visible_area": summary.share_visible_area,
+            "timeline": summary_timeline(summary, timeline, time_end, bucket_count),
+        }))
+    output.write("\n]}\n")
+
+
+def format_timeline_length(length: int) -> str:
+    # Timelines cover whole hours, which read better as hours than as days, minutes and seconds.
+    hours, remainder = divmod(length, 3600000)
+    if hours and not remainder:
+        return "%d hours" % hours if hours != 1 else "hour"
+    return pretty_duration(length)
+
+
+def format_timeline_svg(series: list[int], bucket_length: int) -> str:
+    bar_width = TIMELINE_WIDTH / len(series)
+    bars = []
+    for index, usage in enumerate(series):
+        if not usage:
+            continue
+        # A bucket is full when the process was on screen for all of it, possibly in several windows at once.
+        height = max(1.0, min(1.0, usage / bucket_length) * TIMELINE_HEIGHT)
+        bars.append('<rect x="%.1f" y="%.1f" width="%.1f" height="%.1f"><title>%s</title></rect>' % (
+            index * bar_width, TIMELINE_HEIGHT - height, max(bar_width - 1, 1), height, pretty_duration(usage)
+        ))
+    return '<svg width="%d" height="%d">%s</svg>' % (TIMELINE_WIDTH, TIMELINE_HEIGHT, "".join(bars))
+
+
+def format_icon_image(process: str, icons: Optional[IconCache]) -> str:
+    if icons is None:
+        return ""
+    icon = icons.read(process)
+    if icon is None:
+        return ""
+    return '<img alt="" src="data:image/png;base64,%s">' % b64encode(icon).decode("ascii")
+
+
+def render_html(
+        summaries: Iterable[ProcessSummary],
+        output: TextIO,
+        timeline: Optional[RollupRing] = None,
+        bucket_count: int = 24,
+        time_end: Optional[int] = None,
+        icons: Optional[IconCache] = None
+):
+    """
+    Writes the summaries as a self contained HTML page, one table row per process. Icons are embedded as data URIs
+    and timelines as inline SVG, so the page has no outside dependencies.
+    """
+    time_end = time_end if time_end is not None else round(time() * 1000)
+    generated = datetime.fromtimestamp(time_end / 1000).strftime("%Y-%m-%d %H:%M")
+    timeline_heading = ""
+    if timeline is not None:
+        timeline_heading = "Last %s" % format_timeline_length(timeline.bucket_length * bucket_count)
+    output.write(HTML_HEAD % (generated, escape(timeline_heading)))
+
+    for summary in summaries:
+        series = summary_timeline(summary, timeline, time_end, bucket_count)
+        titles = ", ".join("“%s”" % title for title in summary.top_titles)
+        if summary.distinct_titles > len(summary.top_titles):
+            titles += " and about {:,} more".format(summary.distinct_titles - len(summary.top_titles))
+        output.write(
+            '<tr><td>%s</td><td title="%s">%s</td><td class="number">%s</td><td class="number">%.2f%%</td>'
+            '<td class="number">%s</td><td>%s</td><td>%s</td></tr>\n' % (
+                format_icon_image(summary.process, icons),
+                escape(summary.process),
+                escape(summary.process.split("\\")[-1]),
+                escape(pretty_duration(summary.gross_active_time)),
+                summary.share_active_time * 100,
+                "{:,} px²".format(summary.average_screen_area),
+                escape(titles),
+                format_timeline_svg(series, timeline.bucket_length) if series is not None else "",
+            )
+        )
+    output.write(HTML_TAIL)
+
+
+def write_report(path: str, render: Callable[..., None], summaries: Iterable[ProcessSummary], **options):
+    # Same as sessions: a reader never sees a half written report.
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        render(summaries, file, **options)
+    replace(temporary_path, path)
@@ -0,0 +1,218 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from array import array
+from dataclasses import dataclass, field
+from heapq import nlargest
+from sys import stdout
+from typing import Iterable, Optional, TextIO
+
+from helpers.integration import ScreenAreaIntegrator
+from helpers.printing import format_result
+from helpers.session import SessionKey
+from helpers.sketch import HyperLogLog, TopK, TDigest
+from helpers.window import WindowResult
+
+
+@dataclass(frozen=True)
+class ProcessSummary:
+    """
+    Represents the totals of every window that belonged to a single process.
+    """
+    process: str = field(hash=True)
+    top_titles: tuple[str, ...] = field(hash=True)
+    distinct_titles: int = field(hash=True)
+    gross_active_time: int = field(hash=True)
+    share_active_time: float = field(hash=True)
+    average_screen_area: int = field(hash=True)
+    share_screen_area: float = field(hash=True)
+    median_state_time: int = field(hash=True)
+    high_state_time: int = field(hash=True)
+    average_visible_area: Optional[int] = field(default=None, hash=True)
+    share_visible_area: Optional[float] = field(default=None, hash=True)
+
+
+class _ProcessTotals:
+    __slots__ = ("time", "area", "title_times", "state_times")
+
+    def __init__(self):
+        self.time = 0
+        # The area of each state multiplied by its duration.
+        self.area = 0
+        self.title_times: dict[str, int] = {}
+        self.state_times = array("q")
+
+
+def _quantile(ordered: array, q: float) -> int:
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def summarize_results(
+        results: Iterable[WindowResult],
+        limit: Optional[int] = None,
+        top_title_count: int = 5,
+        integrator: Optional[ScreenAreaIntegrator] = None
+) -> list[ProcessSummary]:
+    """
+    Groups the results by process in a single pass over their states, and returns the summaries ordered by active
+    time, longest first, cut off after limit processes.
+
+    The results are already held in memory, so the titles and percentiles are computed exactly here. The sketches in
+    helpers.sketch are meant for aggregates that are streamed or merged across machines.
+
+    Screen areas are weighted by how long each state lasted. The visible areas are only known while capturing, so they
+    are read from the integrator when one is given.
+    """
+    totals: dict[str, _ProcessTotals] = {}
+    for result in results:
+        process_totals = totals.get(result.process)
+        if process_totals is None:
+            process_totals = totals[result.process] = _ProcessTotals()
+        title_times = process_totals.title_times
+        for state in result.states:
+            title_times[state.title] = title_times.get(state.title, 0) + state.duration
+            process_totals.area += state.rectangle.area * state.duration
+        process_totals.state_times.extend(state.duration for state in result.states)
+
+    for process_totals in totals.values():
+        process_totals.time = sum(process_totals.state_times)
+    total_time_all = sum(process_totals.time for process_totals in totals.values()) or 1
+    total_area_all = sum(process_totals.area for process_totals in totals.values()) or 1
+
+    # Only the processes that make the cut are turned into summaries.
+    ordered = sorted(totals.items(), key=lambda item: item[1].time, reverse=True)[:limit]
+
+    summaries = []
+    for process, process_totals in ordered:
+        state_count = len(process_totals.state_times)
+        if not state_count:
+            continue
+        state_times = array("q", sorted(process_totals.state_times))
+        title_times = process_totals.title_times
+        integral = integrator.integral(process) if integrator is not None else None
+        summaries.append(ProcessSummary(
+            process=process,
+            top_titles=tuple(nlargest(top_title_count, title_times, key=title_times.__getitem__)),
+            distinct_titles=len(title_times),
+            gross_active_time=process_totals.time,
+            share_active_time=process_totals.time / total_time_all,
+            average_screen_area=process_totals.area // process_totals.time if process_totals.time else 0,
+            share_screen_area=process_totals.area / total_area_all,
+            median_state_time=_quantile(state_times, 0.5),
+            high_state_time=_quantile(state_times, 0.95),
+            average_visible_area=integral.average_visible_area if integral is not None else None,
+            share_visible_area=integrator.share_visible_area(process) if integral is not None else None,
+        ))
+    return summaries
+
+
+class _SessionTotals:
+    __slots__ = ("time", "area", "titles", "distinct_titles", "row_times")
+
+    def __init__(self, top_title_count: int):
+        self.time = 0
+        self.area = 0
+        # Extra counters keep the reported top titles accurate.
+        self.titles = TopK(max(32, top_title_count * 4))
+        self.distinct_titles = HyperLogLog()
+        self.row_times = TDigest()
+
+
+def summarize_session(
+        rows: Iterable[tuple[SessionKey, int]],
+        limit: Optional[int] = None,
+        top_title_count: int = 5
+) -> list[ProcessSummary]:
+    """
+    Same as summarize_results, for session rows that are streamed from files, such as read_session. The memory used
+    only grows with the number of processes: titles and durations go into fixed size sketches, so the top titles,
+    distinct titles and percentiles are estimates. A row is the total time spent in one state, so the percentiles are
+    of those totals rather than of single visits.
+    """
+    totals: dict[str, _SessionTotals] = {}
+    process_totals = None
+    previous_process = previous_title = None
+    title_time = 0
+    for (process, title, rectangle), duration in rows:
+        if process_totals is None or process != previous_process or title != previous_title:
+            # Session files are sorted, so the rows of a title are consecutive and its time is added to the sketches
+            # once. Unsorted rows are still counted correctly, just with more work.
+            if process_totals is not None:
+                process_totals.titles.add(previous_title, title_time)
+                process_totals.distinct_titles.add(previous_title)
+            process_totals = totals.get(process)
+            if process_totals is None:
+                process_totals = totals[process] = _SessionTotals(top_title_count)
+            previous_process, previous_title, title_time = process, title, 0
+        title_time += duration
+        process_totals.time += duration
+        process_totals.area += rectangle.area * duration
+        process_totals.row_times.add(duration)
+    if process_totals is not None:
+        process_totals.titles.add(previous_title, title_time)
+        process_totals.distinct_titles.add(previous_title)
+
+    total_time_all = sum(process_totals.time for process_totals in totals.values()) or 1
+    total_area_all = sum(process_totals.area for process_totals in totals.values()) or 1
+    ordered = sorted(totals.items(), key=lambda item: item[1].time, reverse=True)[:limit]
+
+    summaries = []
+    for process, process_totals in ordered:
+        top_titles = tuple(title for title, _ in process_totals.titles.top(top_title_count))
+        summaries.append(ProcessSummary(
+            process=process,
+            top_titles=top_titles,
+            distinct_titles=max(process_totals.distinct_titles.estimate(), len(top_titles)),
+            gross_active_time=process_totals.time,
+            share_active_time=process_totals.time / total_time_all,
+            average_screen_area=process_totals.area // process_totals.time if process_totals.time else 0,
+            share_screen_area=process_totals.area / total_area_all,
+            median_state_time=round(process_totals.row_times.quantile(0.5)),
+            high_state_time=round(process_totals.row_times.quantile(0.95)),
+        ))
+    return summaries
+
+
+def format_summaries(summaries: Iterable[ProcessSummary]) -> str:
+    return "".join(
+        format_result(
+            summary.process,
+            list(summary.top_titles),
+            summary.distinct_titles,
+            summary.gross_active_time,
+            summary.share_active_time,
+            summary.average_screen_area,
+            summary.share_screen_area,
+            summary.median_state_time,
+            summary.high_state_time,
+            summary.average_visible_area,
+            summary.share_visible_area
+        )
+        for summary in summaries
+    )
+
+
+def print_report(
+        results: Iterable[WindowResult],
+        limit: Optional[int] = None,
+        output: TextIO = stdout,
+        integrator: Optional[ScreenAreaIntegrator] = None
+):
+    # Write the whole report at once rather than line by line.
+    output.write(format_summaries(summarize_results(results, limit, integrator=integrator)))
+    output.flush()
@@ -0,0 +1,108 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from array import array
+from typing import Optional
+
+from helpers.window import CaptureListener, WindowCapture, WindowState
+
+MINUTE = 60 * 1000
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+
+class RollupRing:
+    """
+    Per process usage in fixed size time buckets. Each process owns a preallocated array with one slot per bucket and
+    slots are recycled as time moves forward, so the memory used never depends on how long the tracker has run.
+    """
+
+    def __init__(self, bucket_length: int, bucket_count: int):
+        self.bucket_length = bucket_length
+        self.bucket_count = bucket_count
+        # The bucket number (time // bucket_length) currently held by each slot, shared by every process.
+        self._slot_buckets = array("q", [-1]) * bucket_count
+        self._usage: dict[str, array] = {}
+
+    def add(self, process: str, time_start: int, time_end: int):
+        # Time older than the ring can hold would be recycled straight away.
+        time_start = max(time_start, time_end - self.bucket_length * self.bucket_count)
+
+        usage = self._usage.get(process)
+        if usage is None:
+            usage = self._usage[process] = array("q", [0]) * self.bucket_count
+
+        # Split the interval on bucket boundaries so each bucket only receives the portion that falls inside it.
+        while time_start < time_end:
+            bucket = time_start // self.bucket_length
+            bucket_end = min((bucket + 1) * self.bucket_length, time_end)
+            slot = self._claim_slot(bucket)
+            if slot is not None:
+                usage[slot] += bucket_end - time_start
+            time_start = bucket_end
+
+    def _claim_slot(self, bucket: int) -> Optional[int]:
+        slot = bucket % self.bucket_count
+        slot_bucket = self._slot_buckets[slot]
+        if slot_bucket == bucket:
+            return slot
+        if slot_bucket > bucket:
+            # The slot has already been recycled for a newer bucket.
+            return None
+
+        for usage in self._usage.values():
+            usage[slot] = 0
+        self._slot_buckets[slot] = bucket
+        return slot
+
+    def series(self, process: str, time_end: int, count: int) -> list[int]:
+        """
+        Returns the usage of the last count buckets up to and including the one containing time_end, oldest first.
+        """
+        usage = self._usage.get(process)
+        last_bucket = time_end // self.bucket_length
+        series = []
+        for bucket in range(last_bucket - min(count, self.bucket_count) + 1, last_bucket + 1):
+            slot = bucket % self.bucket_count
+            if usage is not None and self._slot_buckets[slot] == bucket:
+                series.append(usage[slot])
+            else:
+                series.append(0)
+        return series
+
+    def usage(self, process: str, time_end: int, count: int) -> int:
+        return sum(self.series(process, time_end, count))
+
+    def processes(self) -> frozenset[str]:
+        return frozenset(self._usage.keys())
+
+
+class Rollups(CaptureListener):
+    """
+    Maintains minute, hour and day rollups of every process as captures are closed.
+    """
+
+    def __init__(self, minutes: int = 24 * 60, hours: int = 14 * 24, days: int = 366):
+        self.minutes = RollupRing(MINUTE, minutes)
+        self.hours = RollupRing(HOUR, hours)
+        self.days = RollupRing(DAY, days)
+
+    def capture_closed(self, capture: WindowCapture, state: WindowState):
+        time_end = capture.time_start + state.duration
+        for ring in (self.minutes, self.hours, self.days):
+            ring.add(capture.process, capture.time_start, time_end)
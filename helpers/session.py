@@ -0,0 +1,98 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from json import dumps, loads
+from os import fsync, replace
+from typing import Iterable, Iterator, Optional
+
+from helpers.rectangle import Rectangle, rectangle_from_positions
+from helpers.window import WindowResult
+
+# A session row is the total duration a process spent with a given title and rectangle.
+SessionKey = tuple[str, str, Rectangle]
+
+# Checkpoints start with a line recording their generation, ahead of the rows.
+GENERATION_PREFIX = '{"generation": '
+
+
+def session_rows(results: Iterable[WindowResult]) -> list[tuple[SessionKey, int]]:
+    durations: dict[SessionKey, int] = {}
+    for result in results:
+        for state in result.states:
+            key = (result.process, state.title, state.rectangle)
+            durations[key] = durations.get(key, 0) + state.duration
+
+    # Rows are kept sorted so that several session files can be merged without loading them whole.
+    return sorted(durations.items(), key=lambda row: session_sort_key(row[0]))
+
+
+def session_sort_key(key: SessionKey) -> tuple:
+    process, title, rectangle = key
+    return process, title, rectangle.left, rectangle.top, rectangle.right, rectangle.bottom
+
+
+def format_session_row(key: SessionKey, duration: int) -> str:
+    process, title, rectangle = key
+    return dumps({
+        "process": process,
+        "title": title,
+        "rectangle": [rectangle.left, rectangle.top, rectangle.right, rectangle.bottom],
+        "duration": duration,
+    }) + "\n"
+
+
+def parse_session_row(line: str) -> tuple[SessionKey, int]:
+    row = loads(line)
+    return (row["process"], row["title"], rectangle_from_positions(*row["rectangle"])), row["duration"]
+
+
+def write_session_rows(path: str, rows: Iterable[tuple[SessionKey, int]], generation: Optional[int] = None):
+    # Write to a temporary file first so a reader (or a crash) never sees a half written session. It is flushed to
+    # disk before it replaces the old one, or losing power could leave an empty file in place of both.
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        if generation is not None:
+            file.write(dumps({"generation": generation}) + "\n")
+        for key, duration in rows:
+            file.write(format_session_row(key, duration))
+        file.flush()
+        fsync(file.fileno())
+    replace(temporary_path, path)
+
+
+def write_session(path: str, results: Iterable[WindowResult]):
+    write_session_rows(path, session_rows(results))
+
+
+def read_session(path: str) -> Iterator[tuple[SessionKey, int]]:
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip() and not line.startswith(GENERATION_PREFIX):
+                yield parse_session_row(line)
+
+
+def read_session_generation(path: str) -> int:
+    """
+    The generation of the checkpoint saved in the session file, or 0 when it has none.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            line = file.readline()
+    except FileNotFoundError:
+        return 0
+    return loads(line)["generation"] if line.startswith(GENERATION_PREFIX) else 0
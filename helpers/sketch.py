@@ -0,0 +1,195 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from hashlib import blake2b
+from math import log, nan
+
+
+def hash64(value: str) -> int:
+    return int.from_bytes(blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """
+    Estimates the number of distinct strings added to it using 2 ** precision one byte registers. Two sketches with
+    the same precision merge by taking the maximum of each register, so merging is associative and commutative.
+    The standard error is about 1.04 / sqrt(2 ** precision), 1.6% for the default precision.
+    """
+
+    def __init__(self, precision: int = 12, registers: bytes = None):
+        self.precision = precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(1 << precision)
+
+    def add(self, value: str):
+        hashed = hash64(value)
+        remaining_bits = 64 - self.precision
+        index = hashed >> remaining_bits
+        # The rank is the position of the first set bit in the bits left over after taking the index.
+        rank = remaining_bits - (hashed & ((1 << remaining_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches with precision %d and %d" % (self.precision, other.precision))
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> int:
+        register_count = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / register_count)
+        raw_estimate = alpha * register_count * register_count / sum(2.0 ** -rank for rank in self.registers)
+
+        # Small cardinalities are estimated more accurately by counting the registers that were never touched.
+        empty_registers = self.registers.count(0)
+        if raw_estimate <= 2.5 * register_count and empty_registers:
+            return round(register_count * log(register_count / empty_registers))
+        return round(raw_estimate)
+
+
+class TopK:
+    """
+    Keeps the heaviest items of a weighted stream using the Space-Saving algorithm with a fixed number of counters.
+    Reported weights never underestimate, and overestimate by at most the error stored next to each item. Any item
+    with more than total weight / capacity is guaranteed to be kept.
+    """
+
+    def __init__(self, capacity: int = 32):
+        self.capacity = capacity
+        # Maps each tracked item to [weight, error].
+        self.counters: dict[str, list[int]] = {}
+
+    def add(self, item: str, weight: int = 1):
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [weight, 0]
+        else:
+            # Replace the lightest item. The newcomer inherits its weight as the error bound.
+            lightest_item = min(self.counters, key=lambda key: self.counters[key][0])
+            lightest_weight = self.counters.pop(lightest_item)[0]
+            self.counters[item] = [lightest_weight + weight, lightest_weight]
+
+    def _floor(self) -> int:
+        # The largest weight an untracked item could have, which is zero until every counter is in use.
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(counter[0] for counter in self.counters.values())
+
+    def merge(self, other: "TopK"):
+        floor, other_floor = self._floor(), other._floor()
+        merged: dict[str, list[int]] = {}
+        for item in self.counters.keys() | other.counters.keys():
+            weight, error = self.counters.get(item, [floor, floor])
+            other_weight, other_error = other.counters.get(item, [other_floor, other_floor])
+            merged[item] = [weight + other_weight, error + other_error]
+
+        heaviest = sorted(merged, key=lambda key: merged[key][0], reverse=True)[:self.capacity]
+        self.counters = {item: merged[item] for item in heaviest}
+
+    def top(self, count: int = None) -> list[tuple[str, int]]:
+        ordered = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)
+        return [(item, counter[0]) for item, counter in ordered[:count]]
+
+
+class TDigest:
+    """
+    Approximates the distribution of a stream of numbers with a bounded number of weighted centroids. Centroids near
+    the tails are kept small, so extreme percentiles stay accurate. Digests merge by compressing their centroids
+    together.
+    """
+
+    def __init__(self, compression: int = 100):
+        self.compression = compression
+        self.count = 0
+        self.minimum = nan
+        self.maximum = nan
+        # Centroids as [mean, weight], sorted by mean once compressed.
+        self._centroids: list[list[float]] = []
+        self._buffer: list[list[float]] = []
+
+    def add(self, value: float, weight: int = 1):
+        if not self.count or value < self.minimum:
+            self.minimum = value
+        if not self.count or value > self.maximum:
+            self.maximum = value
+        self.count += weight
+        self._buffer.append([value, weight])
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def merge(self, other: "TDigest"):
+        if not other.count:
+            return
+        if not self.count or other.minimum < self.minimum:
+            self.minimum = other.minimum
+        if not self.count or other.maximum > self.maximum:
+            self.maximum = other.maximum
+        self.count += other.count
+        self._buffer.extend([mean, weight] for mean, weight in other._centroids + other._buffer)
+        self._compress()
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        centroids = sorted(self._centroids + self._buffer, key=lambda centroid: centroid[0])
+        self._buffer = []
+
+        total = self.count
+        compressed = [list(centroids[0])]
+        cumulative = 0
+        for mean, weight in centroids[1:]:
+            current = compressed[-1]
+            merged_weight = current[1] + weight
+
+            # A centroid may hold at most 4 * total * q * (1 - q) / compression, which shrinks toward the tails.
+            q_left = cumulative / total
+            q_right = (cumulative + merged_weight) / total
+            limit = 4 * total * min(q_left * (1 - q_left), q_right * (1 - q_right)) / self.compression
+            if merged_weight <= max(limit, 1):
+                current[0] += (mean - current[0]) * weight / merged_weight
+                current[1] = merged_weight
+            else:
+                cumulative += current[1]
+                compressed.append([mean, weight])
+        self._centroids = compressed
+
+    def quantile(self, q: float) -> float:
+        self._compress()
+        centroids = self._centroids
+        if not centroids:
+            return nan
+        if len(centroids) == 1:
+            return centroids[0][0]
+
+        # Interpolate between centroid centres, anchoring both ends at the observed extremes.
+        target = q * self.count
+        previous_center, previous_mean = 0.0, self.minimum
+        cumulative = 0.0
+        for mean, weight in centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - previous_center
+                fraction = (target - previous_center) / span if span else 0
+                return previous_mean + (mean - previous_mean) * fraction
+            previous_center, previous_mean = center, mean
+            cumulative += weight
+
+        span = self.count - previous_center
+        fraction = (target - previous_center) / span if span else 0
+        return previous_mean + (self.maximum - previous_mean) * fraction
@@ -0,0 +1,209 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from dataclasses import dataclass, field
+from multiprocessing.shared_memory import SharedMemory
+from struct import Struct
+from time import time
+from typing import Optional
+
+from helpers.window import CaptureListener, WindowCapture, WindowState
+
+SNAPSHOT_MAGIC = b"SCRT"
+SNAPSHOT_VERSION = 2
+DEFAULT_SNAPSHOT_NAME = "screentime-snapshot"
+
+# Magic, layout version, sequence, time of the last update, records in use, record capacity, processes dropped.
+SNAPSHOT_HEADER = Struct("<4sIQqIII")
+SNAPSHOT_SEQUENCE_OFFSET = 8
+# Visits, duration and area multiplied by duration of the closed states. Then the open windows, the sum of their start
+# times, the sum of their areas and the sum of their areas multiplied by their start times, from which a reader works
+# out their time so far. Last, the length and UTF-8 bytes of the process name.
+SNAPSHOT_RECORD = Struct("<qqqqqqqH230s")
+SNAPSHOT_NAME_LENGTH = 230
+
+
+@dataclass(frozen=True)
+class SnapshotRecord:
+    """
+    The totals of a single process as published in the snapshot.
+    """
+    process: str = field(hash=True)
+    visits: int = field(hash=True)
+    duration: int = field(hash=True)
+    area_duration: int = field(hash=True)
+    open_windows: int = field(default=0, hash=True)
+
+
+def snapshot_size(capacity: int) -> int:
+    return SNAPSHOT_HEADER.size + SNAPSHOT_RECORD.size * capacity
+
+
+def live_record(values: tuple, now: int) -> SnapshotRecord:
+    visits, duration, area_duration, open_windows, start_sum, area_sum, area_start_sum, name_length, name = values
+    # Windows that are still open add the time since they opened, at the area they have.
+    return SnapshotRecord(
+        process=name[:name_length].decode("utf-8", errors="replace"),
+        visits=visits,
+        duration=duration + max(0, open_windows * now - start_sum),
+        area_duration=area_duration + max(0, area_sum * now - area_start_sum),
+        open_windows=open_windows,
+    )
+
+
+class SnapshotPublisher(CaptureListener):
+    """
+    Publishes the totals of every process into a named shared memory segment as captures open and close, for other
+    programs on the machine to read without a socket or a file.
+
+    The segment is a header followed by fixed size records, one per process, in the order processes were first seen.
+    Opening or closing a capture only rewrites the record of its process. A record keeps the start times and areas of
+    the open captures of its process, so a reader adds the time they have been open so far without the publisher
+    writing anything while they stay open. Readers stay consistent through a sequence lock: the sequence in the header
+    is odd while a write is in progress and is bumped again once it is done, so a reader that saw the same even
+    sequence before and after reading knows it read a whole update.
+    """
+
+    def __init__(self, name: str = DEFAULT_SNAPSHOT_NAME, capacity: int = 1024):
+        self.capacity = capacity
+        self.memory = SharedMemory(name=name, create=True, size=snapshot_size(capacity))
+        self._buffer = self.memory.buf
+        self._sequence = 0
+        self._slots: dict[str, int] = {}
+        self._totals: list[list[int]] = []
+        self._dropped: set[str] = set()
+        self._write_header()
+
+    def _write_header(self):
+        SNAPSHOT_HEADER.pack_into(
+            self._buffer, 0,
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self._sequence, round(time() * 1000),
+            len(self._slots), self.capacity, len(self._dropped)
+        )
+
+    def _set_sequence(self, sequence: int):
+        self._sequence = sequence
+        self._buffer[SNAPSHOT_SEQUENCE_OFFSET:SNAPSHOT_SEQUENCE_OFFSET + 8] = sequence.to_bytes(8, "little")
+
+    def _slot(self, process: str) -> Optional[int]:
+        slot = self._slots.get(process)
+        if slot is None:
+            if len(self._slots) >= self.capacity:
+                # The layout is fixed, so processes beyond the capacity are only counted, each of them once.
+                if process not in self._dropped:
+                    self._dropped.add(process)
+                    self._set_sequence(self._sequence + 1)
+                    self._write_header()
+                    self._set_sequence(self._sequence + 1)
+                return None
+            slot = self._slots[process] = len(self._slots)
+            self._totals.append([0] * 7)
+        return slot
+
+    def _write_record(self, process: str, slot: int):
+        # An odd sequence tells readers the snapshot is being written.
+        self._set_sequence(self._sequence + 1)
+        name = process.encode("utf-8")[:SNAPSHOT_NAME_LENGTH]
+        SNAPSHOT_RECORD.pack_into(
+            self._buffer, SNAPSHOT_HEADER.size + slot * SNAPSHOT_RECORD.size,
+            *self._totals[slot], len(name), name
+        )
+        self._write_header()
+        self._set_sequence(self._sequence + 1)
+
+    def capture_opened(self, capture: WindowCapture):
+        slot = self._slot(capture.process)
+        if slot is None:
+            return
+        totals = self._totals[slot]
+        area = capture.rectangle.area
+        totals[3] += 1
+        totals[4] += capture.time_start
+        totals[5] += area
+        totals[6] += area * capture.time_start
+        self._write_record(capture.process, slot)
+
+    def capture_closed(self, capture: WindowCapture, state: WindowState):
+        slot = self._slot(capture.process)
+        if slot is None:
+            return
+        totals = self._totals[slot]
+        area = capture.rectangle.area
+        totals[0] += 1
+        totals[1] += state.duration
+        totals[2] += state.rectangle.area * state.duration
+        totals[3] -= 1
+        totals[4] -= capture.time_start
+        totals[5] -= area
+        totals[6] -= area * capture.time_start
+        self._write_record(capture.process, slot)
+
+    def captures_finalized(self):
+        self.close()
+
+    def close(self):
+        if self._buffer is None:
+            return
+        self._buffer.release()
+        self._buffer = None
+        self.memory.close()
+        self.memory.unlink()
+
+
+class SnapshotReader:
+    """
+    Reads the totals published by a SnapshotPublisher. The segment is mapped once and read in place, without copying
+    it, and a read is retried until it sees a consistent update.
+    """
+
+    def __init__(self, name: str = DEFAULT_SNAPSHOT_NAME):
+        self.memory = SharedMemory(name=name)
+        self._buffer = self.memory.buf
+        magic, version, _, _, _, capacity, _ = SNAPSHOT_HEADER.unpack_from(self._buffer, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("%s is not a version %d screen time snapshot" % (name, SNAPSHOT_VERSION))
+        self.capacity = capacity
+
+    def _read_sequence(self) -> int:
+        return int.from_bytes(self._buffer[SNAPSHOT_SEQUENCE_OFFSET:SNAPSHOT_SEQUENCE_OFFSET + 8], "little")
+
+    def read(self, attempts: int = 1000) -> Optional[tuple[int, list[SnapshotRecord]]]:
+        """
+        Returns the time of the last update and the records, or None if no consistent read was made in the attempts.
+        The durations include how long the windows that are still open have been open so far.
+        """
+        for _ in range(attempts):
+            sequence = self._read_sequence()
+            if sequence & 1:
+                continue
+
+            _, _, _, time_updated, count, _, _ = SNAPSHOT_HEADER.unpack_from(self._buffer, 0)
+            records = [
+                SNAPSHOT_RECORD.unpack_from(self._buffer, SNAPSHOT_HEADER.size + slot * SNAPSHOT_RECORD.size)
+                for slot in range(min(count, self.capacity))
+            ]
+
+            if self._read_sequence() == sequence:
+                # Names are only decoded, and open windows only added, once the read is known to be consistent.
+                now = round(time() * 1000)
+                return time_updated, [live_record(values, now) for values in records]
+        return None
+
+    def close(self):
+        self._buffer.release()
+        self.memory.close()
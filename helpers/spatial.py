@@ -0,0 +1,222 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from bisect import bisect_left
+from typing import Iterable, Iterator, Optional
+
+from helpers.rectangle import Rectangle
+
+
+def is_empty(rectangle: Rectangle) -> bool:
+    # Rectangles that don't overlap have an inverted intersection, which still reports a positive area.
+    return rectangle.right <= rectangle.left or rectangle.bottom <= rectangle.top
+
+
+def uncovered_area(rectangle: Rectangle, occluders: Iterable[Rectangle]) -> int:
+    """
+    The exact area of the rectangle that none of the occluders cover. The uncovered part is kept as disjoint pieces,
+    and each occluder splits the pieces it overlaps into at most four, so the work stops as soon as nothing is left.
+    """
+    pieces = [(rectangle.left, rectangle.top, rectangle.right, rectangle.bottom)] if not is_empty(rectangle) else []
+    for occluder in occluders:
+        if not pieces:
+            return 0
+        left, top, right, bottom = occluder.left, occluder.top, occluder.right, occluder.bottom
+        remaining = []
+        for piece in pieces:
+            piece_left, piece_top, piece_right, piece_bottom = piece
+            if left >= piece_right or right <= piece_left or top >= piece_bottom or bottom <= piece_top:
+                remaining.append(piece)
+                continue
+            # Keep what is above and below the occluder at full width, and what is beside it in between.
+            if piece_top < top:
+                remaining.append((piece_left, piece_top, piece_right, top))
+            if bottom < piece_bottom:
+                remaining.append((piece_left, bottom, piece_right, piece_bottom))
+            middle_top, middle_bottom = max(piece_top, top), min(piece_bottom, bottom)
+            if piece_left < left:
+                remaining.append((piece_left, middle_top, left, middle_bottom))
+            if right < piece_right:
+                remaining.append((right, middle_top, piece_right, middle_bottom))
+        pieces = remaining
+    return sum((right - left) * (bottom - top) for left, top, right, bottom in pieces)
+
+
+def _longest_increasing(items: list[tuple[int, int]]) -> set[int]:
+    # The handles of a longest subsequence of (depth, handle) pairs with increasing depths, by patience sorting.
+    tails: list[int] = []
+    tail_indexes: list[int] = []
+    previous: list[int] = []
+    for index, (depth, _) in enumerate(items):
+        position = bisect_left(tails, depth)
+        if position == len(tails):
+            tails.append(depth)
+            tail_indexes.append(index)
+        else:
+            tails[position] = depth
+            tail_indexes[position] = index
+        previous.append(tail_indexes[position - 1] if position else -1)
+
+    handles = set()
+    index = tail_indexes[-1] if tail_indexes else -1
+    while index != -1:
+        handles.add(items[index][1])
+        index = previous[index]
+    return handles
+
+
+class SpatialIndex:
+    """
+    A persistent index of window rectangles in screen coordinates, bucketed in a uniform grid of square cells. Each
+    window also has a depth, its position in the z-order, where lower depths are above higher ones.
+
+    Inserting, moving and removing a window only touches the cells it covers (or covered), and queries only look at
+    the windows sharing a cell with the area asked about, so their cost follows how crowded that part of the screen is
+    rather than how many windows are open.
+
+    Visible areas are cached. Moving, removing or restacking a window only forgets the visible areas of the windows it
+    overlaps, so a scan where little changed recomputes little.
+    """
+
+    def __init__(self, cell_size: int = 256):
+        self.cell_size = cell_size
+        self._cells: dict[tuple[int, int], set[int]] = {}
+        self._rectangles: dict[int, Rectangle] = {}
+        self._depths: dict[int, int] = {}
+        self._visible_areas: dict[int, int] = {}
+
+    def _cells_of(self, rectangle: Rectangle) -> Iterator[tuple[int, int]]:
+        if is_empty(rectangle):
+            return
+        for column in range(rectangle.left // self.cell_size, (rectangle.right - 1) // self.cell_size + 1):
+            for row in range(rectangle.top // self.cell_size, (rectangle.bottom - 1) // self.cell_size + 1):
+                yield column, row
+
+    def _overlapping(self, rectangle: Rectangle) -> list[int]:
+        handles = set()
+        for cell in self._cells_of(rectangle):
+            handles.update(self._cells.get(cell, ()))
+
+        # Compared directly rather than with rectangle_intersection, which allocates a rectangle for every pair.
+        overlapping = []
+        for handle in handles:
+            other = self._rectangles[handle]
+            if other.left < rectangle.right and rectangle.left < other.right and \
+                    other.top < rectangle.bottom and rectangle.top < other.bottom:
+                overlapping.append(handle)
+        return overlapping
+
+    def _invalidate(self, rectangle: Rectangle):
+        for handle in self._overlapping(rectangle):
+            self._visible_areas.pop(handle, None)
+
+    def insert(self, handle: int, rectangle: Rectangle):
+        """
+        Indexes a window, or moves it when it is already indexed. A new window is placed by the next restack.
+        """
+        previous_rectangle = self._rectangles.get(handle)
+        if previous_rectangle == rectangle:
+            return
+
+        previous_cells = set()
+        if previous_rectangle is not None:
+            self._invalidate(previous_rectangle)
+            previous_cells = set(self._cells_of(previous_rectangle))
+        cells = set(self._cells_of(rectangle))
+        for cell in previous_cells - cells:
+            handles = self._cells[cell]
+            handles.discard(handle)
+            if not handles:
+                del self._cells[cell]
+        for cell in cells - previous_cells:
+            self._cells.setdefault(cell, set()).add(handle)
+        self._rectangles[handle] = rectangle
+        self._visible_areas.pop(handle, None)
+        self._invalidate(rectangle)
+
+    def remove(self, handle: int):
+        rectangle = self._rectangles.get(handle)
+        if rectangle is None:
+            return
+        self._invalidate(rectangle)
+        del self._rectangles[handle]
+        self._depths.pop(handle, None)
+        for cell in self._cells_of(rectangle):
+            handles = self._cells[cell]
+            handles.discard(handle)
+            if not handles:
+                del self._cells[cell]
+
+    def retain(self, handles: Iterable[int]):
+        """
+        Removes every window that is not one of the handles.
+        """
+        for handle in self._rectangles.keys() - set(handles):
+            self.remove(handle)
+
+    def restack(self, handles: Iterable[int]):
+        """
+        Sets the z-order of the indexed windows, topmost first. Bringing one window to the front shifts the depth of
+        every window it passes, but only changes the order of that one window relative to the others. The windows that
+        did change order are the ones outside the longest sequence of windows that kept their order, so only the
+        windows overlapping them are recomputed.
+        """
+        handles = list(handles)
+        kept = _longest_increasing([
+            (self._depths[handle], handle) for handle in handles if handle in self._depths
+        ])
+        self._depths = {handle: depth for depth, handle in enumerate(handles)}
+        for handle in handles:
+            if handle not in kept:
+                self._invalidate(self._rectangles[handle])
+
+    def __contains__(self, handle: int) -> bool:
+        return handle in self._rectangles
+
+    def __len__(self) -> int:
+        return len(self._rectangles)
+
+    def visible_area(self, handle: int) -> int:
+        """
+        The area of the window that is not covered by any window above it.
+        """
+        area = self._visible_areas.get(handle)
+        if area is not None:
+            return area
+
+        rectangle = self._rectangles[handle]
+        depth = self._depths[handle]
+        occluders = [
+            self._rectangles[occluder] for occluder in self._overlapping(rectangle) if self._depths[occluder] < depth
+        ]
+        area = self._visible_areas[handle] = uncovered_area(rectangle, occluders)
+        return area
+
+    def window_at(self, x: int, y: int) -> Optional[int]:
+        """
+        The topmost window containing the point, if there is one.
+        """
+        handles = self._cells.get((x // self.cell_size, y // self.cell_size), ())
+        topmost = None
+        for handle in handles:
+            rectangle = self._rectangles[handle]
+            if rectangle.left <= x < rectangle.right and rectangle.top <= y < rectangle.bottom:
+                if topmost is None or self._depths[handle] < self._depths[topmost]:
+                    topmost = handle
+        return topmost
+
@@ -0,0 +1,79 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Iterable, Optional
+
+from helpers.policy import combined_pattern
+
+REDACTED = "[redacted]"
+
+
+class TitleTransform:
+    """
+    Rewrites window titles before they are captured, so raw titles never reach the capture state, the listeners or
+    anything they write. Parts matching the redaction patterns are replaced, the result is truncated, and then it is
+    replaced with a keyed BLAKE2 hash when a key is given. Hashes of the same title under the same key are equal, so
+    distinct titles can still be counted.
+
+    Most titles seen are titles that were seen before, so results are kept in a least recently used cache.
+    """
+
+    def __init__(
+            self,
+            key: Optional[bytes] = None,
+            redactions: Iterable[str] = (),
+            max_length: Optional[int] = None,
+            cache_size: int = 4096
+    ):
+        self.key = key
+        self.redactions = combined_pattern(redactions)
+        self.max_length = max_length
+        self._transform = lru_cache(maxsize=cache_size)(self._apply)
+
+    def _apply(self, title: str) -> str:
+        if self.redactions is not None:
+            title = self.redactions.sub(REDACTED, title)
+        if self.max_length is not None:
+            title = title[:self.max_length]
+        if self.key is not None:
+            title = blake2b(title.encode("utf-8"), digest_size=16, key=self.key).hexdigest()
+        return title
+
+    def __call__(self, title: str) -> str:
+        return self._transform(title)
+
+
+def read_title_key(path: str) -> bytes:
+    with open(path, "rb") as file:
+        key = file.read()
+
+    # A key typed or generated as text usually ends with a newline that isn't part of it. Random bytes are used as they
+    # are, since any of them may look like whitespace.
+    try:
+        text = key.decode("utf-8").strip()
+    except UnicodeDecodeError:
+        text = None
+    if text is not None and text.isprintable():
+        key = text.encode("utf-8")
+
+    # BLAKE2b takes keys of up to 64 bytes. Longer key files are hashed down to that size.
+    if not key:
+        raise ValueError("the title key file %s is empty" % path)
+    return key if len(key) <= 64 else blake2b(key).digest()
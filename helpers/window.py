@@ -17,18 +17,23 @@
 """
 
 from ctypes import create_unicode_buffer, sizeof, byref
-from ctypes.wintypes import DWORD, MAX_PATH, RECT, INT
-from dataclasses import dataclass, field
+from ctypes.wintypes import DWORD, RECT, INT
+from dataclasses import dataclass, field, replace
 from time import time
+from typing import Callable, Iterable, Optional
 
-from helpers.rectangle import Rectangle, rectangle_from_rect, rectangle_intersection
+from helpers.paths import DevicePathMap
+from helpers.policy import CapturePolicy, DEFAULT_POLICY
+from helpers.process import ProcessNameResolver
+from helpers.rectangle import Rectangle, rectangle_from_rect
+from helpers.spatial import SpatialIndex
 from winapi import (
     S_OK, NULL
 )
 from winapi.dwm import DwmGetWindowAttribute, DWMWA_CLOAKED
-from winapi.kernel import OpenProcess, PROCESS_QUERY_LIMITED_INFORMATION, GetProcessImageFileNameW
 from winapi.user import GetWindowThreadProcessId, GetWindowTextLengthW, GetWindowTextW, WNDENUMPROC, \
-    GetWindowLongPtrW, GWL_STYLE, WS_VISIBLE, IsIconic, EnumWindows, GetClientRect, GetClassNameW, MAX_CLASS_NAME
+    GetWindowLongPtrW, GWL_STYLE, WS_VISIBLE, IsIconic, EnumWindows, GetClientRect, GetClassNameW, MAX_CLASS_NAME, \
+    MapWindowPoints
 
 
 @dataclass(frozen=True)
@@ -38,6 +43,19 @@ class WindowCapture:
     title: str = field(hash=True)
     rectangle: Rectangle = field(hash=True)
     time_start: int = field(hash=False)
+    # The part of the rectangle that was not covered by windows above it, as of the latest scan.
+    visible_area: int = field(default=0, hash=False, compare=False)
+    # The visible area multiplied by duration from the start of the capture until the visible area last changed, and
+    # when that was. Covering or uncovering a window changes its visible area without closing its capture.
+    visible_area_duration: int = field(default=0, hash=False, compare=False)
+    time_visible_area: int = field(default=0, hash=False, compare=False)
+
+    def integrate_visible_area(self, time_end: int) -> int:
+        """
+        The visible area multiplied by duration from the start of the capture until time_end.
+        """
+        time_changed = max(self.time_start, self.time_visible_area)
+        return self.visible_area_duration + self.visible_area * (time_end - time_changed)
 
 
 @dataclass(frozen=True)
@@ -60,20 +78,49 @@ class WindowResult:
     states: frozenset[WindowState] = field(hash=True)
 
 
-IGNORED_CLASS_NAMES = frozenset(
-    {
-        "Shell_TrayWnd",
-        "Internet Explorer_Hidden",
-        "Progman",
-        "WorkerW",
-    }
-)
+class CaptureListener:
+    """
+    Receives every capture as it is opened and closed by update_capture_state and finalize_capture_state.
+    """
+
+    def capture_opened(self, capture: WindowCapture):
+        pass
+
+    def capture_closed(self, capture: WindowCapture, state: WindowState):
+        pass
+
+    def captures_finalized(self):
+        pass
 
 
-def visible_window_captures() -> frozenset[WindowCapture]:
-    previous_rectangles: set[Rectangle] = set()
+def window_title(handle: int) -> Optional[str]:
+    buffer_text_length = GetWindowTextLengthW(handle) + 1
+    buffer_text = create_unicode_buffer(buffer_text_length)
+    if not GetWindowTextW(handle, buffer_text, buffer_text_length):
+        return None
+    return buffer_text.value
+
+
+# Process names are remembered between scans, so only new processes are ever looked up.
+# Their NT device paths are translated to DOS paths so they can be compared across machines.
+PROCESS_NAMES = ProcessNameResolver(normalize=DevicePathMap().normalize)
+
+# Where every candidate window sits on the screen, kept between scans so only windows that moved are re-indexed, and
+# only the visible areas of the windows they overlap are recomputed.
+SCREEN_INDEX = SpatialIndex()
+
+
+def visible_window_captures(
+        process_names: ProcessNameResolver = PROCESS_NAMES,
+        screen_index: SpatialIndex = SCREEN_INDEX,
+        policy: CapturePolicy = DEFAULT_POLICY,
+        title_transform: Optional[Callable[[str], str]] = None
+) -> frozenset[WindowCapture]:
     captures: set[WindowCapture] = set()
 
+    # Windows that pass every check, in z-order, waiting for their process names.
+    candidates: list[tuple[int, int, str, Rectangle]] = []
+
     @WNDENUMPROC
     def enumerate_windows2(handle: int, _unused_parameter: int) -> bool:
 
@@ -100,7 +147,7 @@ def visible_window_captures() -> frozenset[WindowCapture]:
         if not GetClassNameW(handle, buffer_class_name, buffer_class_name_length):
             # TODO: debug for when this fails?
             return True
-        if buffer_class_name.value in IGNORED_CLASS_NAMES:
+        if not policy.allows_class_name(buffer_class_name.value):
             return True
 
         # Attempt to retrieve the process and thread id of the window.
@@ -111,9 +158,8 @@ def visible_window_captures() -> frozenset[WindowCapture]:
             return True
 
         # Attempt to retrieve the window's text (current title).
-        buffer_text_length = GetWindowTextLengthW(handle) + 1
-        buffer_text = create_unicode_buffer(buffer_text_length)
-        if not GetWindowTextW(handle, buffer_text, buffer_text_length):
+        title = window_title(handle)
+        if title is None:
             # TODO: debug for when this fails?
             return True
 
@@ -124,37 +170,47 @@ def visible_window_captures() -> frozenset[WindowCapture]:
             return True
         rectangle = rectangle_from_rect(rect)
 
+        # The client area is relative to the window itself, so map it to the screen to tell which windows overlap.
+        MapWindowPoints(handle, NULL, byref(rect), 2)
+        screen_index.insert(handle, rectangle_from_rect(rect))
+
+        candidates.append((handle, process_id.value, title, rectangle))
+        return True
+
+    EnumWindows(enumerate_windows2, NULL)
+    order = [handle for handle, _, _, _ in candidates]
+    screen_index.retain(order)
+    screen_index.restack(order)
+
+    # Resolve the processes of every candidate at once, so new processes can be looked up in parallel.
+    names = process_names.resolve(process_id for _, process_id, _, _ in candidates)
+
+    for handle, process_id, title, rectangle in candidates:
         # Ensure the window has some portions that are visible
-        area = rectangle.area
-        for previous_rectangle in previous_rectangles:
-            area -= rectangle_intersection(rectangle, previous_rectangle).area
+        area = screen_index.visible_area(handle)
         if area <= 0:
-            return True
+            continue
 
-        # Retrieve the process handle
-        process_handle = OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, process_id)
-        if not process_handle:
-            # TODO: debug for when this fails?
-            return True
+        # Ensure the title may be captured. Windows it excludes still cover the ones below them.
+        if not policy.allows_title(title):
+            continue
+        if title_transform is not None:
+            title = title_transform(title)
 
-        # Read the process's file name
-        process_file_name_buffer_length = MAX_PATH + 1
-        process_file_name_buffer = create_unicode_buffer(process_file_name_buffer_length)
-        GetProcessImageFileNameW(process_handle, process_file_name_buffer, process_file_name_buffer_length)
+        # Ensure the process could be opened, and that its windows may be captured
+        process = names.get(process_id)
+        if process is None or not policy.allows_path(process):
+            continue
 
-        previous_rectangles.add(rectangle)
         captures.add(WindowCapture(
             handle=handle,
-            process=process_file_name_buffer.value,
-            title=buffer_text.value,
+            process=process,
+            title=title,
             rectangle=rectangle,
-            time_start=round(time() * 1000)
+            time_start=round(time() * 1000),
+            visible_area=area
         ))
 
-        return True
-
-    EnumWindows(enumerate_windows2, NULL)
-
     return frozenset(captures)
 
 
@@ -166,37 +222,104 @@ def capture_to_state(capture: WindowCapture) -> WindowState:
     )
 
 
+def reopened_capture(capture: WindowCapture, **changes) -> WindowCapture:
+    # The capture that replaces a closed one starts now, without the visible area integrated by the one it replaces.
+    return replace(capture, time_start=round(time() * 1000), visible_area_duration=0, time_visible_area=0, **changes)
+
+
+def open_capture(
+        captures: dict[tuple[int, str], WindowCapture],
+        capture: WindowCapture,
+        listeners: Iterable[CaptureListener] = ()
+):
+    captures[(capture.handle, capture.process)] = capture
+    for listener in listeners:
+        listener.capture_opened(capture)
+
+
+def close_capture(
+        states: dict[tuple[int, str], set[WindowState]],
+        capture: WindowCapture,
+        listeners: Iterable[CaptureListener] = ()
+) -> WindowState:
+    key = (capture.handle, capture.process)
+    if key not in states:
+        states[key] = set()
+    state = capture_to_state(capture)
+    states[key].add(state)
+    for listener in listeners:
+        listener.capture_closed(capture, state)
+    return state
+
+
+def evict_capture(
+        captures: dict[tuple[int, str], WindowCapture],
+        states: dict[tuple[int, str], set[WindowState]],
+        key: tuple[int, str],
+        listeners: Iterable[CaptureListener] = ()
+):
+    capture = captures.pop(key, None)
+    if capture is not None:
+        close_capture(states, capture, listeners)
+
+
+def retitle_capture(
+        captures: dict[tuple[int, str], WindowCapture],
+        states: dict[tuple[int, str], set[WindowState]],
+        key: tuple[int, str],
+        title: str,
+        listeners: Iterable[CaptureListener] = ()
+):
+    capture = captures.get(key)
+    if capture is None or capture.title == title:
+        return
+
+    # Close the capture under its old title and keep capturing the same window under the new one.
+    close_capture(states, capture, listeners)
+    open_capture(captures, reopened_capture(capture, title=title), listeners)
+
+
 def update_capture_state(
         captures: dict[tuple[int, str], WindowCapture],
-        states: dict[tuple[int, str], set[WindowState]]
+        states: dict[tuple[int, str], set[WindowState]],
+        listeners: Iterable[CaptureListener] = (),
+        policy: CapturePolicy = DEFAULT_POLICY,
+        title_transform: Optional[Callable[[str], str]] = None,
+        process_names: ProcessNameResolver = PROCESS_NAMES,
+        screen_index: SpatialIndex = SCREEN_INDEX
 ):
     visible_captures = set()
-    for capture in visible_window_captures():
+    for capture in visible_window_captures(process_names, screen_index, policy=policy, title_transform=title_transform):
         capture_key = (capture.handle, capture.process)
         visible_captures.add(capture_key)
         if capture_key in captures:
             old_capture = captures[capture_key]
             # Determine if the capture has mutated. If it has, we need to begin capturing future changes.
             # Note: this window is still visible, so future changes need to be continuously checked.
-            if old_capture is not capture:
-                if capture_key not in states:
-                    states[capture_key] = set()
+            # An unchanged window keeps its open capture, so its state isn't split on every unrelated event.
+            if old_capture.title != capture.title or old_capture.rectangle != capture.rectangle:
                 # This capture can now be added to the states
-                states[capture_key].add(capture_to_state(old_capture))
+                close_capture(states, old_capture, listeners)
 
                 # The capture for this key is now the new one... waiting to be finalized
-                captures[capture_key] = capture
+                open_capture(captures, capture, listeners)
+            elif old_capture.visible_area != capture.visible_area:
+                # More or less of the window is covered now, which doesn't change its state. Keep the capture open and
+                # integrate the visible area it had until now into it.
+                captures[capture_key] = replace(
+                    old_capture,
+                    visible_area=capture.visible_area,
+                    visible_area_duration=old_capture.integrate_visible_area(capture.time_start),
+                    time_visible_area=capture.time_start
+                )
         else:
-            captures[capture_key] = capture
+            open_capture(captures, capture, listeners)
 
     remove_them_keys = set()
     for key, value in captures.items():
         if key not in visible_captures:
-            if key not in states:
-                states[key] = set()
-
             # This capture can now be added to the states since it wasn't in the visible ones above.
-            states[key].add(capture_to_state(value))
+            close_capture(states, value, listeners)
 
             # Remove this from captures since we gotta wait for it to become visible again
             remove_them_keys.add(key)
@@ -208,12 +331,13 @@ def update_capture_state(
 
 def finalize_capture_state(
         captures: dict[tuple[int, str], WindowCapture],
-        states: dict[tuple[int, str], set[WindowState]]
+        states: dict[tuple[int, str], set[WindowState]],
+        listeners: Iterable[CaptureListener] = ()
 ) -> frozenset[WindowResult]:
-    for key, value in captures.items():
-        if key not in states:
-            states[key] = set()
-        states[key].add(capture_to_state(value))
+    for value in captures.values():
+        close_capture(states, value, listeners)
+    for listener in listeners:
+        listener.captures_finalized()
 
     result_set = set()
     for key, value in states.items():
@@ -224,3 +348,23 @@ def finalize_capture_state(
         ))
 
     return frozenset(result_set)
+
+
+def checkpoint_capture_state(
+        captures: dict[tuple[int, str], WindowCapture],
+        states: dict[tuple[int, str], set[WindowState]],
+        listeners: Iterable[CaptureListener] = ()
+) -> frozenset[WindowResult]:
+    """
+    Takes everything captured so far out of the capture state, so it can be saved and doesn't have to be held in
+    memory any longer. Open captures are closed and reopened, which takes their time so far and keeps capturing them.
+    """
+    for capture in list(captures.values()):
+        close_capture(states, capture, listeners)
+        open_capture(captures, reopened_capture(capture), listeners)
+
+    results = frozenset(
+        WindowResult(handle=key[0], process=key[1], states=frozenset(value)) for key, value in states.items()
+    )
+    states.clear()
+    return results
@@ -16,140 +16,491 @@
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from asyncio import run, get_running_loop, create_task, wait, FIRST_COMPLETED
-from asyncio.exceptions import CancelledError
-from concurrent.futures.thread import ThreadPoolExecutor
-from ctypes import pointer
-from ctypes.wintypes import MSG
-
-from helpers.printing import pretty_print_result
-from helpers.window import WindowResult, update_capture_state, finalize_capture_state
-from winapi import NULL
-from winapi.kernel import GetCurrentThreadId
-from winapi.user import SetWinEventHook, EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_MINIMIZEEND, WINEVENT_OUTOFCONTEXT, \
-    WINEVENT_SKIPOWNPROCESS, GetMessageW, TranslateMessage, DispatchMessageW, UnhookWinEvent, WINEVENTPROC, \
-    EVENT_SYSTEM_MINIMIZESTART, PostThreadMessageW, WM_QUIT
-
-
-def print_results(results: frozenset[WindowResult]):
-    total_time_all = 0
-    total_area_all = 0
-    for result1 in results:
-        for state in result1.states:
-            total_time_all += state.duration
-            total_area_all += state.rectangle.area
-
-    for result in results:
-        aggregate_time = 0
-        aggregate_area = 0
-        titles = set()
-        for state in result.states:
-            titles.add(state.title)
-            aggregate_time += state.duration
-            aggregate_area += state.rectangle.area
-        share_time = aggregate_time / total_time_all
-        share_area = aggregate_area / total_area_all
-        average_area = int(aggregate_area / len(result.states))
-
-        pretty_print_result(result.process, titles, aggregate_time, share_time, average_area, share_area)
-
-
-async def routine_message_queue(event_loop, executor):
-    captures = {}
-    states = {}
-
-    # Use an array so that a value can be appended to it from another thread.
-    # Probably a more proper solution to this, but it works well enough.
-    thread_ids = []
-
-    # Isolate the message queue receiving to its own anonymous function.
-    def blocking_receive_message() -> frozenset[WindowResult]:
-
-        update_capture_state(captures, states)
-
-        # Get this thread's ID
-        current_thread_id = GetCurrentThreadId()
-        thread_ids.append(current_thread_id)
-
-        # Attempt to create the event hook.
-        # It must be created within the same thread as the message queue receiver for the callback to be fired.
-        event_hook_handle = SetWinEventHook(
-            EVENT_SYSTEM_FOREGROUND,
-            EVENT_SYSTEM_MINIMIZEEND,
-            NULL,
-            win_event_hook_callback,
-            0,
-            0,
-            WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
-        )
-
-        # Determine if the hook was created successfully.
-        if event_hook_handle == 0:
-            print("Could not create the event hook.")
-            return frozenset()
-
-        # Read all readily available messages from the queue.
-        # Loops forever until it receives a WM_QUIT message.
-        message_pointer = pointer(MSG())
-        while GetMessageW(message_pointer, NULL, 0, 0):
-            TranslateMessage(message_pointer)
-            DispatchMessageW(message_pointer)
-
-        # Unhook the event handler.
-        UnhookWinEvent(event_hook_handle)
-
-        finalized_results = finalize_capture_state(captures, states)
-        print_results(finalized_results)
-
-        return finalized_results
-
-    # Isolate the event hook callback to its own anonymous function.
-    # It shouldn't be called anywhere except here.
-    # The annotation is important so Python knows its a callback function using Windows calling procedures.
-    @WINEVENTPROC
-    def win_event_hook_callback(hook, event, hwnd, id_object, id_child, dw_event_thread, dw_event_time):
-        update_capture_state(captures, states)
-
-    try:
-        # Run the message queue receiver in a separate thread so it doesn't block the main one.
-        await event_loop.run_in_executor(executor, blocking_receive_message)
-
-    # Wait for a cancellation error so we can tell Windows we don't need to receive anymore messages
-    # If we don't do this, the application will be locked... forever.
-    except CancelledError:
-        # Tell the message queue in the other thread that it can stop now (if the thread was even able to start).
-        if len(thread_ids) == 1:
-            PostThreadMessageW(thread_ids[0], WM_QUIT, 0, 0)
-
-
-async def routine_user_input(event_loop, executor):
+import os
+from argparse import ArgumentParser
+from asyncio import run, get_running_loop, create_task, wait, wait_for, gather, shield, FIRST_COMPLETED, Event
+from asyncio.exceptions import TimeoutError as WaitTimeoutError
+from functools import partial
+from itertools import count
+from signal import signal, SIGINT, SIGTERM
+from threading import Thread
+from time import time
+
+from helpers.budget import BudgetEngine, parse_budget
+from helpers.heartbeat import CaptureHeartbeat
+from helpers.integration import ScreenAreaIntegrator
+from helpers.journal import CaptureJournal, recover_journal
+from helpers.pipeline import CapturePipeline, WinEventPump
+from helpers.policy import DEFAULT_POLICY, load_policy
+from helpers.printing import pretty_duration, pretty_print_aggregate, pretty_print_labeled_values
+from helpers.report import print_report, summarize_results, summarize_session, format_summaries
+from helpers.rollup import Rollups
+from helpers.session import write_session, read_session, read_session_generation
+from helpers.window import checkpoint_capture_state
+
+# Windows delivers Ctrl+Break as SIGBREAK, which does not exist elsewhere.
+try:
+    from signal import SIGBREAK
+    STOP_SIGNALS = (SIGINT, SIGTERM, SIGBREAK)
+except ImportError:
+    STOP_SIGNALS = (SIGINT, SIGTERM)
+
+# The default of helpers.snapshot, which is only imported when a snapshot is published or read.
+DEFAULT_SNAPSHOT_NAME = "screentime-snapshot"
+
+
+async def routine_user_input(event_loop):
     # Wait for the user to press (any key) to exit.
-    await event_loop.run_in_executor(executor, input, "Press RETURN to exit and read results.\n")
+    # A daemon thread is used so a pending prompt never holds up the interpreter when the tracker stops on its own.
+    entered = event_loop.create_future()
+
+    def blocking_input():
+        input("Press RETURN to exit and read results.\n")
+        event_loop.call_soon_threadsafe(entered.set_result, None)
+
+    Thread(target=blocking_input, name="UserInput", daemon=True).start()
+    await entered
+
+
+def stop_signal_event(event_loop) -> Event:
+    stop_event = Event()
+
+    # Signal handlers run on the main thread between bytecodes, so hand the stop request to the loop safely.
+    def request_stop(_signal_number, _frame):
+        event_loop.call_soon_threadsafe(stop_event.set)
+
+    for stop_signal in STOP_SIGNALS:
+        signal(stop_signal, request_stop)
+
+    return stop_event
+
+
+async def routine_checkpoint(
+        event_loop, pipeline, stop_event, checkpoint_path, checkpoint_interval, generations, journal=None, exporter=None
+):
+    from helpers.compaction import merge_session
+    while True:
+        try:
+            await wait_for(stop_event.wait(), checkpoint_interval)
+            # The final checkpoint is written once the pipeline has been finalized.
+            return
+        except WaitTimeoutError:
+            pass
+
+        # Everything captured so far is merged into the checkpoint and then forgotten, so memory stays flat.
+        generation = next(generations)
+        results = checkpoint_capture_state(pipeline.captures, pipeline.states, pipeline.listeners)
+        if journal is not None:
+            journal.checkpoint(generation)
+        if exporter is not None:
+            # The states just taken were also exported, so the file holding them can be finished too.
+            exporter.rollover()
+        saving = event_loop.run_in_executor(None, merge_session, checkpoint_path, results, generation)
+        try:
+            await shield(saving)
+        except OSError as error:
+            # A file held open by another program, such as a virus scanner or an indexer, only fails this
+            # checkpoint. The daemon keeps running and the next checkpoint tries again.
+            print("Could not save the checkpoint, retrying at the next one: %s" % error)
+        else:
+            if journal is not None:
+                # What the journal recorded before the checkpoint is saved now, so it only has to cover the rest.
+                journal.rotate(generation, pipeline.captures.values(), pipeline.states)
+        finally:
+            # The final checkpoint merges into the same file, so it must not start before this one has ended.
+            await wait([saving])
+            if saving.exception() is not None:
+                # Give back what couldn't be saved, so the final checkpoint still has it.
+                for result in results:
+                    pipeline.states.setdefault((result.handle, result.process), set()).update(result.states)
+
+
+def print_collector_results(collector):
+    print("Merged %d batches from %d machines, ignoring %d that were sent again.\n" % (
+        collector.batches, len(collector.machines), collector.duplicates
+    ))
+
+    total_time_all = sum(aggregate.duration for aggregate in collector.processes.values())
+    for process, aggregate in collector.processes.items():
+        share_time = aggregate.duration / total_time_all if total_time_all else 0
+        average_area = aggregate.area_duration // aggregate.duration if aggregate.duration else 0
+        pretty_print_aggregate(process, aggregate.titles.estimate(), aggregate.duration, share_time, average_area)
+
+
+async def routine_collector(event_loop, address):
+    from helpers.fleet import FleetCollector
+    collector = FleetCollector()
+    server = await collector.serve(address)
+    print("Collecting on %s:%d, interrupt to stop and read results." % address)
+
+    await stop_signal_event(event_loop).wait()
+    server.close()
+    await server.wait_closed()
+    print_collector_results(collector)
+
+
+def print_budget_exceeded(process: str, threshold: int):
+    print("%s has been used for %s today." % (process.split("\\")[-1], pretty_duration(threshold)))
+
+
+def write_reports(arguments, summarize, timeline=None):
+    # The summaries are only computed when a report is actually written.
+    if not arguments.report_json and not arguments.report_html:
+        return
+    summaries = summarize()
+    # Imported here so the icon bindings are only loaded when a report is actually written.
+    from helpers.render import render_json, render_html, write_report
+
+    if arguments.report_json:
+        write_report(arguments.report_json, render_json, summaries, timeline=timeline)
+    if arguments.report_html:
+        icons = None
+        if arguments.icon_cache:
+            from helpers.icons import IconCache
+            icons = IconCache(arguments.icon_cache)
+        write_report(arguments.report_html, render_html, summaries, timeline=timeline, icons=icons)
+        if icons is not None:
+            icons.save()
+
+
+def report_session(arguments):
+    # Session rows are streamed from the file, so the memory used doesn't depend on its size.
+    summaries = summarize_session(read_session(arguments.from_session), arguments.top)
+    if arguments.report_json or arguments.report_html:
+        write_reports(arguments, lambda: summaries)
+    else:
+        print(format_summaries(summaries), end="")
+
+
+def compact_session_files(arguments):
+    from helpers.compaction import compact_sessions
+    statistics = compact_sessions(arguments.compact, arguments.compact_output, coarse=arguments.coarse)
+    pretty_print_labeled_values({
+        "Merged Files": "{:,}".format(statistics.input_files),
+        "Rows": "{:,} in, {:,} out".format(statistics.input_rows, statistics.output_rows),
+        "Bytes": "{:,} in, {:,} out".format(statistics.input_bytes, statistics.output_bytes),
+        "Compaction Ratio": "%.2f" % statistics.ratio,
+        "Throughput": "{:,.0f} rows per second".format(statistics.rows_per_second),
+    })
+
+
+def print_snapshot(name: str):
+    from helpers.snapshot import SnapshotReader
+    reader = SnapshotReader(name or DEFAULT_SNAPSHOT_NAME)
+    try:
+        snapshot = reader.read()
+    finally:
+        reader.close()
+    if snapshot is None:
+        print("The snapshot kept changing while it was read.")
+        return
+
+    _, records = snapshot
+    total_time_all = sum(record.duration for record in records) or 1
+    for record in sorted(records, key=lambda record: record.duration, reverse=True):
+        pretty_print_labeled_values({
+            "Program": record.process.split("\\")[-1],
+            "Gross Active Time": pretty_duration(record.duration),
+            "Share Active Time": "%.2f percent" % (record.duration / total_time_all * 100),
+        })
+
+
+def recover_session(journal_path: str, checkpoint_path=None, generations=None):
+    if not os.path.exists(journal_path) or not os.path.getsize(journal_path):
+        return
+    if checkpoint_path is not None:
+        # The daemon stopped without saving its results, so merge what its checkpoint is missing into it.
+        from helpers.compaction import merge_session
+        merge_session(
+            checkpoint_path,
+            recover_journal(journal_path, read_session_generation(checkpoint_path)),
+            next(generations)
+        )
+        print("Recovered the results of an interrupted run into %s." % checkpoint_path)
+        return
+    # The previous run stopped without saving its results, so save what its journal recorded beside it.
+    results = recover_journal(journal_path)
+    recovered_path = "%s.recovered-%d.jsonl" % (journal_path, round(time() * 1000))
+    write_session(recovered_path, results)
+    print("Recovered the results of an interrupted run to %s." % recovered_path)
 
 
-async def routine_main():
+async def routine_main(arguments):
     # Get the running loop.
     event_loop = get_running_loop()
 
-    # Create a thread pool executor so tasks don't block the entire application.
-    executor = ThreadPoolExecutor(max_workers=2)
-
-    task_input = create_task(routine_user_input(event_loop, executor))
-    task_message_queue = create_task(routine_message_queue(event_loop, executor))
-
-    # Wait for one of the tasks to complete.
-    _, pending_tasks = await wait(
-        [
-            task_input,
-            task_message_queue
-        ],
-        return_when=FIRST_COMPLETED
+    # Helpers that only some options need are imported where they are used, so they don't slow down every start.
+    if arguments.collect:
+        from helpers.fleet import parse_address
+        await routine_collector(event_loop, parse_address(arguments.collect))
+        return
+
+    if arguments.read_snapshot is not None:
+        print_snapshot(arguments.read_snapshot)
+        return
+
+    if arguments.compact:
+        compact_session_files(arguments)
+        return
+
+    if arguments.from_session:
+        report_session(arguments)
+        return
+
+    # Keep minute, hour and day usage up to date as captures close.
+    rollups = Rollups()
+    # Integrate screen area over time, including the visible area that is only known while capturing.
+    integrator = ScreenAreaIntegrator()
+    listeners = [rollups, integrator]
+
+    # Every checkpoint the daemon saves gets a generation above the last one saved, whether or not the saves succeed.
+    generations = count(read_session_generation(arguments.checkpoint) + 1) if arguments.daemon else None
+
+    journal = None
+    if arguments.journal:
+        recover_session(arguments.journal, arguments.checkpoint if arguments.daemon else None, generations)
+        journal = CaptureJournal(arguments.journal)
+        if generations is not None:
+            # Nothing in the new journal is saved until a checkpoint newer than this mark is.
+            journal.checkpoint(next(generations))
+        listeners.append(journal)
+
+    if arguments.budget:
+        # The engine schedules its own timer on this loop, so budgets are enforced even when no event arrives.
+        listeners.append(BudgetEngine(
+            dict(arguments.budget), event_loop.call_later, print_budget_exceeded
+        ))
+
+    if arguments.publish is not None:
+        from helpers.snapshot import SnapshotPublisher
+        listeners.append(SnapshotPublisher(arguments.publish or DEFAULT_SNAPSHOT_NAME))
+
+    exporter = None
+    if arguments.export:
+        # Imported here so pyarrow is only loaded when it is actually needed.
+        from helpers.columnar import ColumnarExporter
+        exporter = ColumnarExporter(arguments.export, rollover=arguments.daemon)
+        listeners.append(exporter)
+
+    fleet_sink = None
+    if arguments.fleet:
+        from helpers.fleet import FleetSink, parse_address
+        fleet_sink = FleetSink(parse_address(arguments.fleet), interval=arguments.fleet_interval)
+        listeners.append(fleet_sink)
+
+    policy = load_policy(arguments.policy) if arguments.policy else DEFAULT_POLICY
+    title_transform = None
+    if arguments.title_key or arguments.redact_title or arguments.max_title_length:
+        from helpers.titles import TitleTransform, read_title_key
+        title_transform = TitleTransform(
+            key=read_title_key(arguments.title_key) if arguments.title_key else None,
+            redactions=arguments.redact_title or (),
+            max_length=arguments.max_title_length
+        )
+    pipeline = CapturePipeline(listeners, policy, title_transform)
+    pump = WinEventPump(event_loop, pipeline.events, pipeline.dispatcher.event_ranges())
+    if not await pump.start():
+        print("Could not create the event hook.")
+        return
+
+    # Between events, the heartbeat bounds how long a capture can go unconfirmed.
+    heartbeat = CaptureHeartbeat(pipeline, journal)
+
+    # Every stage runs as a task on this loop. The pump thread is the only thread blocked on Windows.
+    stages = [create_task(pipeline.run()), create_task(heartbeat.run())]
+    if fleet_sink is not None:
+        stages.append(create_task(fleet_sink.run()))
+    if arguments.daemon:
+        stop_event = stop_signal_event(event_loop)
+        stages.append(create_task(routine_checkpoint(
+            event_loop,
+            pipeline,
+            stop_event,
+            arguments.checkpoint,
+            arguments.checkpoint_interval,
+            generations,
+            journal,
+            exporter
+        )))
+        task_control = create_task(stop_event.wait())
+    else:
+        task_control = create_task(routine_user_input(event_loop))
+
+    # Run until we are asked to stop, or until a stage fails.
+    await wait([task_control, *stages], return_when=FIRST_COMPLETED)
+
+    # Cancel every stage and wait for them to unwind before touching the capture state.
+    task_control.cancel()
+    for stage in stages:
+        stage.cancel()
+    outcomes = await gather(task_control, *stages, return_exceptions=True)
+    pump.stop()
+
+    results = pipeline.finalize()
+    if fleet_sink is not None:
+        await fleet_sink.close()
+    if arguments.daemon:
+        # The checkpoint of an earlier run is merged into rather than replaced.
+        from helpers.compaction import merge_session
+        merge_session(arguments.checkpoint, results, next(generations))
+        # Every checkpoint forgot what it saved, so only the checkpoint file covers the whole run.
+        summarize = partial(summarize_session, read_session(arguments.checkpoint), arguments.top)
+    else:
+        print_report(results, arguments.top, integrator=integrator)
+        summarize = partial(summarize_results, results, arguments.top, integrator=integrator)
+    write_reports(arguments, summarize, rollups.hours)
+
+    if arguments.event_counts:
+        pretty_print_labeled_values(pipeline.dispatcher.named_counts())
+
+    # The results are safe now, so the journal isn't needed to recover them.
+    if journal is not None:
+        journal.discard()
+
+    # Results are saved first so a failing stage doesn't lose the session, then the failure is surfaced.
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            raise outcome
+
+
+def parse_arguments():
+    parser = ArgumentParser(description="Tracks the screen time of visible windows.")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="run headless until interrupted by a signal, checkpointing results instead of printing them"
     )
-
-    # Cancel all pending (incomplete) tasks.
-    for task in pending_tasks:
-        task.cancel()
+    parser.add_argument(
+        "--checkpoint",
+        default="screentime-session.jsonl",
+        help="file the daemon merges its aggregated results into (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=300,
+        help="seconds between daemon checkpoints (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--policy",
+        metavar="PATH",
+        help="JSON file of class name, title and program path rules deciding which windows are captured"
+    )
+    parser.add_argument(
+        "--title-key",
+        metavar="PATH",
+        help="replace window titles with their BLAKE2 hash keyed with the contents of this file"
+    )
+    parser.add_argument(
+        "--redact-title",
+        action="append",
+        metavar="REGEX",
+        help="replace the parts of window titles matching this expression, can be given more than once"
+    )
+    parser.add_argument(
+        "--max-title-length",
+        type=int,
+        metavar="N",
+        help="truncate window titles to N characters"
+    )
+    parser.add_argument(
+        "--journal",
+        metavar="PATH",
+        help="journal captures to this file so an interrupted run can be recovered when the tracker next starts"
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        metavar="N",
+        help="only report the N programs with the most active time"
+    )
+    parser.add_argument(
+        "--event-counts",
+        action="store_true",
+        help="print how many events of each type were received when exiting"
+    )
+    parser.add_argument(
+        "--budget",
+        action="append",
+        type=parse_budget,
+        metavar="NAME=HOURS",
+        help="alert when a program, such as chrome.exe=2 or chrome.exe=1,2, had a window open for these hours in a day"
+    )
+    parser.add_argument(
+        "--report-json",
+        metavar="PATH",
+        help="also write the report as JSON, with hourly timelines for the last day"
+    )
+    parser.add_argument(
+        "--report-html",
+        metavar="PATH",
+        help="also write the report as a self contained HTML page, with hourly timelines for the last day"
+    )
+    parser.add_argument(
+        "--icon-cache",
+        metavar="DIRECTORY",
+        help="show program icons in the HTML report, caching them in this directory"
+    )
+    parser.add_argument(
+        "--from-session",
+        metavar="PATH",
+        help="report on a session file written by the daemon instead of tracking"
+    )
+    parser.add_argument(
+        "--compact",
+        nargs="+",
+        metavar="SESSION",
+        help="merge session files into the --compact-output file instead of tracking, resuming if interrupted"
+    )
+    parser.add_argument(
+        "--compact-output",
+        metavar="PATH",
+        default="screentime-compacted.jsonl",
+        help="file the merged sessions are written to (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--coarse",
+        action="store_true",
+        help="when compacting, merge the rows of a title regardless of the window size"
+    )
+    parser.add_argument(
+        "--publish",
+        nargs="?",
+        const="",
+        metavar="NAME",
+        help="publish live per program totals in a shared memory segment (default name: %s)" % DEFAULT_SNAPSHOT_NAME
+    )
+    parser.add_argument(
+        "--read-snapshot",
+        nargs="?",
+        const="",
+        metavar="NAME",
+        help="print the totals published by a tracker started with --publish instead of tracking"
+    )
+    parser.add_argument(
+        "--export",
+        metavar="PATH",
+        help="stream every closed state to a Parquet file (*.parquet) or an Arrow IPC stream, requires pyarrow; with "
+             "--daemon, every checkpoint starts a new Parquet file"
+    )
+    parser.add_argument(
+        "--fleet",
+        metavar="HOST:PORT",
+        help="ship per program aggregates to a collector started with --collect"
+    )
+    parser.add_argument(
+        "--fleet-interval",
+        type=float,
+        default=60,
+        help="seconds between batches sent to the collector (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--collect",
+        metavar="HOST:PORT",
+        help="run a collector that merges the aggregates of every tracker started with --fleet"
+    )
+    return parser.parse_args()
 
 
 if __name__ == '__main__':
-    run(routine_main())
+    run(routine_main(parse_arguments()))
@@ -0,0 +1,167 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from dataclasses import dataclass
+from random import Random
+from typing import Optional
+
+from helpers import lifecycle, window
+from helpers.process import ProcessNameResolver
+from helpers.rectangle import Rectangle, rectangle_from_positions
+from helpers.spatial import SpatialIndex
+from winapi import S_OK
+from winapi.user import WS_VISIBLE
+
+
+@dataclass
+class FakeWindow:
+    handle: int
+    process_id: int
+    title: str
+    # Where the client area is on the screen.
+    rectangle: Rectangle
+    class_name: str = "FakeWindow"
+    visible: bool = True
+    cloaked: bool = False
+    iconic: bool = False
+
+
+class FakeDesktop:
+    """
+    Stands in for the user32 and dwmapi functions used by helpers.window, answering them from a list of windows in
+    z-order, topmost first. Tests change the windows between scans to simulate a user.
+    """
+
+    def __init__(self, windows: list[FakeWindow], images: dict[int, str]):
+        self.windows = windows
+        self.images = images
+        self.process_names = ProcessNameResolver(lookup=self.images.get)
+        self.screen_index = SpatialIndex()
+
+    def window(self, handle: int) -> FakeWindow:
+        return next(fake_window for fake_window in self.windows if fake_window.handle == handle)
+
+    def install(self, monkeypatch):
+        """
+        Replaces the bindings imported by helpers.window and helpers.lifecycle. Scans always resolve processes with
+        process_names, which tests may replace before installing, and index windows in screen_index rather than the
+        one shared by the tracker.
+        """
+        windows = {}
+
+        def by_handle(handle: int) -> FakeWindow:
+            # Handles arrive as ctypes integers, or as plain integers when called from Python.
+            handle = getattr(handle, "value", handle)
+            if not windows or handle not in windows:
+                windows.clear()
+                windows.update((fake_window.handle, fake_window) for fake_window in self.windows)
+            return windows[handle]
+
+        def enum_windows(callback, parameter) -> int:
+            windows.clear()
+            windows.update((fake_window.handle, fake_window) for fake_window in self.windows)
+            for fake_window in self.windows:
+                if not callback(fake_window.handle, parameter):
+                    break
+            return 1
+
+        def get_window_long(handle, _index) -> int:
+            return WS_VISIBLE if by_handle(handle).visible else 0
+
+        def get_window_attribute(handle, _attribute, value, _size) -> int:
+            value._obj.value = int(by_handle(handle).cloaked)
+            return S_OK
+
+        def get_class_name(handle, buffer, length) -> int:
+            buffer.value = by_handle(handle).class_name[:length - 1]
+            return len(buffer.value)
+
+        def get_window_thread_process_id(handle, process_id) -> int:
+            process_id._obj.value = by_handle(handle).process_id
+            return 1
+
+        def get_window_text_length(handle) -> int:
+            return len(by_handle(handle).title)
+
+        def get_window_text(handle, buffer, length) -> int:
+            buffer.value = by_handle(handle).title[:length - 1]
+            return len(buffer.value)
+
+        def get_client_rect(handle, rect) -> int:
+            rectangle = by_handle(handle).rectangle
+            rect._obj.left, rect._obj.top, rect._obj.right, rect._obj.bottom = 0, 0, rectangle.width, rectangle.height
+            return 1
+
+        def map_window_points(handle, _handle_to, rect, _count) -> int:
+            rectangle = by_handle(handle).rectangle
+            rect._obj.left += rectangle.left
+            rect._obj.right += rectangle.left
+            rect._obj.top += rectangle.top
+            rect._obj.bottom += rectangle.top
+            return 1
+
+        def get_ancestor(handle, _flags) -> int:
+            # Every fake window is a top-level window, and any other handle belongs to a child window.
+            handle = getattr(handle, "value", handle)
+            return handle if any(fake_window.handle == handle for fake_window in self.windows) else 0
+
+        monkeypatch.setattr(window, "EnumWindows", enum_windows)
+        monkeypatch.setattr(window, "GetWindowLongPtrW", get_window_long)
+        monkeypatch.setattr(window, "DwmGetWindowAttribute", get_window_attribute)
+        monkeypatch.setattr(window, "IsIconic", lambda handle: int(by_handle(handle).iconic))
+        monkeypatch.setattr(window, "GetClassNameW", get_class_name)
+        monkeypatch.setattr(window, "GetWindowThreadProcessId", get_window_thread_process_id)
+        monkeypatch.setattr(window, "GetWindowTextLengthW", get_window_text_length)
+        monkeypatch.setattr(window, "GetWindowTextW", get_window_text)
+        monkeypatch.setattr(window, "GetClientRect", get_client_rect)
+        monkeypatch.setattr(window, "MapWindowPoints", map_window_points)
+        monkeypatch.setattr(lifecycle, "GetAncestor", get_ancestor)
+        visible_window_captures = window.visible_window_captures
+
+        def scan(_process_names=None, _screen_index=None, **options):
+            return visible_window_captures(self.process_names, self.screen_index, **options)
+
+        monkeypatch.setattr(window, "visible_window_captures", scan)
+
+
+def random_desktop(
+        window_count: int,
+        seed: int = 0,
+        width: int = 2560,
+        height: int = 1440,
+        process_count: Optional[int] = None
+) -> FakeDesktop:
+    """
+    A desktop of randomly placed, partly overlapping windows owned by a handful of processes.
+    """
+    random = Random(seed)
+    process_count = process_count or max(1, window_count // 8)
+    images = {process_id: "C:\\Programs\\program%d.exe" % process_id for process_id in range(1, process_count + 1)}
+    windows = []
+    for handle in range(1, window_count + 1):
+        window_width = random.randint(200, width // 2)
+        window_height = random.randint(150, height // 2)
+        left = random.randint(0, width - window_width)
+        top = random.randint(0, height - window_height)
+        windows.append(FakeWindow(
+            handle=handle * 4,
+            process_id=random.randint(1, process_count),
+            title="Document %d" % handle,
+            rectangle=rectangle_from_positions(left, top, left + window_width, top + window_height)
+        ))
+    return FakeDesktop(windows, images)
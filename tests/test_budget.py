@@ -0,0 +1,181 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from argparse import ArgumentTypeError
+from datetime import datetime
+
+import pytest
+
+from helpers.budget import BudgetEngine, parse_budget
+from helpers.rectangle import rectangle_from_positions
+from helpers.window import WindowCapture, WindowState
+
+HOUR = 3_600_000
+RECTANGLE = rectangle_from_positions(0, 0, 800, 600)
+CHROME = "\\Device\\HarddiskVolume3\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
+CODE = "\\Device\\HarddiskVolume3\\Programs\\Code.exe"
+
+
+class FakeTimer:
+    def __init__(self, deadline: int, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeLoop:
+    """
+    A clock and a scheduler that only move when the test says so, standing in for the event loop's call_later.
+    """
+
+    def __init__(self, now: int):
+        self.now = now
+        self.timers: list[FakeTimer] = []
+
+    def clock(self) -> int:
+        return self.now
+
+    def schedule(self, delay: float, callback) -> FakeTimer:
+        timer = FakeTimer(self.now + round(delay * 1000), callback)
+        self.timers.append(timer)
+        return timer
+
+    @property
+    def armed(self) -> list[int]:
+        return [timer.deadline for timer in self.timers if not timer.cancelled]
+
+    def advance(self, until: int):
+        # Fires every timer that comes due on the way, in order, like the loop would.
+        while True:
+            due = [timer for timer in self.timers if not timer.cancelled and timer.deadline <= until]
+            if not due:
+                break
+            timer = min(due, key=lambda timer: timer.deadline)
+            self.timers.remove(timer)
+            self.now = timer.deadline
+            timer.callback()
+        self.now = until
+
+
+def budget_engine(loop: FakeLoop, rules: dict) -> tuple[BudgetEngine, list]:
+    alerts = []
+    engine = BudgetEngine(
+        rules, loop.schedule, lambda process, threshold: alerts.append((process, threshold)), clock=loop.clock
+    )
+    return engine, alerts
+
+
+def open_window(engine: BudgetEngine, loop: FakeLoop, handle: int, process: str) -> WindowCapture:
+    capture = WindowCapture(handle=handle, process=process, title="Window", rectangle=RECTANGLE, time_start=loop.now)
+    engine.capture_opened(capture)
+    return capture
+
+
+def close_window(engine: BudgetEngine, loop: FakeLoop, capture: WindowCapture):
+    engine.capture_closed(capture, WindowState("Window", RECTANGLE, loop.now - capture.time_start))
+
+
+def local_time(*fields) -> int:
+    return round(datetime(*fields).timestamp() * 1000)
+
+
+def test_parse_budget():
+    assert parse_budget("chrome.exe=2") == ("chrome.exe", (7_200_000,))
+    assert parse_budget(" code.exe =1,2.5") == ("code.exe", (3_600_000, 9_000_000))
+
+
+@pytest.mark.parametrize("text", ["chrome.exe", "=2", "chrome.exe=", "chrome.exe=two", "chrome.exe=0", "chrome.exe=25"])
+def test_parse_budget_rejects_malformed_budgets(text):
+    with pytest.raises(ArgumentTypeError):
+        parse_budget(text)
+
+
+def test_alerts_at_each_threshold():
+    loop = FakeLoop(local_time(2024, 3, 4, 9))
+    engine, alerts = budget_engine(loop, {"chrome.exe": (HOUR, 2 * HOUR)})
+    open_window(engine, loop, 1, CHROME)
+    assert loop.armed == [loop.now + HOUR]
+
+    loop.advance(loop.now + HOUR - 1)
+    assert alerts == []
+    loop.advance(loop.now + 1)
+    assert alerts == [(CHROME, HOUR)]
+    loop.advance(loop.now + HOUR)
+    assert alerts == [(CHROME, HOUR), (CHROME, 2 * HOUR)]
+    assert loop.armed == []
+
+
+def test_windows_open_side_by_side_count_once():
+    loop = FakeLoop(local_time(2024, 3, 4, 9))
+    engine, alerts = budget_engine(loop, {"chrome.exe": (2 * HOUR,)})
+    first = open_window(engine, loop, 1, CHROME)
+    open_window(engine, loop, 2, CHROME)
+    loop.advance(loop.now + HOUR)
+    close_window(engine, loop, first)
+    loop.advance(loop.now + HOUR - 1)
+    assert alerts == []
+    loop.advance(loop.now + 1)
+    assert alerts == [(CHROME, 2 * HOUR)]
+
+
+def test_closing_a_window_invalidates_its_deadline():
+    loop = FakeLoop(local_time(2024, 3, 4, 9))
+    engine, alerts = budget_engine(loop, {"chrome.exe": (HOUR,)})
+    capture = open_window(engine, loop, 1, CHROME)
+    loop.advance(loop.now + HOUR // 2)
+    close_window(engine, loop, capture)
+    assert loop.armed == []
+
+    # Time used earlier in the day still counts when the program comes back.
+    loop.advance(loop.now + 3 * HOUR)
+    open_window(engine, loop, 2, CHROME)
+    assert loop.armed == [loop.now + HOUR // 2]
+    loop.advance(loop.now + HOUR // 2)
+    assert alerts == [(CHROME, HOUR)]
+
+
+def test_a_single_timer_follows_the_earliest_deadline():
+    loop = FakeLoop(local_time(2024, 3, 4, 9))
+    engine, alerts = budget_engine(loop, {"chrome.exe": (2 * HOUR,), "code.exe": (HOUR,)})
+    open_window(engine, loop, 1, CHROME)
+    open_window(engine, loop, 2, CODE)
+    open_window(engine, loop, 3, "\\Device\\HarddiskVolume3\\Windows\\notepad.exe")
+    assert loop.armed == [loop.now + HOUR]
+
+    loop.advance(loop.now + HOUR)
+    assert alerts == [(CODE, HOUR)]
+    assert loop.armed == [loop.now + HOUR]
+    loop.advance(loop.now + HOUR)
+    assert alerts == [(CODE, HOUR), (CHROME, 2 * HOUR)]
+
+
+def test_budgets_start_over_at_midnight():
+    loop = FakeLoop(local_time(2024, 3, 4, 23))
+    engine, alerts = budget_engine(loop, {"chrome.exe": (2 * HOUR,)})
+    open_window(engine, loop, 1, CHROME)
+    assert loop.armed == [local_time(2024, 3, 5, 1)]
+
+    # The timer fires after midnight, when only the hour since midnight counts, so it is armed again.
+    loop.advance(local_time(2024, 3, 5, 1))
+    assert alerts == []
+    assert loop.armed == [local_time(2024, 3, 5, 2)]
+    loop.advance(local_time(2024, 3, 5, 2))
+    assert alerts == [(CHROME, 2 * HOUR)]
@@ -0,0 +1,79 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from random import Random
+
+from helpers import window
+from helpers.compaction import merge_session
+from helpers.session import read_session, write_session
+from helpers.window import update_capture_state, checkpoint_capture_state, finalize_capture_state
+from tests.desktop import random_desktop
+
+
+def test_checkpoints_keep_memory_flat(monkeypatch, tmp_path):
+    desktop = random_desktop(40, process_count=5)
+    desktop.install(monkeypatch)
+    clock = [1_000_000.0]
+    monkeypatch.setattr(window, "time", lambda: clock[0])
+
+    checkpoint_path = str(tmp_path / "screentime-session.jsonl")
+    captures, states = {}, {}
+    random = Random(0)
+    captured_time = 0
+    held_states = []
+    for scan in range(1, 1001):
+        # Every scan retitles a few windows with titles never seen before, the worst case for the detail held.
+        for number, fake_window in enumerate(random.sample(desktop.windows, 4)):
+            fake_window.title = "Document %d.%d" % (scan, number)
+        update_capture_state(captures, states)
+        # Each open capture is credited the second until the next scan.
+        captured_time += len(captures) * 1000
+        clock[0] += 1
+
+        if scan % 100 == 0:
+            held_states.append(sum(map(len, states.values())))
+            merge_session(checkpoint_path, checkpoint_capture_state(captures, states))
+            assert not states
+
+    merge_session(checkpoint_path, finalize_capture_state(captures, states))
+
+    # Only the detail of one checkpoint interval is ever held, however long the session runs.
+    assert max(held_states) <= 2 * min(held_states)
+    rows = list(read_session(checkpoint_path))
+    assert sum(duration for _, duration in rows) == captured_time
+    assert len(rows) == len({key for key, _ in rows})
+
+
+def test_merge_session_adds_to_an_earlier_run(monkeypatch, tmp_path):
+    desktop = random_desktop(10)
+    desktop.install(monkeypatch)
+    clock = [1_000_000.0]
+    monkeypatch.setattr(window, "time", lambda: clock[0])
+
+    captures, states = {}, {}
+    update_capture_state(captures, states)
+    clock[0] += 60
+    results = finalize_capture_state(captures, states)
+
+    checkpoint_path = str(tmp_path / "screentime-session.jsonl")
+    write_session(checkpoint_path, results)
+    merge_session(checkpoint_path, results)
+
+    rows = list(read_session(checkpoint_path))
+    assert len(rows) == len(captures)
+    assert all(duration == 2 * 60 * 1000 for _, duration in rows)
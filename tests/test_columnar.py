@@ -0,0 +1,161 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from asyncio import Event, run, create_task, get_running_loop, sleep
+from glob import glob
+from itertools import count
+
+import pytest
+
+from helpers import columnar, window
+from helpers.pipeline import CapturePipeline
+from helpers.rectangle import rectangle_from_positions
+from helpers.session import read_session
+from helpers.window import WindowCapture, WindowState
+from main import routine_checkpoint
+from tests.desktop import random_desktop
+
+pyarrow = pytest.importorskip("pyarrow")
+ipc = pytest.importorskip("pyarrow.ipc")
+parquet = pytest.importorskip("pyarrow.parquet")
+
+
+def close_states(exporter: columnar.ColumnarExporter, count: int, first: int = 0) -> list[dict]:
+    rows = []
+    for number in range(first, first + count):
+        rectangle = rectangle_from_positions(number, number, number + 800, number + 600)
+        capture = WindowCapture(
+            handle=number % 7,
+            process="program%d.exe" % (number % 3),
+            title="Document %d" % (number % 5),
+            rectangle=rectangle,
+            time_start=1_700_000_000_000 + number * 1000
+        )
+        state = WindowState(title=capture.title, rectangle=rectangle, duration=number * 10)
+        exporter.capture_closed(capture, state)
+        rows.append({
+            "handle": capture.handle,
+            "process": capture.process,
+            "title": capture.title,
+            "left": rectangle.left,
+            "top": rectangle.top,
+            "right": rectangle.right,
+            "bottom": rectangle.bottom,
+            "time_start": capture.time_start,
+            "duration": state.duration,
+        })
+    return rows
+
+
+def table_rows(table) -> list[dict]:
+    table = table.cast(pyarrow.schema([
+        (name, pyarrow.string() if pyarrow.types.is_dictionary(field.type) else field.type)
+        for name, field in zip(table.schema.names, table.schema)
+    ]))
+    rows = table.to_pylist()
+    for row in rows:
+        row["time_start"] = round(row["time_start"].timestamp() * 1000)
+    return rows
+
+
+def test_parquet_row_groups(tmp_path):
+    path = str(tmp_path / "sessions.parquet")
+    exporter = columnar.ColumnarExporter(path, row_group_size=10)
+    rows = close_states(exporter, 25)
+    exporter.close()
+
+    file = parquet.ParquetFile(path)
+    assert file.metadata.num_row_groups == 3
+    assert file.schema_arrow.field("process").type == pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    column = file.metadata.row_group(0).column(file.schema_arrow.names.index("title"))
+    assert "RLE_DICTIONARY" in column.encodings or "PLAIN_DICTIONARY" in column.encodings
+    assert table_rows(file.read()) == rows
+
+
+def test_ipc_batches(tmp_path):
+    path = str(tmp_path / "sessions.arrow")
+    exporter = columnar.ColumnarExporter(path, row_group_size=10)
+    rows = close_states(exporter, 25)
+    exporter.close()
+
+    with ipc.open_stream(path) as reader:
+        batches = list(reader)
+    assert [batch.num_rows for batch in batches] == [10, 10, 5]
+    assert all(pyarrow.types.is_dictionary(batch.schema.field("title").type) for batch in batches)
+    assert table_rows(pyarrow.Table.from_batches(batches)) == rows
+
+
+def test_rollover_finishes_every_parquet_file(tmp_path, monkeypatch):
+    clock = [1_000.0]
+    monkeypatch.setattr(columnar, "time", lambda: clock[0])
+    path = str(tmp_path / "sessions.parquet")
+    exporter = columnar.ColumnarExporter(path, row_group_size=10, rollover=True)
+    rows = close_states(exporter, 15)
+    exporter.rollover()
+    clock[0] += 60
+    # Nothing closed in between, so no file is started.
+    exporter.rollover()
+    clock[0] += 60
+    rows += close_states(exporter, 5, first=15)
+    exporter.rollover()
+    clock[0] += 60
+    # The file being written when the tracker dies is lost, but the finished ones can be read.
+    close_states(exporter, 3, first=20)
+    exporter.flush()
+
+    assert exporter.parts == [
+        str(tmp_path / "sessions-1000000.parquet"),
+        str(tmp_path / "sessions-1120000.parquet"),
+        str(tmp_path / "sessions-1180000.parquet"),
+    ]
+    assert not (tmp_path / "sessions.parquet").exists()
+    assert table_rows(parquet.read_table(exporter.parts[:2])) == rows
+    exporter.close()
+    assert sorted(glob(str(tmp_path / "sessions-*.parquet"))) == exporter.parts
+    assert len(parquet.read_table(exporter.parts)) == 23
+
+
+def test_daemon_checkpoints_roll_the_export_over(monkeypatch, tmp_path):
+    desktop = random_desktop(5)
+    desktop.install(monkeypatch)
+    clock = [1_000_000.0]
+    monkeypatch.setattr(window, "time", lambda: clock[0])
+    monkeypatch.setattr(columnar, "time", lambda: clock[0])
+    checkpoint_path = str(tmp_path / "screentime-session.jsonl")
+    exporter = columnar.ColumnarExporter(str(tmp_path / "sessions.parquet"), rollover=True)
+
+    async def checkpoint():
+        pipeline = CapturePipeline([exporter])
+        pipeline.scan()
+        stop_event = Event()
+        task = create_task(routine_checkpoint(
+            get_running_loop(), pipeline, stop_event, checkpoint_path, 0.01, count(1), exporter=exporter
+        ))
+        while len(exporter.parts) < 2:
+            clock[0] += 1
+            await sleep(0.01)
+        stop_event.set()
+        await task
+
+    run(checkpoint())
+
+    # Every checkpoint finished the file holding the states it saved, before the exporter was closed.
+    exported = parquet.read_table(exporter.parts)
+    assert len(exporter.parts) == 2
+    assert sum(exported.column("duration").to_pylist()) == sum(duration for _, duration in read_session(checkpoint_path))
+    exporter.close()
@@ -0,0 +1,120 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+from collections import Counter
+
+import pytest
+
+from helpers import session
+from helpers.compaction import compact_sessions
+from helpers.rectangle import rectangle_from_positions
+from helpers.report import summarize_session
+from helpers.session import read_session, write_session_rows, session_sort_key
+
+SMALL = rectangle_from_positions(0, 0, 800, 600)
+LARGE = rectangle_from_positions(0, 0, 1920, 1080)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def write_inputs(directory, count: int) -> list[str]:
+    paths = []
+    for number in range(count):
+        # Every file shares some rows with the others, so a file merged twice would show up in the durations.
+        rows = {
+            ("editor.exe", "Notes", SMALL): 1000 * (number + 1),
+            ("editor.exe", "File %d" % number, LARGE): 500,
+            ("browser.exe", "News", LARGE): 2000,
+        }
+        path = str(directory / ("session-%d.jsonl" % number))
+        write_session_rows(path, sorted(rows.items(), key=lambda row: session_sort_key(row[0])))
+        paths.append(path)
+    return paths
+
+
+def expected_rows(paths: list[str]) -> Counter:
+    return sum((Counter(dict(read_session(path))) for path in paths), Counter())
+
+
+def interrupt_at(monkeypatch, step: int) -> list[int]:
+    # Fails the step-th file operation that makes compaction progress, as if the machine lost power right before it.
+    steps = [0]
+
+    def interruptible(operation):
+        def run(*args):
+            steps[0] += 1
+            if steps[0] == step:
+                raise Interrupted()
+            return operation(*args)
+        return run
+
+    monkeypatch.setattr(os, "replace", interruptible(os.replace))
+    monkeypatch.setattr(os, "remove", interruptible(os.remove))
+    monkeypatch.setattr(session, "replace", interruptible(session.replace))
+    return steps
+
+
+def test_compaction_merges_every_row_once(tmp_path):
+    inputs = write_inputs(tmp_path, 5)
+    output = str(tmp_path / "compacted.jsonl")
+    statistics = compact_sessions(inputs, output, batch_size=2)
+    assert Counter(dict(read_session(output))) == expected_rows(inputs)
+    assert (statistics.input_files, statistics.input_rows, statistics.output_rows) == (5, 15, 7)
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(path) for path in inputs] + ["compacted.jsonl"])
+
+
+@pytest.mark.parametrize("more_inputs", [False, True], ids=["same inputs", "one more input"])
+def test_compaction_resumes_after_every_step(monkeypatch, tmp_path, more_inputs):
+    inputs = write_inputs(tmp_path, 3)
+    steps = interrupt_at(monkeypatch, 0)
+    compact_sessions(inputs[:2], str(tmp_path / "uninterrupted.jsonl"), batch_size=1)
+    step_count = steps[0]
+    monkeypatch.undo()
+
+    for step in range(1, step_count + 1):
+        directory = tmp_path / ("interrupted-%d" % step)
+        directory.mkdir()
+        output = str(directory / "compacted.jsonl")
+        interrupt_at(monkeypatch, step)
+        with pytest.raises(Interrupted):
+            compact_sessions(inputs[:2], output, batch_size=1)
+        monkeypatch.undo()
+
+        resumed_inputs = inputs if more_inputs else inputs[:2]
+        compact_sessions(resumed_inputs, output, batch_size=1)
+        assert Counter(dict(read_session(output))) == expected_rows(resumed_inputs), "interrupted at step %d" % step
+        assert os.listdir(directory) == ["compacted.jsonl"]
+
+
+def test_coarse_rows_keep_their_screen_area(tmp_path):
+    path = str(tmp_path / "session.jsonl")
+    write_session_rows(path, [
+        (("editor.exe", "Notes", SMALL), 3000),
+        (("editor.exe", "Notes", LARGE), 1000),
+    ])
+    output = str(tmp_path / "compacted.jsonl")
+    compact_sessions([path], output, coarse=True)
+
+    rows = list(read_session(output))
+    assert [(key[:2], duration) for key, duration in rows] == [(("editor.exe", "Notes"), 4000)]
+    # The time weighted average of 800 x 600 for three seconds and 1920 x 1080 for one.
+    average_area = (SMALL.area * 3000 + LARGE.area * 1000) / 4000
+    assert summarize_session(rows)[0].average_screen_area == pytest.approx(average_area, rel=0.001)
@@ -0,0 +1,92 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from asyncio import run
+from random import Random
+
+from helpers.fleet import FleetSink, FleetCollector, FleetBatch
+from helpers.rectangle import rectangle_from_positions
+from helpers.window import WindowCapture, WindowState
+
+
+class LossyCollector(FleetCollector):
+    """
+    Drops the connection instead of acknowledging the first few batches it merges, as if the acknowledgements were lost.
+    """
+
+    def __init__(self, losses: int):
+        super().__init__()
+        self.losses = losses
+
+    def merge(self, batch: FleetBatch) -> bool:
+        merged = super().merge(batch)
+        if merged and self.losses:
+            self.losses -= 1
+            raise ConnectionResetError("acknowledgement lost")
+        return merged
+
+
+def simulate_tracker(sink: FleetSink, random: Random, expected: dict[str, int]):
+    # Closes a few hundred captures of a handful of programs, as a tracker would between two batches.
+    for handle in range(random.randint(100, 300)):
+        process = "C:\\Programs\\program%d.exe" % random.randint(1, 5)
+        rectangle = rectangle_from_positions(0, 0, random.randint(100, 2000), random.randint(100, 1000))
+        capture = WindowCapture(handle=handle, process=process, title="Document", rectangle=rectangle, time_start=0)
+        state = WindowState(
+            title="Document %d" % random.randint(1, 50),
+            rectangle=rectangle,
+            duration=random.randint(1, 10 ** 6)
+        )
+        sink.capture_closed(capture, state)
+        expected[process] = expected.get(process, 0) + state.duration
+
+
+async def collect(losses: int, runs: int, batches: int) -> tuple[FleetCollector, dict[str, int]]:
+    collector = LossyCollector(losses)
+    server = await collector.serve(("127.0.0.1", 0))
+    address = server.sockets[0].getsockname()[:2]
+
+    random = Random(0)
+    expected = {}
+    for _ in range(runs):
+        # Every run of a tracker numbers its batches from the start again.
+        sink = FleetSink(address, machine="tracker", interval=3600, timeout=5)
+        for _ in range(batches):
+            simulate_tracker(sink, random, expected)
+            while not await sink.flush():
+                pass
+        await sink.close()
+
+    server.close()
+    await server.wait_closed()
+    return collector, expected
+
+
+def test_batches_sent_again_are_merged_once():
+    collector, expected = run(collect(losses=3, runs=1, batches=5))
+    assert collector.batches == 5
+    assert collector.duplicates == 3
+    assert {process: aggregate.duration for process, aggregate in collector.processes.items()} == expected
+
+
+def test_every_run_of_a_tracker_is_merged():
+    collector, expected = run(collect(losses=0, runs=3, batches=2))
+    assert collector.batches == 6
+    assert collector.duplicates == 0
+    assert collector.machines == {"tracker"}
+    assert {process: aggregate.duration for process, aggregate in collector.processes.items()} == expected
@@ -0,0 +1,51 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from asyncio import run
+
+from helpers import heartbeat
+from helpers.heartbeat import CaptureHeartbeat
+from helpers.pipeline import CapturePipeline, WinEvent
+from tests.desktop import random_desktop
+from winapi.user import EVENT_SYSTEM_FOREGROUND
+
+
+def test_heartbeat_backs_off_while_nothing_happens(monkeypatch):
+    desktop = random_desktop(5)
+    desktop.install(monkeypatch)
+    by_handle = {fake_window.handle: fake_window for fake_window in desktop.windows}
+    monkeypatch.setattr(heartbeat, "IsWindowVisible", lambda handle: int(by_handle[handle].visible))
+    monkeypatch.setattr(heartbeat, "IsIconic", lambda handle: int(by_handle[handle].iconic))
+
+    async def beat() -> list[float]:
+        pipeline = CapturePipeline()
+        pipeline.scan()
+        capture_heartbeat = CaptureHeartbeat(pipeline, min_interval=5, max_interval=60)
+        intervals = []
+        for number in range(6):
+            if number == 3:
+                pipeline.dispatcher.dispatch(WinEvent(EVENT_SYSTEM_FOREGROUND, desktop.windows[0].handle, 0, 0, 0))
+            if number == 5:
+                desktop.windows[0].iconic = True
+            capture_heartbeat.beat()
+            intervals.append(capture_heartbeat.interval)
+        pipeline.finalize()
+        return intervals
+
+    # Quiet beats double the interval, while an event or a missed minimize brings it back down.
+    assert run(beat()) == [10, 20, 40, 5, 10, 5]
@@ -0,0 +1,76 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+
+from helpers.icons import IconCache, encode_png
+
+
+class CountingExtractor:
+    def __init__(self):
+        self.paths = []
+
+    def __call__(self, path: str):
+        self.paths.append(path)
+        if path.endswith("console.exe"):
+            return None
+        # A one pixel icon whose color depends on the path, so every program has its own icon.
+        return encode_png(1, 1, bytes([len(path) % 256, 0, 0, 255]))
+
+
+def test_icons_are_extracted_once_across_runs(tmp_path):
+    images = []
+    for name in ("editor.exe", "browser.exe", "console.exe"):
+        image = tmp_path / name
+        image.write_bytes(b"MZ")
+        images.append(str(image))
+    directory = str(tmp_path / "icons")
+
+    extractor = CountingExtractor()
+    icons = IconCache(directory, extractor=extractor)
+    assert [icons.digest(image) is not None for image in images] == [True, True, False]
+    icons.save()
+    assert len(extractor.paths) == 3
+
+    # A later run finds every icon, and every image without one, in the index.
+    extractor = CountingExtractor()
+    icons = IconCache(directory, extractor=extractor)
+    assert icons.read(images[0]).startswith(b"\x89PNG")
+    assert icons.digest(images[2]) is None
+    assert extractor.paths == []
+
+    # An image that was replaced since is extracted again.
+    modified = os.stat(images[1]).st_mtime_ns + 1_000_000_000
+    os.utime(images[1], ns=(modified, modified))
+    icons.digest(images[1])
+    assert extractor.paths == [images[1]]
+
+
+def test_evicted_icons_are_extracted_again(tmp_path):
+    directory = str(tmp_path / "icons")
+    extractor = CountingExtractor()
+    icons = IconCache(directory, max_bytes=1, extractor=extractor)
+    icons.digest("C:\\Programs\\editor.exe")
+    icons.digest("C:\\Programs\\browser.exe")
+    icons.save()
+
+    extractor = CountingExtractor()
+    icons = IconCache(directory, max_bytes=1, extractor=extractor)
+    icons.digest("C:\\Programs\\browser.exe")
+    icons.digest("C:\\Programs\\editor.exe")
+    assert extractor.paths == ["C:\\Programs\\editor.exe"]
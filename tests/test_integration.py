@@ -0,0 +1,100 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import pytest
+
+from helpers import window
+from helpers.integration import ScreenAreaIntegrator
+from helpers.rectangle import rectangle_from_positions
+from helpers.window import update_capture_state, finalize_capture_state
+from tests.desktop import FakeDesktop, FakeWindow
+
+EDITOR = "C:\\Programs\\editor.exe"
+BROWSER = "C:\\Programs\\browser.exe"
+
+
+@pytest.fixture
+def clock(monkeypatch) -> list[float]:
+    clock = [1_000_000.0]
+    monkeypatch.setattr(window, "time", lambda: clock[0])
+    return clock
+
+
+@pytest.fixture
+def desktop(monkeypatch) -> FakeDesktop:
+    # The browser sits on top of the right half of the editor whenever it is shown.
+    desktop = FakeDesktop([
+        FakeWindow(handle=8, process_id=2, title="News", rectangle=rectangle_from_positions(500, 0, 1500, 1000)),
+        FakeWindow(handle=4, process_id=1, title="notes.txt", rectangle=rectangle_from_positions(0, 0, 1000, 1000)),
+    ], {1: EDITOR, 2: BROWSER})
+    desktop.install(monkeypatch)
+    return desktop
+
+
+@pytest.mark.parametrize("retitle", [False, True])
+def test_visible_area_follows_windows_covering_each_other(clock, desktop, retitle):
+    integrator = ScreenAreaIntegrator()
+    captures, states = {}, {}
+
+    def scan_after(seconds: float):
+        clock[0] += seconds
+        update_capture_state(captures, states, [integrator])
+
+    # The editor is alone for 10 seconds, half covered by the browser for 20, then alone again for 5.
+    desktop.window(8).visible = False
+    scan_after(0)
+    desktop.window(8).visible = True
+    scan_after(10)
+    if retitle:
+        # Renaming the file closes the editor's state half way, while it is covered.
+        desktop.window(4).title = "notes.md"
+        scan_after(10)
+        scan_after(10)
+    else:
+        scan_after(20)
+    desktop.window(8).visible = False
+    scan_after(0)
+    clock[0] += 5
+    finalize_capture_state(captures, states, [integrator])
+
+    editor = integrator.integral(EDITOR)
+    assert editor.duration == 35_000
+    assert editor.area_duration == 1_000_000 * 35_000
+    assert editor.visible_area_duration == 1_000_000 * 10_000 + 500_000 * 20_000 + 1_000_000 * 5_000
+    assert editor.average_visible_area == 25_000_000_000 // 35_000
+
+    browser = integrator.integral(BROWSER)
+    assert browser.duration == 20_000
+    assert browser.visible_area_duration == 1_000_000 * 20_000
+    assert integrator.share_visible_area(EDITOR) == pytest.approx(25 / 45)
+
+    # Being covered doesn't split the editor's state, only renaming it does.
+    assert sum(map(len, states.values())) == (3 if retitle else 2)
+
+
+def test_unchanged_windows_keep_their_visible_area(clock, desktop):
+    integrator = ScreenAreaIntegrator()
+    captures, states = {}, {}
+    for _ in range(10):
+        update_capture_state(captures, states, [integrator])
+        clock[0] += 1
+    finalize_capture_state(captures, states, [integrator])
+
+    assert integrator.integral(EDITOR).visible_area_duration == 500_000 * 10_000
+    assert integrator.integral(BROWSER).visible_area_duration == 1_000_000 * 10_000
+    assert integrator.total.duration == 20_000
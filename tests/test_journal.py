@@ -0,0 +1,81 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from itertools import count
+
+import pytest
+
+from helpers import window
+from helpers.compaction import merge_session
+from helpers.journal import CaptureJournal, recover_journal
+from helpers.session import read_session, read_session_generation
+from helpers.window import update_capture_state, checkpoint_capture_state
+from tests.desktop import random_desktop
+
+
+@pytest.mark.parametrize("crash", [
+    "after rotating", "before rotating", "before marking the checkpoint", "before saving the checkpoint"
+])
+def test_journal_recovers_what_the_checkpoint_missed(monkeypatch, tmp_path, crash):
+    desktop = random_desktop(20, process_count=4)
+    desktop.install(monkeypatch)
+    clock = [1_000_000.0]
+    monkeypatch.setattr(window, "time", lambda: clock[0])
+
+    journal_path = str(tmp_path / "screentime-journal.jsonl")
+    checkpoint_path = str(tmp_path / "screentime-session.jsonl")
+    generations = count(1)
+    journal = CaptureJournal(journal_path, commit_interval=0)
+    journal.checkpoint(next(generations))
+    captures, states = {}, {}
+    captured_time = 0
+    for scan in range(1, 31):
+        desktop.windows[scan % len(desktop.windows)].title = "Document %d" % scan
+        update_capture_state(captures, states, [journal])
+        captured_time += len(captures) * 1000
+        clock[0] += 1
+
+        if scan % 10 == 0:
+            last = scan == 30
+            generation = next(generations)
+            results = checkpoint_capture_state(captures, states, [journal])
+            if last and crash == "before marking the checkpoint":
+                # Everything up to the checkpoint made it into the journal, but not its mark or anything after.
+                journal.close()
+                merge_session(checkpoint_path, results, generation)
+                break
+            journal.checkpoint(generation)
+            # Another scan closes states while the checkpoint is saved, and the rotated journal must keep them.
+            desktop.windows[0].title = "Saving %d" % scan
+            captured_time += len(captures) * 500
+            clock[0] += 0.5
+            update_capture_state(captures, states, [journal])
+            if last and crash == "before saving the checkpoint":
+                break
+            merge_session(checkpoint_path, results, generation)
+            if not last or crash == "after rotating":
+                journal.rotate(generation, captures.values(), states)
+
+    # The tracker dies here, with the journal alive until now.
+    journal.heartbeat(round(clock[0] * 1000))
+    journal.close()
+
+    checkpointed_time = sum(duration for _, duration in read_session(checkpoint_path))
+    recovered = recover_journal(journal_path, read_session_generation(checkpoint_path))
+    recovered_time = sum(state.duration for result in recovered for state in result.states)
+    assert checkpointed_time + recovered_time == captured_time
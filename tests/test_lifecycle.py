@@ -0,0 +1,75 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from helpers import window
+from helpers.lifecycle import WindowLifecycleIndex
+from helpers.rectangle import rectangle_from_positions
+from helpers.window import WindowCapture, close_capture, open_capture, retitle_capture, evict_capture
+
+RECTANGLE = rectangle_from_positions(0, 0, 800, 600)
+
+
+def capture(handle: int, process: str = "editor.exe", title: str = "Notes", time_start: int = 0) -> WindowCapture:
+    return WindowCapture(handle=handle, process=process, title=title, rectangle=RECTANGLE, time_start=time_start)
+
+
+def test_closing_and_reopening_a_window():
+    index = WindowLifecycleIndex()
+    captures, states = {}, {}
+    open_capture(captures, capture(4), [index])
+    assert 4 in index
+
+    evict_capture(captures, states, (4, "editor.exe"), [index])
+    assert 4 not in index
+    evict_capture(captures, states, (4, "editor.exe"), [index])
+    assert 4 not in index
+
+    open_capture(captures, capture(4, time_start=1000), [index])
+    assert index.open_windows == {4: (4, "editor.exe")}
+
+
+def test_a_reused_handle_keeps_its_window():
+    index = WindowLifecycleIndex()
+    old = capture(4)
+    index.capture_opened(old)
+    # A scan opens the captures it finds before it closes the ones that are gone, so when another process reuses the
+    # handle, the old capture closes after the new one opened.
+    index.capture_opened(capture(4, process="browser.exe"))
+    close_capture({}, old, [index])
+    assert index.open_windows == {4: (4, "browser.exe")}
+
+
+def test_retitle_capture(monkeypatch):
+    monkeypatch.setattr(window, "time", lambda: 61.0)
+    index = WindowLifecycleIndex()
+    captures, states = {}, {}
+    key = (4, "editor.exe")
+    open_capture(captures, capture(4, time_start=1000), [index])
+
+    retitle_capture(captures, states, key, "Notes", [index])
+    assert captures[key].time_start == 1000
+    assert key not in states
+
+    retitle_capture(captures, states, key, "Renamed", [index])
+    assert captures[key] == capture(4, title="Renamed", time_start=61_000)
+    assert [(state.title, state.duration) for state in states[key]] == [("Notes", 60_000)]
+    assert 4 in index
+
+    # A window that isn't captured stays that way.
+    retitle_capture(captures, states, (8, "editor.exe"), "Renamed", [index])
+    assert (8, "editor.exe") not in captures
@@ -0,0 +1,131 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import subprocess
+import sys
+from argparse import Namespace
+from asyncio import Event, run, create_task, get_running_loop, sleep
+from itertools import count
+from pathlib import Path
+
+from helpers import compaction, snapshot, window
+from helpers.journal import CaptureJournal
+from helpers.pipeline import CapturePipeline
+from helpers.session import read_session, read_session_generation
+from helpers.window import update_capture_state
+from main import write_reports, routine_checkpoint, recover_session, DEFAULT_SNAPSHOT_NAME
+from tests.desktop import random_desktop
+
+REPOSITORY = Path(__file__).resolve().parent.parent
+
+# Helpers only some options need, which should not slow down every start of the tracker.
+OPTIONAL_MODULES = [
+    "helpers.columnar", "helpers.compaction", "helpers.fleet", "helpers.icons", "helpers.render", "helpers.snapshot",
+    "helpers.titles",
+]
+
+
+def test_optional_helpers_are_imported_on_demand():
+    loaded = subprocess.run(
+        [sys.executable, "-c", "import sys, conftest, main; print(' '.join(sys.modules))"],
+        cwd=REPOSITORY, check=True, capture_output=True, text=True
+    ).stdout.split()
+    assert [module for module in OPTIONAL_MODULES if module in loaded] == []
+
+
+def test_default_snapshot_name():
+    assert DEFAULT_SNAPSHOT_NAME == snapshot.DEFAULT_SNAPSHOT_NAME
+
+
+def test_summaries_are_only_computed_for_reports(tmp_path):
+    def summarize():
+        calls.append(None)
+        return []
+
+    calls = []
+    write_reports(Namespace(report_json=None, report_html=None), summarize)
+    assert calls == []
+
+    report_path = str(tmp_path / "report.json")
+    write_reports(Namespace(report_json=report_path, report_html=None), summarize)
+    assert calls == [None]
+
+
+def test_failed_checkpoint_is_retried(monkeypatch, tmp_path):
+    desktop = random_desktop(5)
+    desktop.install(monkeypatch)
+    clock = [1_000_000.0]
+    monkeypatch.setattr(window, "time", lambda: clock[0])
+
+    saves = []
+    merge_session = compaction.merge_session
+
+    def merge_held_session(path, results, generation=None):
+        saves.append(results)
+        if len(saves) == 1:
+            raise PermissionError("The process cannot access the file because it is being used by another process")
+        merge_session(path, results, generation)
+
+    monkeypatch.setattr(compaction, "merge_session", merge_held_session)
+
+    async def checkpoint():
+        pipeline = CapturePipeline()
+        pipeline.scan()
+        stop_event = Event()
+        task = create_task(routine_checkpoint(
+            get_running_loop(), pipeline, stop_event, str(tmp_path / "screentime-session.jsonl"), 0.01, count(1)
+        ))
+        while len(saves) < 2 and not task.done():
+            clock[0] += 1
+            await sleep(0.01)
+        stop_event.set()
+        await task
+
+    run(checkpoint())
+
+    # The daemon kept checkpointing, and the states of the failed save went into the next one.
+    failed_states = {(result.handle, state) for result in saves[0] for state in result.states}
+    saved_states = {(result.handle, state) for result in saves[1] for state in result.states}
+    assert failed_states and failed_states <= saved_states
+
+
+def test_daemon_recovers_into_its_checkpoint(monkeypatch, tmp_path):
+    desktop = random_desktop(5)
+    desktop.install(monkeypatch)
+    clock = [1_000_000.0]
+    monkeypatch.setattr(window, "time", lambda: clock[0])
+
+    journal_path = str(tmp_path / "screentime-journal.jsonl")
+    checkpoint_path = str(tmp_path / "screentime-session.jsonl")
+    journal = CaptureJournal(journal_path, commit_interval=0)
+    journal.checkpoint(1)
+    captures, states = {}, {}
+    update_capture_state(captures, states, [journal])
+    clock[0] += 60
+    journal.heartbeat(round(clock[0] * 1000))
+    journal.close()
+
+    generations = count(2)
+    recover_session(journal_path, checkpoint_path, generations)
+    assert sum(duration for _, duration in read_session(checkpoint_path)) == len(captures) * 60_000
+    assert read_session_generation(checkpoint_path) == 2
+    assert [path.name for path in tmp_path.iterdir() if "recovered" in path.name] == []
+
+    # Recovering the same journal again finds everything already saved.
+    recover_session(journal_path, checkpoint_path, generations)
+    assert sum(duration for _, duration in read_session(checkpoint_path)) == len(captures) * 60_000
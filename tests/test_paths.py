@@ -0,0 +1,49 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from helpers import paths
+from helpers.paths import DevicePathMap
+
+
+def test_normalize_translates_device_paths():
+    path_map = DevicePathMap(lambda: {"\\Device\\HarddiskVolume3": "C:"})
+    assert path_map.normalize("\\Device\\HarddiskVolume3\\Windows\\explorer.exe") == "C:\\Windows\\explorer.exe"
+    assert path_map.normalize("C:\\Windows\\explorer.exe") == "C:\\Windows\\explorer.exe"
+
+
+def test_normalize_translates_paths_once_their_volume_is_mounted(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(paths, "monotonic", lambda: clock[0])
+    volumes = {"\\Device\\HarddiskVolume3": "C:"}
+    queries = []
+
+    def query_volumes() -> dict[str, str]:
+        queries.append(clock[0])
+        return dict(volumes)
+
+    path_map = DevicePathMap(query_volumes, refresh_interval=30)
+    path = "\\Device\\HarddiskVolume7\\Programs\\program.exe"
+    assert path_map.normalize(path) == path
+    # The volume table was just refreshed, so it isn't queried again for every path it doesn't know.
+    assert path_map.normalize(path) == path
+    assert len(queries) == 1
+
+    volumes["\\Device\\HarddiskVolume7"] = "E:"
+    clock[0] += 30
+    assert path_map.normalize(path) == "E:\\Programs\\program.exe"
+    assert len(queries) == 2
@@ -0,0 +1,212 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from asyncio import run, create_task, sleep
+from threading import Event
+
+import pytest
+
+from helpers import window
+from helpers.pipeline import CapturePipeline, WinEvent, WinEventDispatcher
+from helpers.policy import CapturePolicy
+from helpers.process import ProcessNameResolver
+from helpers.window import WindowState
+from tests.desktop import random_desktop
+from winapi.user import EVENT_OBJECT_DESTROY, EVENT_OBJECT_HIDE, EVENT_OBJECT_SHOW, EVENT_OBJECT_NAMECHANGE, \
+    EVENT_SYSTEM_FOREGROUND, OBJID_WINDOW, CHILDID_SELF
+
+
+def captured_processes(pipeline: CapturePipeline) -> set[str]:
+    return {capture.process for capture in pipeline.captures.values()}
+
+
+def test_windows_are_captured_once_a_slow_lookup_finishes(monkeypatch):
+    desktop = random_desktop(10, process_count=2)
+    released = Event()
+
+    def lookup(process_id: int) -> str:
+        if process_id == 1:
+            released.wait()
+        return desktop.images[process_id]
+
+    desktop.process_names = ProcessNameResolver(lookup=lookup, timeout=0.01)
+    desktop.install(monkeypatch)
+
+    async def capture() -> tuple[set[str], set[str]]:
+        pipeline = CapturePipeline(process_names=desktop.process_names)
+        task = create_task(pipeline.run())
+        await sleep(0)
+        processes_before = captured_processes(pipeline)
+
+        # No event arrives after the lookup finishes, so only the pipeline itself can scan again.
+        released.set()
+        for _ in range(100):
+            await sleep(0.01)
+            if desktop.images[1] in captured_processes(pipeline):
+                break
+        processes_after = captured_processes(pipeline)
+
+        task.cancel()
+        pipeline.finalize()
+        return processes_before, processes_after
+
+    processes_before, processes_after = run(capture())
+    assert desktop.images[1] not in processes_before
+    assert desktop.images[1] in processes_after
+
+
+def window_event(event: int, handle: int) -> WinEvent:
+    return WinEvent(event, handle, OBJID_WINDOW, CHILDID_SELF, 0)
+
+
+@pytest.fixture
+def desktop(monkeypatch):
+    desktop = random_desktop(20, process_count=3)
+    desktop.install(monkeypatch)
+    clock = [1_000_000.0]
+    monkeypatch.setattr(window, "time", lambda: clock[0])
+    desktop.clock = clock
+    return desktop
+
+
+async def new_pipeline(**options) -> CapturePipeline:
+    # Before Python 3.10, the event queue needs an event loop when it is created, as it has in the tracker.
+    return CapturePipeline(**options)
+
+
+@pytest.fixture
+def pipeline(desktop):
+    pipeline = run(new_pipeline(process_names=desktop.process_names, screen_index=desktop.screen_index))
+    pipeline.scan()
+    return pipeline
+
+
+def test_event_ranges_cover_exactly_the_registered_events():
+    dispatcher = WinEventDispatcher()
+    handler = lambda _event: False
+    dispatcher.register(handler, 7, 1, 2)
+    dispatcher.register(handler, 3, 5, 8)
+    assert dispatcher.event_ranges() == [(1, 3), (5, 5), (7, 8)]
+
+    dispatcher = run(new_pipeline()).dispatcher
+    events = [event for event_min, event_max in dispatcher.event_ranges() for event in range(event_min, event_max + 1)]
+    assert sorted(events) == sorted(dispatcher.handlers)
+    assert EVENT_SYSTEM_FOREGROUND in events
+
+
+def test_dispatcher_counts_every_event():
+    dispatcher = WinEventDispatcher()
+    dispatcher.register(lambda _event: True, EVENT_OBJECT_SHOW)
+    assert dispatcher.dispatch(window_event(EVENT_OBJECT_SHOW, 4))
+    assert not dispatcher.dispatch(window_event(EVENT_OBJECT_HIDE, 4))
+    assert dispatcher.named_counts() == {"EVENT_OBJECT_SHOW": 1, "EVENT_OBJECT_HIDE": 1}
+
+
+@pytest.mark.parametrize("event", [EVENT_OBJECT_HIDE, EVENT_OBJECT_DESTROY])
+def test_window_gone_closes_its_capture_without_a_scan(desktop, pipeline, event):
+    key = next(iter(pipeline.captures))
+    handle = key[0]
+    others = {other: capture for other, capture in pipeline.captures.items() if other != key}
+    desktop.clock[0] += 60
+    desktop.window(handle).visible = False
+
+    assert not pipeline.dispatcher.dispatch(window_event(event, handle))
+    assert key not in pipeline.captures
+    assert handle not in pipeline.windows
+    assert handle not in desktop.screen_index
+    assert [state.duration for state in pipeline.states[key]] == [60_000]
+    # Nothing else was touched.
+    assert pipeline.captures == others
+
+    # The scan the next unrelated event causes agrees.
+    pipeline.scan()
+    assert key not in pipeline.captures
+    assert [state.duration for state in pipeline.states[key]] == [60_000]
+
+
+def test_window_gone_that_was_never_captured(desktop, pipeline):
+    desktop.window(4).title = "Private"
+    pipeline.policy = CapturePolicy(exclude_titles=["Private"])
+    pipeline.scan()
+    assert 4 not in pipeline.windows
+    assert 4 in desktop.screen_index
+
+    desktop.window(4).visible = False
+    assert not pipeline.dispatcher.dispatch(window_event(EVENT_OBJECT_HIDE, 4))
+    assert 4 not in desktop.screen_index
+
+
+def test_window_shown_scans_only_for_new_top_level_windows(desktop, pipeline):
+    handle = next(iter(pipeline.captures))[0]
+    assert not pipeline.dispatcher.dispatch(window_event(EVENT_OBJECT_SHOW, handle))
+    assert not pipeline.dispatcher.dispatch(window_event(EVENT_OBJECT_SHOW, 1_000_001))
+
+    desktop.window(handle).visible = False
+    pipeline.dispatcher.dispatch(window_event(EVENT_OBJECT_HIDE, handle))
+    desktop.window(handle).visible = True
+    assert pipeline.dispatcher.dispatch(window_event(EVENT_OBJECT_SHOW, handle))
+    pipeline.scan()
+    assert handle in pipeline.windows
+
+
+def test_name_changed_retitles_the_capture(desktop, pipeline):
+    key = next(iter(pipeline.captures))
+    handle = key[0]
+    capture = pipeline.captures[key]
+    desktop.clock[0] += 60
+    desktop.window(handle).title = "Renamed"
+
+    assert not pipeline.dispatcher.dispatch(window_event(EVENT_OBJECT_NAMECHANGE, handle))
+    retitled = pipeline.captures[key]
+    assert retitled.title == "Renamed"
+    assert retitled.rectangle == capture.rectangle
+    assert retitled.time_start == capture.time_start + 60_000
+    assert pipeline.states[key] == {WindowState(capture.title, capture.rectangle, 60_000)}
+    assert pipeline.windows.open_windows[handle] == key
+
+    # The same title again changes nothing.
+    desktop.clock[0] += 60
+    assert not pipeline.dispatcher.dispatch(window_event(EVENT_OBJECT_NAMECHANGE, handle))
+    assert pipeline.captures[key] is retitled
+    assert len(pipeline.states[key]) == 1
+
+
+def test_name_changed_applies_the_policy(desktop, pipeline):
+    key = next(iter(pipeline.captures))
+    handle = key[0]
+    pipeline.policy = CapturePolicy(exclude_titles=["Private"])
+    desktop.window(handle).title = "Private"
+
+    assert not pipeline.dispatcher.dispatch(window_event(EVENT_OBJECT_NAMECHANGE, handle))
+    assert key not in pipeline.captures
+    assert handle not in pipeline.windows
+
+    # Once it is allowed again, only a scan can tell whether it is visible.
+    desktop.window(handle).title = "Public"
+    assert pipeline.dispatcher.dispatch(window_event(EVENT_OBJECT_NAMECHANGE, handle))
+    assert not pipeline.dispatcher.dispatch(window_event(EVENT_OBJECT_NAMECHANGE, 1_000_001))
+    pipeline.scan()
+    assert pipeline.captures[key].title == "Public"
+
+
+def test_name_changed_uses_the_title_transform(desktop, pipeline):
+    key = next(iter(pipeline.captures))
+    pipeline.title_transform = str.upper
+    desktop.window(key[0]).title = "Renamed"
+    pipeline.dispatcher.dispatch(window_event(EVENT_OBJECT_NAMECHANGE, key[0]))
+    assert pipeline.captures[key].title == "RENAMED"
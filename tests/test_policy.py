@@ -0,0 +1,36 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from helpers.policy import CapturePolicy
+
+
+def test_title_decisions():
+    policy = CapturePolicy(exclude_titles=["(?i)private", "secret"], include_titles=["Editor$"], title_cache_size=4)
+    for _ in range(2):
+        assert policy.allows_title("Notes - Editor")
+        assert not policy.allows_title("PRIVATE Notes - Editor")
+        assert not policy.allows_title("secret - Editor")
+        assert not policy.allows_title("Notes - Browser")
+
+
+def test_title_decisions_are_bounded():
+    policy = CapturePolicy(exclude_titles=["private"], title_cache_size=100)
+    for number in range(1000):
+        assert policy.allows_title("Document %d" % number)
+        assert len(policy._title_decisions) <= 100
+    assert not policy.allows_title("private Document 1")
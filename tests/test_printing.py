@@ -0,0 +1,25 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from helpers.printing import pretty_duration
+
+
+def test_pretty_duration():
+    assert pretty_duration(3_723_500) == "1 hours 2 minutes 3.5 seconds"
+    assert pretty_duration(24 * 3_600_000) == "1 days 0.0 seconds"
+    assert pretty_duration(1000 * 3_600_000) == "41 days 16 hours 0.0 seconds"
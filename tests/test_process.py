@@ -0,0 +1,69 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import subprocess
+import sys
+from os.path import dirname
+from threading import Event
+
+from helpers.process import ProcessNameResolver
+
+
+def test_failed_lookups_leave_the_process_unresolved():
+    def lookup(process_id: int) -> str:
+        if process_id == 1:
+            raise OSError("access denied")
+        if process_id == 2:
+            raise TimeoutError("the process did not answer")
+        return "program%d.exe" % process_id
+
+    process_names = ProcessNameResolver(lookup=lookup)
+    assert process_names.resolve([1, 2, 3]) == {1: None, 2: None, 3: "program3.exe"}
+    # A lookup that raised finished, so the caller is not told to wait for it.
+    assert process_names.pending == []
+    process_names.close()
+
+
+def test_close_abandons_hung_lookups():
+    released = Event()
+    process_names = ProcessNameResolver(lookup=lambda process_id: released.wait(), max_workers=1, timeout=0.01)
+    assert process_names.resolve([1, 2]) == {}
+    running, queued = process_names.pending
+    process_names.close()
+    assert queued.cancelled()
+    assert process_names.pending == []
+    released.set()
+    assert running.result(1)
+
+    # A later scan starts over.
+    process_names.lookup = lambda process_id: "program%d.exe" % process_id
+    assert process_names.resolve([1]) == {1: "program1.exe"}
+    process_names.close()
+
+
+def test_hung_lookups_do_not_keep_the_interpreter_alive():
+    script = "\n".join([
+        # Lets the Windows bindings import anywhere, as they do for the tests.
+        "import conftest",
+        "from threading import Event",
+        "from helpers.process import ProcessNameResolver",
+        "process_names = ProcessNameResolver(lookup=lambda process_id: Event().wait(), timeout=0.01)",
+        "process_names.resolve([1])",
+        "process_names.close()",
+    ])
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=10, cwd=dirname(dirname(__file__)))
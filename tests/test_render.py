@@ -0,0 +1,32 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from io import StringIO
+
+from helpers.render import render_html
+from helpers.rollup import RollupRing
+
+
+def test_timeline_heading():
+    output = StringIO()
+    render_html([], output, timeline=RollupRing(3600000, 24), time_end=0)
+    assert "Last 24 hours" in output.getvalue()
+
+    output = StringIO()
+    render_html([], output, timeline=RollupRing(60000, 90), bucket_count=90, time_end=0)
+    assert "Last 1 hours 30 minutes 0.0 seconds" in output.getvalue()
@@ -0,0 +1,80 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from helpers.rectangle import rectangle_from_positions
+from helpers.report import summarize_results
+from helpers.window import WindowResult, WindowState
+
+SMALL = rectangle_from_positions(0, 0, 100, 100)
+LARGE = rectangle_from_positions(0, 0, 400, 100)
+
+
+def result(handle: int, process: str, *states: tuple[str, int, object]) -> WindowResult:
+    return WindowResult(handle=handle, process=process, states=frozenset(
+        WindowState(title=title, rectangle=rectangle, duration=duration) for title, duration, rectangle in states
+    ))
+
+
+RESULTS = [
+    result(1, "editor.exe", ("Notes", 1000, SMALL), ("Todo", 4000, LARGE)),
+    result(2, "editor.exe", ("Notes", 2000, LARGE)),
+    result(3, "browser.exe", ("Mail", 5000, SMALL)),
+    result(4, "player.exe", ("Music", 500, SMALL)),
+]
+
+
+def test_processes_are_ordered_by_active_time():
+    summaries = summarize_results(RESULTS)
+    assert [summary.process for summary in summaries] == ["editor.exe", "browser.exe", "player.exe"]
+    assert [summary.gross_active_time for summary in summaries] == [7000, 5000, 500]
+    assert [summary.share_active_time for summary in summaries] == [7000 / 12500, 5000 / 12500, 500 / 12500]
+    editor = summaries[0]
+    assert editor.top_titles == ("Todo", "Notes")
+    assert editor.distinct_titles == 2
+    assert editor.average_visible_area is None and editor.share_visible_area is None
+
+
+def test_limit_cuts_off_the_shortest():
+    summaries = summarize_results(RESULTS, limit=2, top_title_count=1)
+    assert [summary.process for summary in summaries] == ["editor.exe", "browser.exe"]
+    assert summaries[0].top_titles == ("Todo",)
+    # Shares are still of every process, including the ones cut off.
+    assert summaries[1].share_active_time == 5000 / 12500
+    assert summarize_results(RESULTS, limit=0) == []
+
+
+def test_screen_area_is_weighted_by_time():
+    editor, browser, player = summarize_results(RESULTS)
+    editor_area = SMALL.area * 1000 + LARGE.area * 6000
+    assert editor.average_screen_area == editor_area // 7000
+    total_area = editor_area + SMALL.area * 5500
+    assert editor.share_screen_area == editor_area / total_area
+    assert browser.average_screen_area == SMALL.area
+    assert browser.share_screen_area == SMALL.area * 5000 / total_area
+
+
+def test_state_time_percentiles():
+    results = [result(1, "editor.exe", *(("Document %d" % number, number * 100, SMALL) for number in range(1, 101)))]
+    summary, = summarize_results(results)
+    assert summary.median_state_time == 5100
+    assert summary.high_state_time == 9600
+    assert summary.distinct_titles == 100
+    assert summary.top_titles == tuple("Document %d" % number for number in range(100, 95, -1))
+
+    summary, = summarize_results([result(1, "editor.exe", ("Notes", 700, SMALL))])
+    assert summary.median_state_time == summary.high_state_time == 700
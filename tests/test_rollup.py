@@ -0,0 +1,74 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from helpers.rectangle import rectangle_from_positions
+from helpers.rollup import RollupRing, Rollups, MINUTE, HOUR
+from helpers.window import WindowCapture, WindowState
+
+
+def test_intervals_split_on_bucket_boundaries():
+    ring = RollupRing(10, 5)
+    ring.add("editor.exe", 5, 27)
+    assert ring.series("editor.exe", 27, 3) == [5, 10, 7]
+    assert ring.series("editor.exe", 27, 5) == [0, 0, 5, 10, 7]
+    ring.add("editor.exe", 27, 30)
+    ring.add("editor.exe", 30, 31)
+    assert ring.series("editor.exe", 30, 3) == [10, 10, 1]
+    assert ring.usage("editor.exe", 30, 5) == 26
+
+
+def test_slots_are_reused_as_the_ring_wraps():
+    ring = RollupRing(10, 5)
+    ring.add("editor.exe", 0, 10)
+    ring.add("browser.exe", 20, 25)
+    ring.add("browser.exe", 50, 60)
+    # Bucket 5 took over the slot of bucket 0, which is forgotten for every process.
+    assert ring.series("editor.exe", 9, 1) == [0]
+    assert ring.series("editor.exe", 59, 5) == [0, 0, 0, 0, 0]
+    assert ring.series("browser.exe", 59, 5) == [0, 5, 0, 0, 10]
+    assert ring.processes() == {"editor.exe", "browser.exe"}
+
+
+def test_buckets_already_reused_drop_their_data():
+    ring = RollupRing(10, 5)
+    ring.add("browser.exe", 50, 60)
+    # Bucket 0 shared its slot with bucket 5, while bucket 1 is still the oldest bucket in the ring.
+    ring.add("editor.exe", 5, 15)
+    assert ring.series("editor.exe", 59, 5) == [5, 0, 0, 0, 0]
+    assert ring.series("browser.exe", 59, 1) == [10]
+
+    # Only the part of an interval that the ring can still hold is counted.
+    ring.add("editor.exe", 0, 1000)
+    assert ring.series("editor.exe", 999, 5) == [10, 10, 10, 10, 10]
+    assert ring.usage("editor.exe", 999, 10) == 50
+    assert ring.series("browser.exe", 999, 5) == [0, 0, 0, 0, 0]
+
+
+def test_rollups_follow_closed_captures():
+    rollups = Rollups(minutes=60, hours=24, days=7)
+    capture = WindowCapture(
+        handle=4,
+        process="editor.exe",
+        title="Notes",
+        rectangle=rectangle_from_positions(0, 0, 800, 600),
+        time_start=HOUR - MINUTE // 2
+    )
+    rollups.capture_closed(capture, WindowState(capture.title, capture.rectangle, MINUTE))
+    assert rollups.minutes.series("editor.exe", HOUR, 2) == [MINUTE // 2, MINUTE // 2]
+    assert rollups.hours.series("editor.exe", HOUR, 2) == [MINUTE // 2, MINUTE // 2]
+    assert rollups.days.series("editor.exe", HOUR, 1) == [MINUTE]
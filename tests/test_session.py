@@ -0,0 +1,49 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+
+from helpers import session
+from helpers.rectangle import rectangle_from_positions
+from helpers.session import write_session_rows, read_session, read_session_generation
+
+ROWS = [(("editor.exe", "Notes", rectangle_from_positions(0, 0, 800, 600)), 1000)]
+
+
+def test_session_is_on_disk_before_it_replaces_the_old_one(monkeypatch, tmp_path):
+    synced = []
+    monkeypatch.setattr(session, "fsync", lambda descriptor: synced.append(os.path.exists(path + ".tmp")))
+
+    def replace(source, destination):
+        assert synced == [True]
+        os.replace(source, destination)
+
+    monkeypatch.setattr(session, "replace", replace)
+    path = str(tmp_path / "screentime-session.jsonl")
+    write_session_rows(path, ROWS)
+    assert list(read_session(path)) == ROWS
+
+
+def test_checkpoint_generation(tmp_path):
+    path = str(tmp_path / "screentime-session.jsonl")
+    assert read_session_generation(path) == 0
+    write_session_rows(path, ROWS)
+    assert read_session_generation(path) == 0
+    write_session_rows(path, ROWS, generation=7)
+    assert read_session_generation(path) == 7
+    assert list(read_session(path)) == ROWS
@@ -0,0 +1,145 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from bisect import bisect_left, bisect_right
+from math import isnan, nan
+from random import Random
+from typing import Iterable
+
+import pytest
+
+from helpers.sketch import HyperLogLog, TopK, TDigest
+
+
+def exact_quantile(values: Iterable[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return nan
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+@pytest.mark.parametrize("distinct", [10, 1000, 100_000])
+def test_hyperloglog_estimates_distinct_values(distinct):
+    sketch = HyperLogLog()
+    for number in range(distinct):
+        # Every value is added twice, which must not change the estimate.
+        sketch.add("title %d" % number)
+        sketch.add("title %d" % number)
+    # Three standard errors of 1.6%.
+    assert abs(sketch.estimate() - distinct) <= max(1, 0.05 * distinct)
+
+
+def test_hyperloglog_merge_estimates_the_union():
+    first, second = HyperLogLog(), HyperLogLog()
+    for number in range(20_000):
+        first.add("title %d" % number)
+    for number in range(10_000, 40_000):
+        second.add("title %d" % number)
+    first.merge(second)
+    assert abs(first.estimate() - 40_000) <= 0.05 * 40_000
+
+
+def weighted_stream(random: Random, length: int) -> list[tuple[str, int]]:
+    # A few heavy titles among many light ones, as with the time spent on window titles.
+    stream = []
+    for _ in range(length):
+        item = "title %d" % min(int(random.paretovariate(1.0)), 5000)
+        stream.append((item, random.randint(1, 1000)))
+    return stream
+
+
+def exact_weights(stream: list[tuple[str, int]]) -> dict[str, int]:
+    weights = {}
+    for item, weight in stream:
+        weights[item] = weights.get(item, 0) + weight
+    return weights
+
+
+def check_top_k(sketch: TopK, weights: dict[str, int]):
+    total = sum(weights.values())
+    for item, weight in weights.items():
+        if weight > total / sketch.capacity:
+            assert item in sketch.counters
+    for item, (weight, error) in sketch.counters.items():
+        # Weights never underestimate, and overestimate by at most the error.
+        assert weight - error <= weights.get(item, 0) <= weight
+
+
+def test_top_k_keeps_the_heaviest_items():
+    stream = weighted_stream(Random(0), 50_000)
+    sketch = TopK(32)
+    for item, weight in stream:
+        sketch.add(item, weight)
+    weights = exact_weights(stream)
+    check_top_k(sketch, weights)
+
+    exact_top = sorted(weights, key=weights.get, reverse=True)[:5]
+    assert [item for item, _ in sketch.top(5)] == exact_top
+
+
+def test_top_k_merge_keeps_the_heaviest_items():
+    stream = weighted_stream(Random(1), 50_000)
+    first, second = TopK(32), TopK(32)
+    for index, (item, weight) in enumerate(stream):
+        (first if index % 2 else second).add(item, weight)
+    first.merge(second)
+    check_top_k(first, exact_weights(stream))
+
+
+def rank_error(ordered: list[float], value: float, q: float) -> float:
+    # How far the quantile the value actually is at lies from q, as a fraction of all values.
+    low, high = bisect_left(ordered, value), bisect_right(ordered, value)
+    return max(0.0, low / len(ordered) - q, q - high / len(ordered))
+
+
+@pytest.mark.parametrize("q", [0.01, 0.5, 0.9, 0.95, 0.99])
+def test_t_digest_quantiles(q):
+    random = Random(0)
+    values = [random.lognormvariate(10, 1.5) for _ in range(100_000)]
+    digest = TDigest()
+    for value in values:
+        digest.add(value)
+
+    ordered = sorted(values)
+    estimate = digest.quantile(q)
+    assert rank_error(ordered, estimate, q) <= 0.01
+    # At the tails the estimate is also close in value, not just in rank.
+    if q >= 0.9:
+        assert abs(estimate - exact_quantile(values, q)) <= 0.05 * exact_quantile(values, q)
+
+
+def test_t_digest_merge():
+    random = Random(1)
+    values = [random.expovariate(1 / 60_000) for _ in range(50_000)]
+    digests = [TDigest() for _ in range(4)]
+    for index, value in enumerate(values):
+        digests[index % 4].add(value)
+    for digest in digests[1:]:
+        digests[0].merge(digest)
+
+    ordered = sorted(values)
+    assert digests[0].count == len(values)
+    assert digests[0].minimum == ordered[0] and digests[0].maximum == ordered[-1]
+    for q in (0.5, 0.95):
+        assert rank_error(ordered, digests[0].quantile(q), q) <= 0.01
+
+
+def test_exact_quantile():
+    assert exact_quantile([5, 1, 4, 2, 3], 0.5) == 3
+    assert exact_quantile([5, 1, 4, 2, 3], 0.99) == 5
+    assert isnan(exact_quantile([], 0.5))
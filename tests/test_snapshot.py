@@ -0,0 +1,83 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from secrets import token_hex
+from time import time
+
+from helpers.rectangle import rectangle_from_positions
+from helpers.snapshot import SnapshotPublisher, SnapshotReader, SNAPSHOT_HEADER
+from helpers.window import WindowCapture, WindowState
+
+RECTANGLE = rectangle_from_positions(0, 0, 800, 600)
+
+
+def open_capture(publisher: SnapshotPublisher, process: str, time_start: int = 0) -> WindowCapture:
+    capture = WindowCapture(handle=1, process=process, title="Document", rectangle=RECTANGLE, time_start=time_start)
+    publisher.capture_opened(capture)
+    return capture
+
+
+def close_state(publisher: SnapshotPublisher, process: str, duration: int = 1000):
+    capture = open_capture(publisher, process)
+    publisher.capture_closed(capture, WindowState("Document", RECTANGLE, duration))
+
+
+def test_snapshot_round_trip():
+    name = "screentime-test-%s" % token_hex(4)
+    publisher = SnapshotPublisher(name, capacity=4)
+    reader = SnapshotReader(name)
+    try:
+        for process in ["editor.exe", "browser.exe", "editor.exe"]:
+            close_state(publisher, process)
+        _, records = reader.read()
+        assert [(record.process, record.visits, record.duration) for record in records] == [
+            ("editor.exe", 2, 2000), ("browser.exe", 1, 1000),
+        ]
+    finally:
+        reader.close()
+        publisher.close()
+
+
+def test_dropped_processes_are_counted_once():
+    name = "screentime-test-%s" % token_hex(4)
+    publisher = SnapshotPublisher(name, capacity=2)
+    try:
+        for _ in range(5):
+            for process in ["a.exe", "b.exe", "c.exe", "d.exe"]:
+                close_state(publisher, process)
+        *_, count, capacity, dropped = SNAPSHOT_HEADER.unpack_from(publisher.memory.buf, 0)
+        assert (count, capacity, dropped) == (2, 2, 2)
+    finally:
+        publisher.close()
+
+
+def test_open_windows_count_while_they_stay_open():
+    name = "screentime-test-%s" % token_hex(4)
+    publisher = SnapshotPublisher(name, capacity=4)
+    reader = SnapshotReader(name)
+    try:
+        close_state(publisher, "editor.exe", 1000)
+        # Opened an hour ago and still in the foreground, without anything written since.
+        open_capture(publisher, "editor.exe", round(time() * 1000) - 3_600_000)
+        _, (record,) = reader.read()
+        assert (record.visits, record.open_windows) == (1, 1)
+        assert 3_601_000 <= record.duration < 3_611_000
+        assert record.area_duration == RECTANGLE.area * record.duration
+    finally:
+        reader.close()
+        publisher.close()
@@ -0,0 +1,96 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from random import Random
+
+from helpers.rectangle import Rectangle, rectangle_from_positions
+from helpers.spatial import SpatialIndex, uncovered_area
+
+
+def random_rectangle(random: Random, size: int) -> Rectangle:
+    left, top = random.randrange(size), random.randrange(size)
+    return rectangle_from_positions(left, top, left + random.randint(1, size), top + random.randint(1, size))
+
+
+def test_uncovered_area_counts_every_point_once():
+    random = Random(0)
+    for _ in range(200):
+        rectangle = random_rectangle(random, 12)
+        occluders = [random_rectangle(random, 12) for _ in range(random.randint(0, 6))]
+        uncovered_points = sum(
+            1
+            for x in range(rectangle.left, rectangle.right)
+            for y in range(rectangle.top, rectangle.bottom)
+            if not any(o.left <= x < o.right and o.top <= y < o.bottom for o in occluders)
+        )
+        assert uncovered_area(rectangle, occluders) == uncovered_points
+
+
+def fresh_visible_areas(windows: dict[int, Rectangle], order: list[int]) -> dict[int, int]:
+    index = SpatialIndex(cell_size=64)
+    for handle in order:
+        index.insert(handle, windows[handle])
+    index.restack(order)
+    return {handle: index.visible_area(handle) for handle in order}
+
+
+def test_cached_visible_areas_follow_moves_and_restacks():
+    random = Random(1)
+    windows = {handle: random_rectangle(random, 400) for handle in range(1, 41)}
+    order = list(windows)
+    index = SpatialIndex(cell_size=64)
+
+    for _ in range(300):
+        change = random.random()
+        handle = random.choice(order)
+        if change < 0.3:
+            windows[handle] = random_rectangle(random, 400)
+        elif change < 0.6:
+            # Bring a window to the front.
+            order.remove(handle)
+            order.insert(0, handle)
+        elif change < 0.7:
+            # Send a window to the back.
+            order.remove(handle)
+            order.append(handle)
+        elif change < 0.8 and len(order) > 10:
+            order.remove(handle)
+            del windows[handle]
+        elif change < 0.9:
+            new_handle = max(windows) + 1
+            windows[new_handle] = random_rectangle(random, 400)
+            order.insert(random.randrange(len(order) + 1), new_handle)
+
+        # Apply the change the way a scan does, then compare with an index that computes everything afresh.
+        for current_handle in order:
+            index.insert(current_handle, windows[current_handle])
+        index.retain(order)
+        index.restack(order)
+        assert {handle: index.visible_area(handle) for handle in order} == fresh_visible_areas(windows, order)
+
+
+def test_window_at():
+    index = SpatialIndex()
+    index.insert(1, rectangle_from_positions(0, 0, 100, 100))
+    index.insert(2, rectangle_from_positions(50, 50, 150, 150))
+    index.restack([2, 1])
+    assert index.window_at(75, 75) == 2
+    assert index.window_at(10, 10) == 1
+    assert index.window_at(200, 200) is None
+    index.restack([1, 2])
+    assert index.window_at(75, 75) == 1
@@ -0,0 +1,71 @@
+"""
+    py-windows-screentime: Python program that tracks window usage.
+    Copyright (C) 2021 dxboats
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from hashlib import blake2b
+
+import pytest
+
+from helpers.titles import TitleTransform, read_title_key, REDACTED
+
+
+def test_redaction_then_truncation():
+    transform = TitleTransform(redactions=[r"\S+@\S+", r"\d{4}-\d{4}"], max_length=30)
+    assert transform("Inbox - someone@example.com - Mail") == "Inbox - %s - Mail" % REDACTED
+    # The length is counted after redacting.
+    assert transform("Card 1234-5678 and a long tail of text") == "Card %s and a long tai" % REDACTED
+    assert TitleTransform()("Unchanged") == "Unchanged"
+
+
+def test_keyed_hash():
+    key = b"site key"
+    transform = TitleTransform(key=key, max_length=5)
+    digest = blake2b(b"Notes", digest_size=16, key=key).hexdigest()
+    # Titles are truncated before they are hashed, so titles that only differ after max_length hash the same.
+    assert transform("Notes") == transform("Notes - Editor") == digest
+    assert TitleTransform(key=b"other key")("Notes") != digest
+    assert transform("Mail") != digest
+
+
+def test_results_are_cached():
+    transform = TitleTransform(redactions=["secret"], cache_size=2)
+    for title in ["a secret", "b", "a secret", "b", "c", "a secret"]:
+        assert transform(title) in ("a %s" % REDACTED, "b", "c")
+    # The least recently used title was forgotten when a third one came along.
+    info = transform._transform.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (2, 4, 2)
+
+
+@pytest.mark.parametrize("contents, key", [
+    (b"site key\n", b"site key"),
+    (b"  0123456789abcdef\r\n", b"0123456789abcdef"),
+    (b"\n\x00\x9f\xf0 key \t", b"\n\x00\x9f\xf0 key \t"),
+    (b"\x0bkey\x00", b"\x0bkey\x00"),
+])
+def test_text_keys_are_stripped_and_binary_keys_are_not(tmp_path, contents, key):
+    path = tmp_path / "key.bin"
+    path.write_bytes(contents)
+    assert read_title_key(str(path)) == key
+
+
+def test_long_and_empty_keys(tmp_path):
+    path = tmp_path / "key.bin"
+    path.write_bytes(bytes(range(100)))
+    assert read_title_key(str(path)) == blake2b(bytes(range(100))).digest()
+    path.write_bytes(b" \n")
+    with pytest.raises(ValueError):
+        read_title_key(str(path))
@@ -1,6 +1,7 @@
+import ctypes
 from ctypes import Array, create_unicode_buffer, cast
 from ctypes.wintypes import HANDLE, HICON, LPARAM, WPARAM, WCHAR, LPVOID, LPWSTR
-from typing import Callable, Union
+from typing import Callable, Union, Any, Optional
 
 UnicodeBuffer = Union[LPWSTR, Array[WCHAR], None]
 
@@ -35,3 +36,32 @@ LOWORD: Callable[[int], int] = _loword
 
 # https://docs.microsoft.com/en-us/previous-versions/windows/desktop/legacy/ms632657(v=vs.85)
 HIWORD: Callable[[int], int] = _hiword
+
+
+class LazyBindings:
+    """
+    Binds foreign functions on first use instead of at import time.
+
+    An instance is installed as a module's ``__getattr__`` (PEP 562), which Python only consults for names missing
+    from the module. The first lookup of a function loads it from its library, sets its ``restype`` and ``argtypes``,
+    and stores it in the module so later lookups never reach this object again.
+    """
+
+    def __init__(self, module_globals: dict[str, Any]):
+        self._module_globals = module_globals
+        self._functions: dict[str, tuple[str, str, Any, Optional[list]]] = {}
+
+    def function(self, name: str, library: str, restype: Any, argtypes: Optional[list], symbol: Optional[str] = None):
+        self._functions[name] = (library, symbol or name, restype, argtypes)
+
+    def __call__(self, name: str) -> Any:
+        if name not in self._functions:
+            raise AttributeError("module %r has no attribute %r" % (self._module_globals["__name__"], name))
+        library, symbol, restype, argtypes = self._functions[name]
+
+        # Resolving the same name from two threads at once is harmless: the library caches the function object.
+        function = getattr(getattr(ctypes.windll, library), symbol)
+        function.restype = restype
+        function.argtypes = argtypes
+        self._module_globals[name] = function
+        return function
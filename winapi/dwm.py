@@ -16,16 +16,19 @@
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from ctypes import windll, HRESULT
+from ctypes import HRESULT
 from ctypes.wintypes import DWORD, HWND
 from typing import Union, Callable
-from winapi import PVOID
+from winapi import PVOID, LazyBindings
+
+_bindings = LazyBindings(globals())
 
 # https://docs.microsoft.com/en-us/windows/win32/api/dwmapi/ne-dwmapi-dwmwindowattribute
 DWMWA_CLOAKED: int = 14
 
 # dwmapi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/dwmapi/nf-dwmapi-dwmgetwindowattribute
-DwmGetWindowAttribute: Callable[[int, int, Union[PVOID, any], int], int] = windll.dwmapi.DwmGetWindowAttribute
-DwmGetWindowAttribute.restype = HRESULT
-DwmGetWindowAttribute.argtypes = [HWND, DWORD, PVOID, DWORD]
+DwmGetWindowAttribute: Callable[[int, int, Union[PVOID, any], int], int]
+_bindings.function("DwmGetWindowAttribute", "dwmapi", HRESULT, [HWND, DWORD, PVOID, DWORD])
+
+__getattr__ = _bindings
@@ -16,11 +16,13 @@
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from ctypes import windll, Structure, POINTER
+from ctypes import Structure, POINTER
 from ctypes.wintypes import INT, HGDIOBJ, BOOL, LPPOINT, HDC, LONG, WCHAR, BYTE, DWORD, LPVOID, HANDLE, WORD, HBITMAP, \
     UINT, LPCWSTR, HPEN, LPRECT
 from typing import Callable, Union
-from winapi import PVOID, UnicodeBuffer
+from winapi import PVOID, UnicodeBuffer, LazyBindings
+
+_bindings = LazyBindings(globals())
 
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-getdevicecaps
 HORZRES = 8
@@ -46,6 +48,12 @@ NULLREGION = 1
 SIMPLEREGION = 2
 COMPLEXREGION = 3
 
+# https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-getdibits
+DIB_RGB_COLORS = 0
+
+# https://docs.microsoft.com/en-us/windows/win32/api/wingdi/ns-wingdi-bitmapinfoheader
+BI_RGB = 0
+
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/ns-wingdi-textmetricw
@@ -88,14 +96,51 @@ class BITMAP(Structure):
     ]
 
 
+# wingdi.h
+# https://docs.microsoft.com/en-us/windows/win32/api/wingdi/ns-wingdi-bitmapinfoheader
+class BITMAPINFOHEADER(Structure):
+    _fields_ = [
+        ("biSize", DWORD),
+        ("biWidth", LONG),
+        ("biHeight", LONG),
+        ("biPlanes", WORD),
+        ("biBitCount", WORD),
+        ("biCompression", DWORD),
+        ("biSizeImage", DWORD),
+        ("biXPelsPerMeter", LONG),
+        ("biYPelsPerMeter", LONG),
+        ("biClrUsed", DWORD),
+        ("biClrImportant", DWORD)
+    ]
+
+
+# wingdi.h
+# https://docs.microsoft.com/en-us/windows/win32/api/wingdi/ns-wingdi-rgbquad
+class RGBQUAD(Structure):
+    _fields_ = [
+        ("rgbBlue", BYTE),
+        ("rgbGreen", BYTE),
+        ("rgbRed", BYTE),
+        ("rgbReserved", BYTE)
+    ]
+
+
+# wingdi.h
+# https://docs.microsoft.com/en-us/windows/win32/api/wingdi/ns-wingdi-bitmapinfo
+class BITMAPINFO(Structure):
+    _fields_ = [
+        ("bmiHeader", BITMAPINFOHEADER),
+        ("bmiColors", RGBQUAD * 1)
+    ]
+
+
 # wingdi.h
 COLORREF = DWORD
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-getclipbox
-GetClipBox: Callable[[int, Union[LPRECT, any]], int] = windll.gdi32.GetClipBox
-GetClipBox.restype = INT
-GetClipBox.argtypes = [HDC, LPRECT]
+GetClipBox: Callable[[int, Union[LPRECT, any]], int]
+_bindings.function("GetClipBox", "gdi32", INT, [HDC, LPRECT])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/ns-wingdi-textmetricw
@@ -103,96 +148,87 @@ LPTEXTMETRICW = POINTER(TEXTMETRICW)
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-getstockobject
-GetStockObject: Callable[[int], int] = windll.gdi32.GetStockObject
-GetStockObject.restype = HGDIOBJ
-GetStockObject.argtypes = [INT]
+GetStockObject: Callable[[int], int]
+_bindings.function("GetStockObject", "gdi32", HGDIOBJ, [INT])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-getobjectw
-GetObjectW: Callable[[int, int, Union[LPVOID, any]], int] = windll.gdi32.GetObjectW
-GetObjectW.restype = INT
-GetObjectW.argtypes = [HANDLE, INT, LPVOID]
+GetObjectW: Callable[[int, int, Union[LPVOID, any]], int]
+_bindings.function("GetObjectW", "gdi32", INT, [HANDLE, INT, LPVOID])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-selectobject
-SelectObject: Callable[[int, int], int] = windll.gdi32.SelectObject
-SelectObject.restype = HGDIOBJ
-SelectObject.argtypes = [HDC, HGDIOBJ]
+SelectObject: Callable[[int, int], int]
+_bindings.function("SelectObject", "gdi32", HGDIOBJ, [HDC, HGDIOBJ])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-deleteobject
-DeleteObject: Callable[[int], bool] = windll.gdi32.DeleteObject
-DeleteObject.restype = BOOL
-DeleteObject.argtypes = [HGDIOBJ]
+DeleteObject: Callable[[int], bool]
+_bindings.function("DeleteObject", "gdi32", BOOL, [HGDIOBJ])
+
+# wingdi.h
+# https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-getdibits
+GetDIBits: Callable[[int, int, int, int, Union[LPVOID, any], Union[POINTER(BITMAPINFO), any], int], int]
+_bindings.function("GetDIBits", "gdi32", INT, [HDC, HBITMAP, UINT, UINT, LPVOID, POINTER(BITMAPINFO), UINT])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-createdcw
-CreateDCW: Callable[[UnicodeBuffer, UnicodeBuffer, UnicodeBuffer, Union[PVOID, any]], int] = windll.gdi32.CreateDCW
-CreateDCW.restype = HDC
-CreateDCW.argtypes = [LPCWSTR, LPCWSTR, LPCWSTR, PVOID]
+CreateDCW: Callable[[UnicodeBuffer, UnicodeBuffer, UnicodeBuffer, Union[PVOID, any]], int]
+_bindings.function("CreateDCW", "gdi32", HDC, [LPCWSTR, LPCWSTR, LPCWSTR, PVOID])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-createcompatibledc
-CreateCompatibleDC: Callable[[int], int] = windll.gdi32.CreateCompatibleDC
-CreateCompatibleDC.restype = HDC
-CreateCompatibleDC.argtypes = [HDC]
+CreateCompatibleDC: Callable[[int], int]
+_bindings.function("CreateCompatibleDC", "gdi32", HDC, [HDC])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-deletedc
-DeleteDC: Callable[[int], int] = windll.gdi32.DeleteDC
-DeleteDC.restype = BOOL
-DeleteDC.argtypes = [HDC]
+DeleteDC: Callable[[int], int]
+_bindings.function("DeleteDC", "gdi32", BOOL, [HDC])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-lptodp
-LPtoDP: Callable[[int, Union[LPPOINT, any], int], int] = windll.gdi32.LPtoDP
-LPtoDP.restype = BOOL
-LPtoDP.argtypes = [HDC, LPPOINT, INT]
+LPtoDP: Callable[[int, Union[LPPOINT, any], int], int]
+_bindings.function("LPtoDP", "gdi32", BOOL, [HDC, LPPOINT, INT])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-gettextmetricsw
-GetTextMetricsW: Callable[[int, Union[LPTEXTMETRICW, any]], int] = windll.gdi32.GetTextMetricsW
-GetTextMetricsW.restype = BOOL
-GetTextMetricsW.argtypes = [HDC, LPTEXTMETRICW]
+GetTextMetricsW: Callable[[int, Union[LPTEXTMETRICW, any]], int]
+_bindings.function("GetTextMetricsW", "gdi32", BOOL, [HDC, LPTEXTMETRICW])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-getdevicecaps
-GetDeviceCaps: Callable[[int, int], int] = windll.gdi32.GetDeviceCaps
-GetDeviceCaps.restype = INT
-GetDeviceCaps.argtypes = [HDC, INT]
+GetDeviceCaps: Callable[[int, int], int]
+_bindings.function("GetDeviceCaps", "gdi32", INT, [HDC, INT])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-bitblt
-BitBlt: Callable[[int, int, int, int, int, int, int, int, int], int] = windll.gdi32.BitBlt
-BitBlt.restype = BOOL
-BitBlt.argtypes = [HDC, INT, INT, INT, INT, HDC, INT, INT, DWORD]
+BitBlt: Callable[[int, int, int, int, int, int, int, int, int], int]
+_bindings.function("BitBlt", "gdi32", BOOL, [HDC, INT, INT, INT, INT, HDC, INT, INT, DWORD])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-stretchblt
-StretchBlt: Callable[[int, int, int, int, int, int, int, int, int, int, int], int] = windll.gdi32.StretchBlt
-StretchBlt.restype = BOOL
-StretchBlt.argtypes = [HDC, INT, INT, INT, INT, HDC, INT, INT, INT, INT, DWORD]
+StretchBlt: Callable[[int, int, int, int, int, int, int, int, int, int, int], int]
+_bindings.function("StretchBlt", "gdi32", BOOL, [HDC, INT, INT, INT, INT, HDC, INT, INT, INT, INT, DWORD])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-createbitmap
-CreateBitmap: Callable[[int, int, int, int, Union[PVOID, any]], int] = windll.gdi32.CreateBitmap
-CreateBitmap.restype = HBITMAP
-CreateBitmap.argtypes = [INT, INT, UINT, UINT, PVOID]
+CreateBitmap: Callable[[int, int, int, int, Union[PVOID, any]], int]
+_bindings.function("CreateBitmap", "gdi32", HBITMAP, [INT, INT, UINT, UINT, PVOID])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-textoutw
-TextOutW: Callable[[int, int, int, UnicodeBuffer, int], int] = windll.gdi32.TextOutW
-TextOutW.restype = BOOL
-TextOutW.argtypes = [HDC, INT, INT, LPCWSTR, INT]
+TextOutW: Callable[[int, int, int, UnicodeBuffer, int], int]
+_bindings.function("TextOutW", "gdi32", BOOL, [HDC, INT, INT, LPCWSTR, INT])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-rectangle
-Rectangle: Callable[[int, int, int, int, int], int] = windll.gdi32.Rectangle
-Rectangle.restype = BOOL
-Rectangle.argtypes = [HDC, INT, INT, INT, INT]
+Rectangle: Callable[[int, int, int, int, int], int]
+_bindings.function("Rectangle", "gdi32", BOOL, [HDC, INT, INT, INT, INT])
 
 # wingdi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/wingdi/nf-wingdi-createpen
-CreatePen: Callable[[int, int, int], int] = windll.gdi32.CreatePen
-CreatePen.restype = HPEN
-CreatePen.argtypes = [INT, INT, COLORREF]
+CreatePen: Callable[[int, int, int], int]
+_bindings.function("CreatePen", "gdi32", HPEN, [INT, INT, COLORREF])
+
+__getattr__ = _bindings
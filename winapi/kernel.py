@@ -17,55 +17,63 @@
 """
 
 from typing import Callable, Any, Union
-from winapi import UnicodeBuffer
-from ctypes import windll
+from winapi import UnicodeBuffer, LazyBindings
 from ctypes.wintypes import (
     DWORD, LPCWSTR, HMODULE, HANDLE, BOOL, LPWSTR, PDWORD
 )
 
+_bindings = LazyBindings(globals())
+
 # https://docs.microsoft.com/en-us/windows/win32/procthread/process-security-and-access-rights
 PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
 
 # libloaderapi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/libloaderapi/nf-libloaderapi-getmodulehandlew
-GetModuleHandleW: Callable[[UnicodeBuffer], int] = windll.kernel32.GetModuleHandleW
-GetModuleHandleW.restype = HMODULE
-GetModuleHandleW.argtypes = [LPCWSTR]
+GetModuleHandleW: Callable[[UnicodeBuffer], int]
+_bindings.function("GetModuleHandleW", "kernel32", HMODULE, [LPCWSTR])
 
 # libloaderapi
 # https://docs.microsoft.com/en-us/windows/win32/api/libloaderapi/nf-libloaderapi-getmodulefilenamew
-GetModuleFileNameW: Callable[[int, UnicodeBuffer, int], int] = windll.kernel32.GetModuleFileNameW
-GetModuleFileNameW.restype = DWORD
-GetModuleFileNameW.argtypes = [HMODULE, LPWSTR, DWORD]
+GetModuleFileNameW: Callable[[int, UnicodeBuffer, int], int]
+_bindings.function("GetModuleFileNameW", "kernel32", DWORD, [HMODULE, LPWSTR, DWORD])
 
 # processthreadsapi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/processthreadsapi/nf-processthreadsapi-getcurrentthreadid
-GetCurrentThreadId: Callable[[], int] = windll.kernel32.GetCurrentThreadId
-GetCurrentThreadId.restype = DWORD
-GetCurrentThreadId.argtypes = None
+GetCurrentThreadId: Callable[[], int]
+_bindings.function("GetCurrentThreadId", "kernel32", DWORD, None)
 
 # processthreadsapi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/processthreadsapi/nf-processthreadsapi-openprocess
-OpenProcess: Callable[[int, bool, Union[int, DWORD]], int] = windll.kernel32.OpenProcess
-OpenProcess.restype = HANDLE
-OpenProcess.argtypes = [DWORD, BOOL, DWORD]
+OpenProcess: Callable[[int, bool, Union[int, DWORD]], int]
+_bindings.function("OpenProcess", "kernel32", HANDLE, [DWORD, BOOL, DWORD])
 
 # processthreadsapi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/handleapi/nf-handleapi-closehandle
-CloseHandle: Callable[[int], bool] = windll.kernel32.CloseHandle
-CloseHandle.restype = BOOL
-CloseHandle.argtypes = [HANDLE]
+CloseHandle: Callable[[int], bool]
+_bindings.function("CloseHandle", "kernel32", BOOL, [HANDLE])
 
 # psapi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/psapi/nf-psapi-getprocessimagefilenamew
-GetProcessImageFileNameW: Callable[[int, UnicodeBuffer, int], int] = windll.kernel32.K32GetProcessImageFileNameW
-GetProcessImageFileNameW.restype = DWORD
-GetProcessImageFileNameW.argtypes = [HANDLE, LPWSTR, DWORD]
+GetProcessImageFileNameW: Callable[[int, UnicodeBuffer, int], int]
+_bindings.function(
+    "GetProcessImageFileNameW", "kernel32", DWORD, [HANDLE, LPWSTR, DWORD], symbol="K32GetProcessImageFileNameW"
+)
 
 # winbase.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winbase/nf-winbase-queryfullprocessimagenamew
 QueryFullProcessImageNameW: Callable[
     [int, int, UnicodeBuffer, Union[PDWORD, Any]], bool
-] = windll.kernel32.QueryFullProcessImageNameW
-QueryFullProcessImageNameW.restype = BOOL
-QueryFullProcessImageNameW.argtypes = [HANDLE, DWORD, LPWSTR, PDWORD]
+]
+_bindings.function("QueryFullProcessImageNameW", "kernel32", BOOL, [HANDLE, DWORD, LPWSTR, PDWORD])
+
+# fileapi.h
+# https://docs.microsoft.com/en-us/windows/win32/api/fileapi/nf-fileapi-getlogicaldrivestringsw
+GetLogicalDriveStringsW: Callable[[int, UnicodeBuffer], int]
+_bindings.function("GetLogicalDriveStringsW", "kernel32", DWORD, [DWORD, LPWSTR])
+
+# fileapi.h
+# https://docs.microsoft.com/en-us/windows/win32/api/fileapi/nf-fileapi-querydosdevicew
+QueryDosDeviceW: Callable[[UnicodeBuffer, UnicodeBuffer, int], int]
+_bindings.function("QueryDosDeviceW", "kernel32", DWORD, [LPCWSTR, LPWSTR, DWORD])
+
+__getattr__ = _bindings
@@ -17,10 +17,12 @@
 """
 
 from typing import Callable, Union
-from winapi import UnicodeBuffer
-from ctypes import windll, HRESULT
+from winapi import UnicodeBuffer, LazyBindings
+from ctypes import HRESULT
 from ctypes.wintypes import LPVOID, PWORD, LPWSTR, HINSTANCE, HICON
 
+_bindings = LazyBindings(globals())
+
 # https://docs.microsoft.com/en-us/windows/win32/api/shellapi/ne-shellapi-query_user_notification_state
 QUNS_NOT_PRESENT = 1
 QUNS_BUSY = 2
@@ -32,12 +34,12 @@ QUNS_APP = 7
 
 # shellapi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/shellapi/nf-shellapi-shqueryusernotificationstate
-SHQueryUserNotificationState: Callable[[Union[LPVOID, any]], int] = windll.shell32.SHQueryUserNotificationState
-SHQueryUserNotificationState.restype = HRESULT
-SHQueryUserNotificationState.argtypes = [LPVOID]
+SHQueryUserNotificationState: Callable[[Union[LPVOID, any]], int]
+_bindings.function("SHQueryUserNotificationState", "shell32", HRESULT, [LPVOID])
 
 # shellapi.h
 # https://docs.microsoft.com/en-us/windows/win32/api/shellapi/nf-shellapi-extractassociatediconw
-ExtractAssociatedIconW: Callable[[int, UnicodeBuffer, Union[PWORD, any]], int] = windll.shell32.ExtractAssociatedIconW
-ExtractAssociatedIconW.restype = HICON
-ExtractAssociatedIconW.argtypes = [HINSTANCE, LPWSTR, PWORD]
+ExtractAssociatedIconW: Callable[[int, UnicodeBuffer, Union[PWORD, any]], int]
+_bindings.function("ExtractAssociatedIconW", "shell32", HICON, [HINSTANCE, LPWSTR, PWORD])
+
+__getattr__ = _bindings
@@ -16,7 +16,7 @@
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from ctypes import windll, Structure, WINFUNCTYPE, POINTER
+from ctypes import Structure, WINFUNCTYPE, POINTER
 from ctypes.wintypes import (
     INT,
     UINT,
@@ -45,7 +45,9 @@ from ctypes.wintypes import (
 )
 from typing import Callable, Union
 
-from winapi import HWINEVENTHOOK, LRESULT, HCURSOR, UnicodeBuffer, LONG_PTR, PVOID
+from winapi import HWINEVENTHOOK, LRESULT, HCURSOR, UnicodeBuffer, LONG_PTR, PVOID, LazyBindings
+
+_bindings = LazyBindings(globals())
 
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-setwineventhook
 WINEVENT_OUTOFCONTEXT = 0x0000
@@ -56,6 +58,20 @@ EVENT_SYSTEM_FOREGROUND = 0x0003
 EVENT_SYSTEM_MOVESIZEEND = 0x000B
 EVENT_SYSTEM_MINIMIZEEND = 0x0017
 EVENT_SYSTEM_MINIMIZESTART = 0x0016
+EVENT_OBJECT_CREATE = 0x8000
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_SHOW = 0x8002
+EVENT_OBJECT_HIDE = 0x8003
+EVENT_OBJECT_NAMECHANGE = 0x800C
+
+# https://docs.microsoft.com/en-us/windows/win32/winauto/object-identifiers
+OBJID_WINDOW = 0x00000000
+CHILDID_SELF = 0
+
+# https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getancestor
+GA_PARENT = 1
+GA_ROOT = 2
+GA_ROOTOWNER = 3
 
 # https://docs.microsoft.com/en-us/windows/win32/winmsg/window-class-styles#CS_HREDRAW
 CS_HREDRAW = 2
@@ -260,79 +276,68 @@ PICONINFOEXW = POINTER(ICONINFOEXW)
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getmessagew
 GetMessageW: Callable[
     [Union[POINTER(MSG), any], int, int, int], int
-] = windll.user32.GetMessageW
-GetMessageW.restype = BOOL
-GetMessageW.argtypes = [POINTER(MSG), HWND, UINT, UINT]
+]
+_bindings.function("GetMessageW", "user32", BOOL, [POINTER(MSG), HWND, UINT, UINT])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-postquitmessage
-PostQuitMessage: Callable[[int], None] = windll.user32.PostQuitMessage
-PostQuitMessage.restype = None
-PostQuitMessage.argtypes = [INT]
+PostQuitMessage: Callable[[int], None]
+_bindings.function("PostQuitMessage", "user32", None, [INT])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-translatemessage
 TranslateMessage: Callable[
     [Union[POINTER(MSG), any]], int
-] = windll.user32.TranslateMessage
-TranslateMessage.restype = BOOL
-TranslateMessage.argtypes = [POINTER(MSG)]
+]
+_bindings.function("TranslateMessage", "user32", BOOL, [POINTER(MSG)])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-dispatchmessagew
 DispatchMessageW: Callable[
     [Union[POINTER(MSG), any]], int
-] = windll.user32.DispatchMessageW
-DispatchMessageW.restype = LRESULT
-DispatchMessageW.argtypes = [POINTER(MSG)]
+]
+_bindings.function("DispatchMessageW", "user32", LRESULT, [POINTER(MSG)])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-postthreadmessagew
 PostThreadMessageW: Callable[
     [int, int, int, int], int
-] = windll.user32.PostThreadMessageW
-PostThreadMessageW.restype = BOOL
-PostThreadMessageW.argtypes = [DWORD, UINT, WPARAM, LPARAM]
+]
+_bindings.function("PostThreadMessageW", "user32", BOOL, [DWORD, UINT, WPARAM, LPARAM])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getsystemmetrics
-GetSystemMetrics: Callable[[int], int] = windll.user32.GetSystemMetrics
-GetSystemMetrics.restype = INT
-GetSystemMetrics.argtypes = [INT]
+GetSystemMetrics: Callable[[int], int]
+_bindings.function("GetSystemMetrics", "user32", INT, [INT])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-registerclassexw
 RegisterClassExW: Callable[
     [Union[POINTER(WNDCLASSEXW), any]], int
-] = windll.user32.RegisterClassExW
-RegisterClassExW.restype = ATOM
-RegisterClassExW.argtypes = [POINTER(WNDCLASSEXW)]
+]
+_bindings.function("RegisterClassExW", "user32", ATOM, [POINTER(WNDCLASSEXW)])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-unregisterclassw
 UnregisterClassW: Callable[
     [Union[UnicodeBuffer, int], int], int
-] = windll.user32.UnregisterClassW
-UnregisterClassW.restype = BOOL
-UnregisterClassW.argtypes = [LONG_PTR, HINSTANCE]
+]
+_bindings.function("UnregisterClassW", "user32", BOOL, [LONG_PTR, HINSTANCE])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-enumwindows
-EnumWindows: Callable[[WNDENUMPROC, int], int] = windll.user32.EnumWindows
-EnumWindows.restype = BOOL
-EnumWindows.argtypes = [WNDENUMPROC, LPARAM]
+EnumWindows: Callable[[WNDENUMPROC, int], int]
+_bindings.function("EnumWindows", "user32", BOOL, [WNDENUMPROC, LPARAM])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-enumdesktopwindows
-EnumDesktopWindows: Callable[[int, WNDENUMPROC, int], int] = windll.user32.EnumDesktopWindows
-EnumDesktopWindows.restype = BOOL
-EnumDesktopWindows.argtypes = [HDESK, WNDENUMPROC, LPARAM]
+EnumDesktopWindows: Callable[[int, WNDENUMPROC, int], int]
+_bindings.function("EnumDesktopWindows", "user32", BOOL, [HDESK, WNDENUMPROC, LPARAM])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getforegroundwindow
-GetForegroundWindow: Callable[[], int] = windll.user32.GetForegroundWindow
-GetForegroundWindow.restype = HWND
-GetForegroundWindow.argtypes = None
+GetForegroundWindow: Callable[[], int]
+_bindings.function("GetForegroundWindow", "user32", HWND, None)
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-createwindowexw
@@ -352,197 +357,199 @@ CreateWindowExW: Callable[
         Union[LPVOID, any],
     ],
     int,
-] = windll.user32.CreateWindowExW
-CreateWindowExW.restype = HWND
-CreateWindowExW.argtypes = [
-    DWORD,
-    LONG_PTR,
-    LPWSTR,
-    DWORD,
-    INT,
-    INT,
-    INT,
-    INT,
-    HWND,
-    HMENU,
-    HINSTANCE,
-    LPVOID,
 ]
+_bindings.function(
+    "CreateWindowExW",
+    "user32",
+    HWND,
+    [
+        DWORD,
+        LONG_PTR,
+        LPWSTR,
+        DWORD,
+        INT,
+        INT,
+        INT,
+        INT,
+        HWND,
+        HMENU,
+        HINSTANCE,
+        LPVOID,
+    ]
+)
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-destroywindow
-DestroyWindow: Callable[[int], int] = windll.user32.DestroyWindow
-DestroyWindow.restype = BOOL
-DestroyWindow.argtypes = [HWND]
+DestroyWindow: Callable[[int], int]
+_bindings.function("DestroyWindow", "user32", BOOL, [HWND])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getwindowlongptrw
-GetWindowLongPtrW: Callable[[int, int], int] = windll.user32.GetWindowLongPtrW
-GetWindowLongPtrW.restype = LONG_PTR
-GetWindowLongPtrW.argtypes = [HWND, INT]
+GetWindowLongPtrW: Callable[[int, int], int]
+_bindings.function("GetWindowLongPtrW", "user32", LONG_PTR, [HWND, INT])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getwindowthreadprocessid
 GetWindowThreadProcessId: Callable[
     [int, Union[LPDWORD, any]], int
-] = windll.user32.GetWindowThreadProcessId
-GetWindowThreadProcessId.restype = DWORD
-GetWindowThreadProcessId.argtypes = [HWND, LPDWORD]
+]
+_bindings.function("GetWindowThreadProcessId", "user32", DWORD, [HWND, LPDWORD])
+
+# winuser.h
+# https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getancestor
+GetAncestor: Callable[[int, int], int]
+_bindings.function("GetAncestor", "user32", HWND, [HWND, UINT])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getclassnamew
-GetClassNameW: Callable[[int, UnicodeBuffer, int], int] = windll.user32.GetClassNameW
-GetClassNameW.restype = INT
-GetClassNameW.argtypes = [HWND, LPWSTR, INT]
+GetClassNameW: Callable[[int, UnicodeBuffer, int], int]
+_bindings.function("GetClassNameW", "user32", INT, [HWND, LPWSTR, INT])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-isiconic
-IsIconic: Callable[[int], int] = windll.user32.IsIconic
-IsIconic.restype = INT
-IsIconic.argtypes = [INT]
+IsIconic: Callable[[int], int]
+_bindings.function("IsIconic", "user32", INT, [INT])
+
+# winuser.h
+# https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-iswindowvisible
+IsWindowVisible: Callable[[int], int]
+_bindings.function("IsWindowVisible", "user32", BOOL, [HWND])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getwindowtextw
-GetWindowTextLengthW: Callable[[int], int] = windll.user32.GetWindowTextLengthW
-GetWindowTextLengthW.restype = INT
-GetWindowTextLengthW.argtypes = [INT]
+GetWindowTextLengthW: Callable[[int], int]
+_bindings.function("GetWindowTextLengthW", "user32", INT, [INT])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getwindowtextw
-GetWindowTextW: Callable[[int, UnicodeBuffer, int], int] = windll.user32.GetWindowTextW
-GetWindowTextW.restype = INT
-GetWindowTextW.argtypes = [HWND, LPWSTR, INT]
+GetWindowTextW: Callable[[int, UnicodeBuffer, int], int]
+_bindings.function("GetWindowTextW", "user32", INT, [HWND, LPWSTR, INT])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-setwindowtextw
-SetWindowTextW: Callable[[int, UnicodeBuffer], int] = windll.user32.SetWindowTextW
-SetWindowTextW.restype = BOOL
-SetWindowTextW.argtypes = [HWND, LPWSTR]
+SetWindowTextW: Callable[[int, UnicodeBuffer], int]
+_bindings.function("SetWindowTextW", "user32", BOOL, [HWND, LPWSTR])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-showwindow
-ShowWindow: Callable[[int, int], int] = windll.user32.ShowWindow
-ShowWindow.restype = BOOL
-ShowWindow.argtypes = [HWND, INT]
+ShowWindow: Callable[[int, int], int]
+_bindings.function("ShowWindow", "user32", BOOL, [HWND, INT])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-updatewindow
-UpdateWindow: Callable[[int], int] = windll.user32.UpdateWindow
-UpdateWindow.restype = BOOL
-UpdateWindow.argtypes = [HWND]
+UpdateWindow: Callable[[int], int]
+_bindings.function("UpdateWindow", "user32", BOOL, [HWND])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-defwindowprocw
-DefWindowProcW: Callable[[int, int, int, int], int] = windll.user32.DefWindowProcW
-DefWindowProcW.restype = LRESULT
-DefWindowProcW.argtypes = [HWND, UINT, WPARAM, LPARAM]
+DefWindowProcW: Callable[[int, int, int, int], int]
+_bindings.function("DefWindowProcW", "user32", LRESULT, [HWND, UINT, WPARAM, LPARAM])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-beginpaint
 BeginPaint: Callable[
     [int, Union[POINTER(PAINTSTRUCT), any]], int
-] = windll.user32.BeginPaint
-BeginPaint.restype = HDC
-BeginPaint.argtypes = [HWND, POINTER(PAINTSTRUCT)]
+]
+_bindings.function("BeginPaint", "user32", HDC, [HWND, POINTER(PAINTSTRUCT)])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-endpaint
 EndPaint: Callable[
     [int, Union[POINTER(PAINTSTRUCT), any]], int
-] = windll.user32.EndPaint
-EndPaint.restype = BOOL
-EndPaint.argtypes = [HWND, POINTER(PAINTSTRUCT)]
+]
+_bindings.function("EndPaint", "user32", BOOL, [HWND, POINTER(PAINTSTRUCT)])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-setwineventhook
 SetWinEventHook: Callable[
     [int, int, int, WINEVENTPROC, int, int, int], int
-] = windll.user32.SetWinEventHook
-SetWinEventHook.restype = HWINEVENTHOOK
-SetWinEventHook.argtypes = [DWORD, DWORD, HMODULE, WINEVENTPROC, DWORD, DWORD, DWORD]
+]
+_bindings.function(
+    "SetWinEventHook", "user32", HWINEVENTHOOK, [DWORD, DWORD, HMODULE, WINEVENTPROC, DWORD, DWORD, DWORD]
+)
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-unhookwinevent
-UnhookWinEvent: Callable[[int], int] = windll.user32.UnhookWinEvent
-UnhookWinEvent.restype = BOOL
-UnhookWinEvent.argtypes = [HWINEVENTHOOK]
+UnhookWinEvent: Callable[[int], int]
+_bindings.function("UnhookWinEvent", "user32", BOOL, [HWINEVENTHOOK])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getwindowrect
-GetWindowRect: Callable[[int, Union[LPRECT, any]], int] = windll.user32.GetWindowRect
-GetWindowRect.restype = BOOL
-GetWindowRect.argtypes = [HWND, LPRECT]
+GetWindowRect: Callable[[int, Union[LPRECT, any]], int]
+_bindings.function("GetWindowRect", "user32", BOOL, [HWND, LPRECT])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getclientrect
-GetClientRect: Callable[[int, Union[LPRECT, any]], int] = windll.user32.GetClientRect
-GetClientRect.restype = BOOL
-GetClientRect.argtypes = [HWND, LPRECT]
+GetClientRect: Callable[[int, Union[LPRECT, any]], int]
+_bindings.function("GetClientRect", "user32", BOOL, [HWND, LPRECT])
+
+# winuser.h
+# https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-mapwindowpoints
+# Bound for mapping a RECT, which the function accepts as an array of two points.
+MapWindowPoints: Callable[[int, int, Union[LPRECT, any], int], int]
+_bindings.function("MapWindowPoints", "user32", INT, [HWND, HWND, LPRECT, UINT])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-enumdisplaymonitors
 EnumDisplayMonitors: Callable[
     [int, Union[LPRECT, any], MONITORENUMPROC, int], int
-] = windll.user32.EnumDisplayMonitors
-EnumDisplayMonitors.restype = BOOL
-EnumDisplayMonitors.argtypes = [HDC, LPRECT, MONITORENUMPROC, LPARAM]
+]
+_bindings.function("EnumDisplayMonitors", "user32", BOOL, [HDC, LPRECT, MONITORENUMPROC, LPARAM])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getmonitorinfow
 GetMonitorInfoW: Callable[
     [int, Union[POINTER(MONITORINFO), any]], int
-] = windll.user32.GetMonitorInfoW
-GetMonitorInfoW.restype = BOOL
-GetMonitorInfoW.argtypes = [HMONITOR, POINTER(MONITORINFO)]
+]
+_bindings.function("GetMonitorInfoW", "user32", BOOL, [HMONITOR, POINTER(MONITORINFO)])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-loadimagew
 LoadImageW: Callable[
     [int, UnicodeBuffer, int, int, int, int], int
-] = windll.user32.LoadImageW
-LoadImageW.restype = HANDLE
-LoadImageW.argtypes = [HINSTANCE, PVOID, UINT, INT, INT, UINT]
+]
+_bindings.function("LoadImageW", "user32", HANDLE, [HINSTANCE, PVOID, UINT, INT, INT, UINT])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-setscrollinfo
-SetScrollInfo: Callable[[int, int, Union[POINTER(SCROLLINFO), any], bool], int] = windll.user32.SetScrollInfo
-SetScrollInfo.restype = INT
-SetScrollInfo.argtypes = [HWND, INT, POINTER(SCROLLINFO), BOOL]
+SetScrollInfo: Callable[[int, int, Union[POINTER(SCROLLINFO), any], bool], int]
+_bindings.function("SetScrollInfo", "user32", INT, [HWND, INT, POINTER(SCROLLINFO), BOOL])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getscrollinfo
-GetScrollInfo: Callable[[int, int, Union[POINTER(SCROLLINFO), any]], int] = windll.user32.GetScrollInfo
-GetScrollInfo.restype = BOOL
-GetScrollInfo.argtypes = [HWND, INT, POINTER(SCROLLINFO)]
+GetScrollInfo: Callable[[int, int, Union[POINTER(SCROLLINFO), any]], int]
+_bindings.function("GetScrollInfo", "user32", BOOL, [HWND, INT, POINTER(SCROLLINFO)])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-scrollwindowex
 ScrollWindowEx: Callable[
     [int, int, int, Union[LPRECT, any], Union[LPRECT, any], int, Union[LPRECT, any], int], int
-] = windll.user32.ScrollWindowEx
-ScrollWindowEx.restype = INT
-ScrollWindowEx.argtypes = [HWND, INT, INT, LPRECT, LPRECT, HRGN, LPRECT, UINT]
+]
+_bindings.function("ScrollWindowEx", "user32", INT, [HWND, INT, INT, LPRECT, LPRECT, HRGN, LPRECT, UINT])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getwindowdc
-GetWindowDC: Callable[[int], int] = windll.user32.GetWindowDC
-GetWindowDC.restype = HDC
-GetWindowDC.argtypes = [HWND]
+GetWindowDC: Callable[[int], int]
+_bindings.function("GetWindowDC", "user32", HDC, [HWND])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getdc
-GetDC: Callable[[int], int] = windll.user32.GetDC
-GetDC.restype = HDC
-GetDC.argtypes = [HWND]
+GetDC: Callable[[int], int]
+_bindings.function("GetDC", "user32", HDC, [HWND])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-releasedc
-ReleaseDC: Callable[[int, int], int] = windll.user32.ReleaseDC
-ReleaseDC.restype = INT
-ReleaseDC.argtypes = [HWND, HDC]
+ReleaseDC: Callable[[int, int], int]
+_bindings.function("ReleaseDC", "user32", INT, [HWND, HDC])
 
 # winuser.h
 # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-geticoninfoexw
-GetIconInfoExW: Callable[[int, Union[PICONINFOEXW, any]], int] = windll.user32.GetIconInfoExW
-GetIconInfoExW.restype = BOOL
-GetIconInfoExW.argtypes = [HICON, PICONINFOEXW]
+GetIconInfoExW: Callable[[int, Union[PICONINFOEXW, any]], int]
+_bindings.function("GetIconInfoExW", "user32", BOOL, [HICON, PICONINFOEXW])
+
+# winuser.h
+# https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-destroyicon
+DestroyIcon: Callable[[int], int]
+_bindings.function("DestroyIcon", "user32", BOOL, [HICON])
+
+__getattr__ = _bindings